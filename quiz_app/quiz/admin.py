@@ -1,14 +1,17 @@
 """
 Django Admin Configuration
 ===========================
-Customized admin interface for managing quiz questions.
+Customized admin interface for managing quiz questions and browsing
+completed attempts.
 
 Provides an intuitive interface for creating, editing, and managing
 quiz questions with full support for both Multiple Choice and True/False formats.
 """
 
 from django.contrib import admin
-from .models import Question
+from django.db import router, transaction
+from .models import AttemptAnswer, Question, QuizAttempt, QuizSet
+from .search import filter_questions
 
 
 @admin.register(Question)
@@ -48,7 +51,7 @@ class QuestionAdmin(admin.ModelAdmin):
         'created_at',
     )
     
-    # Fields searchable via search box
+    # Fields searchable via search box (see get_search_results)
     search_fields = ('text',)
     
     # Fields editable directly in list view
@@ -78,8 +81,9 @@ class QuestionAdmin(admin.ModelAdmin):
     # Set readonly fields
     readonly_fields = ('created_at', 'updated_at')
     
-    # Pagination
+    # Pagination (one COUNT per page: skip the unfiltered total)
     list_per_page = 20
+    show_full_result_count = False
     
     # Custom sorting in list view
     list_display_links = ('text',)
@@ -109,17 +113,100 @@ class QuestionAdmin(admin.ModelAdmin):
         """
         Custom save method with logging.
         
+        Order-only edits from the changelist are collected instead of
+        saved one by one; ``changelist_view`` writes them in bulk.
+        
         Args:
             request (HttpRequest): The current request
             obj (Question): The question object
             form (ModelForm): The admin form
             change (bool): True if editing, False if creating
         """
+        pending_orders = getattr(request, '_pending_orders', None)
+        if change and pending_orders is not None and form.changed_data == ['order']:
+            pending_orders[obj.pk] = obj.order
+            return
+        
+        answer_changed = change and obj.correct_answer_changed()
         super().save_model(request, obj, form, change)
+        if answer_changed:
+            # post_save queues the re-score; it runs in the background
+            self.message_user(request, "تم تغيير الإجابة الصحيحة - سيتم إعادة حساب نتائج المحاولات في الخلفية.")
     
+    def changelist_view(self, request, extra_context=None):
+        """
+        Changelist with bulk order updates.
+        
+        When the inline ``order`` column is saved, all changed orders are
+        written with a single ``bulk_update`` inside the same transaction
+        as the admin log entries, instead of one UPDATE per row.
+        """
+        if request.method != 'POST' or '_save' not in request.POST:
+            return super().changelist_view(request, extra_context)
+        
+        request._pending_orders = {}
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            response = super().changelist_view(request, extra_context)
+            Question.objects.reorder(request._pending_orders)
+        return response
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search question text through the full-text index.
+
+        Replaces the default ``LIKE '%term%'`` scan; see ``search.py``.
+        """
+        if not search_term:
+            return queryset, False
+        return filter_questions(queryset, search_term), False
+
     class Media:
         """Additional CSS for better admin interface styling"""
         css = {
             'all': ('admin/css/admin_custom.css',)
         }
 
+
+
+@admin.register(QuizSet)
+class QuizSetAdmin(admin.ModelAdmin):
+    """
+    QuizSet Admin Interface
+    =======================
+    Manage question sets; each set is played at ``/quiz/<slug>/``.
+    """
+
+    list_display = ('name', 'slug', 'created_at')
+    search_fields = ('name',)
+    prepopulated_fields = {'slug': ('name',)}
+    filter_horizontal = ('questions',)
+
+
+class AttemptAnswerInline(admin.TabularInline):
+    """Read-only list of the answers given in an attempt."""
+
+    model = AttemptAnswer
+    fields = ('position', 'question', 'answer', 'is_correct')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(QuizAttempt)
+class QuizAttemptAdmin(admin.ModelAdmin):
+    """
+    QuizAttempt Admin Interface
+    ===========================
+    Read-only history of completed quiz attempts.
+    """
+
+    list_display = ('id', 'quiz_key', 'quiz_set', 'score', 'total', 'started_at', 'completed_at')
+    list_filter = ('quiz_set', 'completed_at')
+    readonly_fields = ('bank_version', 'quiz_set', 'quiz_key', 'score', 'total', 'started_at', 'completed_at')
+    inlines = (AttemptAnswerInline,)
+    list_per_page = 20
+    date_hierarchy = 'completed_at'
+
+    def has_add_permission(self, request):
+        """Attempts are only created by finishing a quiz."""
+        return False
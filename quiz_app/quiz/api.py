@@ -0,0 +1,233 @@
+"""
+Quiz JSON API
+=============
+JSON endpoints that let the browser run a whole attempt client-side.
+
+- ``POST /api/quiz/start/`` starts an attempt and returns every question
+  in display order, with the correct answers withheld
+- ``POST /api/quiz/submit/`` grades a complete answer sheet in one call
+
+An attempt therefore costs two API requests instead of one full page
+render per question. Only banks served from the in-process snapshot
+(up to ``QUIZ_BANK_SNAPSHOT_MAX`` questions) are sent whole; larger
+banks are played through the form flow. The submitted sheet is stored in the same session
+attempt state the form-based ``quiz`` view uses, so ``/results/``
+persists and displays it exactly like a form-driven attempt.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods
+
+from .attempt import AttemptState
+from .bank import DEFAULT_SNAPSHOT_MAX, get_question_bank, get_question_count
+
+# Cache key template for the serialized question payload
+PAYLOAD_KEY = 'quiz:api_payload:{version}'
+
+# Longest answer time accepted from the client (one hour, in milliseconds)
+MAX_TIME_MS = 60 * 60 * 1000
+
+
+def get_question_payload(bank):
+    """
+    Get the serialized question list of a bank snapshot.
+
+    The JSON is built once per bank version and cached, so starting an
+    attempt does not re-serialize the bank.
+
+    Args:
+        bank (QuestionBank): The current question bank snapshot
+
+    Returns:
+        str: JSON array of questions without their correct answers
+    """
+    key = PAYLOAD_KEY.format(version=bank.version)
+    payload = cache.get(key)
+    if payload is None:
+        payload = json.dumps([
+            {
+                'id': question.id,
+                'text': question.text,
+                'question_type': question.question_type,
+                'options': question.get_options(),
+            }
+            for question in bank
+        ], ensure_ascii=False)
+        cache.set(key, payload)
+    return payload
+
+
+def parse_time_ms(value):
+    """
+    Validate a client-measured answer time.
+
+    Args:
+        value: The ``time_ms`` of an answer sheet entry (may be None)
+
+    Returns:
+        int: Time clamped to ``0..MAX_TIME_MS``, or None when not measured
+
+    Raises:
+        TypeError: If the value is not an integer (booleans included)
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError(f"time_ms must be an integer, not {value!r}")
+    return min(max(value, 0), MAX_TIME_MS)
+
+
+def parse_question_id(value):
+    """
+    Validate the question ID of an answer sheet entry.
+
+    Args:
+        value: The ``question_id`` of the entry
+
+    Returns:
+        int: The question ID
+
+    Raises:
+        TypeError: If the value is not an integer (booleans included)
+    """
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError(f"question_id must be an integer, not {value!r}")
+    return value
+
+
+def parse_answer(value):
+    """
+    Validate the answer of an answer sheet entry.
+
+    Args:
+        value: The ``answer`` of the entry (may be None)
+
+    Returns:
+        str: The answer, or None when skipped
+
+    Raises:
+        TypeError: If the value is neither a string nor None
+    """
+    if value is not None and not isinstance(value, str):
+        raise TypeError(f"answer must be a string, not {value!r}")
+    return value
+
+
+def fits_client_driver(bank_size):
+    """
+    Tell whether a bank is small enough to be sent to the browser whole.
+
+    Args:
+        bank_size (int): Number of questions in the bank
+
+    Returns:
+        bool: True up to ``QUIZ_BANK_SNAPSHOT_MAX`` questions
+    """
+    return bank_size <= getattr(settings, 'QUIZ_BANK_SNAPSHOT_MAX', DEFAULT_SNAPSHOT_MAX)
+
+
+def supports_client_driver(state, bank_size):
+    """
+    Tell whether an attempt can be played through this API.
+
+    The API only serves fresh full-bank attempts on snapshot-sized banks:
+    samples and question sets keep to the form flow, which walks their
+    own questions, and so do larger banks.
+
+    Args:
+        state (AttemptState): The attempt in progress (may be None)
+        bank_size (int): Number of questions in the bank
+
+    Returns:
+        bool: True for a full-bank attempt with no answers yet
+    """
+    return (state is not None and not state.answers
+            and state.sample is None and state.quiz_set is None
+            and fits_client_driver(bank_size))
+
+
+@require_http_methods(["POST"])
+def api_start(request):
+    """
+    Start Attempt API
+    =================
+    Start a new attempt and return the full ordered question payload.
+
+    Refused with a 409 while a sampled or question set attempt is in
+    progress, so the full bank never replaces it, and for banks larger
+    than ``QUIZ_BANK_SNAPSHOT_MAX``.
+
+    Response:
+        {"bank_version": int, "total": int, "submit_url": str,
+         "questions": [{"id", "text", "question_type", "options"}, ...]}
+    """
+    state = AttemptState.load(request.session)
+    if state is not None and (state.sample is not None or state.quiz_set is not None):
+        return JsonResponse({'error': 'Another attempt is in progress.'}, status=409)
+    if not fits_client_driver(get_question_count()):
+        return JsonResponse({'error': 'The question bank is too large to load at once.'}, status=409)
+
+    bank = get_question_bank()
+    payload = get_question_payload(bank)
+    AttemptState.start(request.session, bank.version)
+
+    # Splice the cached question JSON in without decoding it
+    head = json.dumps({
+        'bank_version': bank.version,
+        'total': len(bank),
+        'submit_url': reverse('api_submit'),
+    })
+    return HttpResponse(
+        head[:-1] + ', "questions": ' + payload + '}',
+        content_type='application/json',
+    )
+
+
+@require_http_methods(["POST"])
+def api_submit(request):
+    """
+    Submit Answers API
+    ==================
+    Grade a complete answer sheet in one call.
+
+    Request body:
+        {"answers": [{"question_id": int, "answer": str, "time_ms": int}, ...]}
+        (``answer`` may be null for a skipped question; ``time_ms`` is
+        optional, integers only, clamped to one hour)
+
+    Response:
+        {"score": int, "total": int, "results_url": str}
+    """
+    state = AttemptState.load(request.session)
+    # Only a fresh full-bank attempt can be submitted in one sheet
+    if not supports_client_driver(state, get_question_count()):
+        return JsonResponse({'error': 'No attempt in progress.'}, status=409)
+
+    try:
+        sheet = json.loads(request.body)['answers']
+        submitted = {
+            parse_question_id(entry['question_id']): (
+                parse_answer(entry.get('answer')), parse_time_ms(entry.get('time_ms')),
+            )
+            for entry in sheet
+        }
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid answer sheet.'}, status=400)
+
+    # Grade every question in display order; missing answers are skipped
+    bank = get_question_bank()
+    for question in bank:
+        answer, time_ms = submitted.get(question.id, (None, None))
+        state.record(question, answer, time_ms)
+    state.save(request.session)
+
+    return JsonResponse({
+        'score': state.score,
+        'total': len(bank),
+        'results_url': reverse('results'),
+    })
@@ -0,0 +1,17 @@
+"""
+Quiz App Configuration
+======================
+"""
+
+from django.apps import AppConfig
+
+
+class QuizConfig(AppConfig):
+    """App configuration that wires up the quiz signal handlers."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'quiz'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
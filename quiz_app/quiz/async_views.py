@@ -0,0 +1,239 @@
+"""
+Async Quiz Views
+================
+Async versions of the ``home``, ``quiz`` and ``results`` views for ASGI
+deployments (see ``quiz_project/asgi.py``).
+
+They behave like the views in ``views.py`` and share their helpers, but
+read the question bank through the async cache and ORM lookups of
+``bank.py``. A worker waiting on the database or on a slow client keeps
+serving other requests on its event loop instead of holding a thread.
+Work that Django 4.2 only supports synchronously runs through
+``sync_to_async``:
+
+- loading and flushing the session (session backends are sync-only)
+- storing a completed attempt (transactions are sync-only)
+- question set manifests, sample draws and the leaderboard
+
+Django 4.2's view decorators (``require_http_methods``, ``condition``,
+``cache_page``) don't wrap coroutines, so the method checks are done
+inline, and ``home`` applies the bank-state validators and the page cache
+itself.
+
+Routed instead of the sync views when ``QUIZ_ASYNC_VIEWS = True``.
+"""
+
+import secrets
+from calendar import timegm
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponseNotAllowed
+from django.middleware.cache import CacheMiddleware
+from django.shortcuts import redirect, render
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .api import supports_client_driver
+from .attempt import AttemptState
+from .bank import afetch_question_window, aget_bank_version, aget_question_count, aget_questions
+from .conditional import abank_validators
+from .leaderboard import get_leaderboard, get_percentile, get_quiz_key
+from .quizsets import get_set_manifest
+from .sampling import afetch_sampled_window, sample_question_ids
+from .views import get_home_context, get_quiz_context, get_result_message, parse_sample_size
+
+# Same page cache as ``cache_page`` on ``views.home`` (shared entries)
+_home_cache = CacheMiddleware(
+    lambda request: None,
+    page_timeout=getattr(settings, 'QUIZ_PAGE_CACHE_TIMEOUT', 60 * 15),
+)
+
+
+async def _load_session(session):
+    # Read the session once in the thread pool; later access is in memory
+    await sync_to_async(session.keys)()
+
+
+async def home(request):
+    """
+    Async home page (see ``views.home``).
+
+    Answers with a 304 while the bank-state validators still match, and
+    from the page cache otherwise.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    etag, last_modified = await abank_validators()
+    etag = quote_etag(etag)
+    last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _home_cache.process_request(request)
+    if response is None:
+        response = render(request, 'home.html', get_home_context())
+        response = _home_cache.process_response(request, response)
+    response.headers.setdefault('ETag', etag)
+    if last_modified:
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
+
+
+async def quiz(request, set_slug=None):
+    """
+    Async quiz page (see ``views.quiz``).
+
+    Args:
+        request (HttpRequest): The HTTP request object
+        set_slug (str): Slug of the question set to play, if any
+
+    Returns:
+        HttpResponse: Rendered quiz.html template or redirect to results
+    """
+    if request.method not in ('GET', 'POST'):
+        return HttpResponseNotAllowed(['GET', 'POST'])
+    await _load_session(request.session)
+
+    if request.method == 'GET':
+        if not await aget_question_count():
+            return redirect('home')
+
+        bank_version = await aget_bank_version()
+        if set_slug is not None:
+            manifest = await sync_to_async(get_set_manifest)(set_slug)
+            if manifest is None:
+                raise Http404("Question set not found")
+            state = AttemptState.start(request.session, bank_version, quiz_set=manifest.slug)
+        else:
+            sample_size = parse_sample_size(request.GET.get('sample'))
+            if sample_size:
+                seed = secrets.randbits(32)
+                sample = await sync_to_async(sample_question_ids)(
+                    sample_size, seed, stratify=request.GET.get('stratify') == '1')
+                state = AttemptState.start(request.session, bank_version, sample=sample, seed=seed)
+            else:
+                state = AttemptState.start(request.session, bank_version)
+
+        question, _ = await aget_attempt_window(state)
+        if question is None:
+            return redirect('home')
+
+        client_driver = supports_client_driver(state, await aget_question_count())
+        return render(request, 'quiz.html',
+                      get_quiz_context(question, 0, await aget_attempt_total(state), bank_version,
+                                       client_driver=client_driver))
+
+    state = AttemptState.load(request.session)
+    if state is None:
+        return redirect(request.path)
+
+    answer = request.POST.get('answer')
+    question_id = int(request.POST.get('question_id'))
+
+    question, next_question = await aget_attempt_window(state)
+    if question is None:
+        state.save(request.session)
+        return redirect('results')
+
+    total = await aget_attempt_total(state)
+
+    # Stale or repeated submission - show the current question again
+    if question.id != question_id:
+        return render(request, 'quiz.html',
+                      get_quiz_context(question, state.position, total, await aget_bank_version()))
+
+    state.record(question, answer)
+    if next_question is None and state.sample is not None:
+        next_question, _ = await aget_attempt_window(state)
+    state.save(request.session)
+
+    if next_question is None:
+        return redirect('results')
+
+    return render(request, 'quiz.html',
+                  get_quiz_context(next_question, state.position, total, await aget_bank_version()))
+
+
+async def aget_attempt_total(state):
+    """Async version of ``views.get_attempt_total``."""
+    if state.sample is not None:
+        return len(state.sample)
+    if state.quiz_set is not None:
+        manifest = await sync_to_async(get_set_manifest)(state.quiz_set)
+        return manifest.count if manifest is not None else 0
+    return await aget_question_count()
+
+
+async def aget_attempt_window(state):
+    """Async version of ``views.get_attempt_window``."""
+    if state.quiz_set is not None:
+        manifest = await sync_to_async(get_set_manifest)(state.quiz_set)
+        ids = list(manifest.window(state.cursor)) if manifest is not None else []
+        window = await aget_questions(ids) + [None, None]
+        return window[0], window[1]
+
+    if state.sample is None:
+        return await afetch_question_window(state.cursor)
+
+    current, upcoming = await afetch_sampled_window(state.sample, state.position)
+    while current is None and state.position < len(state.sample):
+        state.skip(state.sample[state.position])
+        current, upcoming = await afetch_sampled_window(state.sample, state.position)
+    return current, upcoming
+
+
+async def results(request):
+    """
+    Async results page (see ``views.results``).
+
+    Args:
+        request (HttpRequest): The HTTP request object
+
+    Returns:
+        HttpResponse: Rendered results.html template
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    await _load_session(request.session)
+
+    state = AttemptState.load(request.session)
+    total = await aget_attempt_total(state) if state is not None else await aget_question_count()
+    manifest = None
+    if state is not None and state.quiz_set:
+        manifest = await sync_to_async(get_set_manifest)(state.quiz_set)
+
+    if total == 0:
+        return redirect('home')
+
+    score = state.score if state is not None else 0
+    attempt = None
+    # Only completed attempts are stored and ranked (see ``views.results``)
+    if state is not None and state.answers and (await aget_attempt_window(state))[0] is None:
+        attempt = await sync_to_async(state.persist)(
+            total,
+            key=manifest.key if manifest is not None else None,
+            quiz_set_id=manifest.set_id if manifest is not None else None,
+        )
+        score = attempt.score
+
+    quiz_key = get_quiz_key(manifest.set_id if manifest is not None else None,
+                            sampled=state is not None and state.sample is not None)
+    percentage = (score / total) * 100 if total > 0 else 0
+    message, message_en = get_result_message(percentage)
+
+    context = {
+        'score': score,
+        'total': total,
+        'percentage': percentage,
+        'message': message,
+        'message_en': message_en,
+        'percentile': await sync_to_async(get_percentile)(quiz_key, score, total) if attempt else None,
+        'leaderboard': await sync_to_async(get_leaderboard)(quiz_key, total),
+        'attempt_id': attempt.id if attempt else None,
+    }
+
+    await sync_to_async(request.session.flush)()
+
+    return render(request, 'results.html', context)
@@ -0,0 +1,273 @@
+"""
+Quiz Attempt State
+==================
+Compact session encoding of an in-progress quiz attempt.
+
+An attempt is stored under two small session keys instead of a dict of
+answers keyed by stringified question IDs:
+
+- ``quiz_attempt`` (header): ``[format, bank_version, started_at, seed,
+  sample, quiz_set]`` - written once when the attempt starts; ``sample``
+  is the list of drawn question IDs of a random quiz (``sampling.py``)
+  and ``quiz_set`` the slug of a question set (``quizsets.py``), both
+  None when the attempt walks the whole bank
+- ``quiz_progress``: ``[score, cursor_order, cursor_id, answers, ids,
+  times, shown_at]`` - rewritten on every answer
+
+``answers`` is a string with one character per question position
+(``A``-``D``, ``T``/``F`` for True/False, ``-`` for a skipped question),
+``ids`` the answered question IDs and ``times`` the milliseconds taken to
+answer each one, in the same order. ``shown_at`` is when the current
+question was displayed. The answers are
+buffered here until the attempt completes, then written to the database
+in one transaction by ``persist``. Keeping the header apart
+from the progress lets session backends tell the start of an attempt from
+an answer being recorded.
+"""
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from .database import retry_on_locked
+from .models import AttemptAnswer, Question, QuizAttempt
+from .grading import AnswerKey
+from .leaderboard import get_quiz_key, record_score
+from .stats import record_answer_stats
+
+# Session keys holding the attempt header and progress
+ATTEMPT_KEY = 'quiz_attempt'
+PROGRESS_KEY = 'quiz_progress'
+
+# Bumped whenever the encoding changes; older attempts are discarded
+STATE_FORMAT = 6
+
+# One-character codes for each answer value
+ANSWER_CODES = {
+    'A': 'A',
+    'B': 'B',
+    'C': 'C',
+    'D': 'D',
+    'True': 'T',
+    'False': 'F',
+}
+ANSWER_VALUES = {code: value for value, code in ANSWER_CODES.items()}
+SKIPPED = '-'
+
+
+class AttemptState:
+    """
+    In-progress quiz attempt.
+
+    Attributes:
+        bank_version (int): Question bank version the attempt started on
+        started_at (int): Unix time the attempt started at
+        score (int): Number of correct answers so far
+        cursor (tuple): ``(order, id)`` of the last answered question, or
+            None before the first answer
+        answers (str): Encoded answer vector indexed by question position
+        question_ids (list): Answered question IDs indexed by position
+        times (list): Milliseconds taken per answer, indexed by position
+        shown_at (int): Unix time in milliseconds the current question was shown
+        seed (int): Random seed the sample was drawn with, or None
+        sample (list): Sampled question IDs in quiz order, or None when the
+            attempt walks the whole bank
+        quiz_set (str): Slug of the question set being played, or None
+    """
+
+    __slots__ = (
+        'bank_version', 'started_at', 'score', 'cursor', 'answers',
+        'question_ids', 'times', 'shown_at', 'seed', 'sample', 'quiz_set',
+    )
+
+    def __init__(self, bank_version, started_at, score=0, cursor=None, answers='',
+                 question_ids=None, times=None, shown_at=None, seed=None, sample=None,
+                 quiz_set=None):
+        self.bank_version = bank_version
+        self.started_at = started_at
+        self.seed = seed
+        self.sample = sample
+        self.quiz_set = quiz_set
+        self.score = score
+        self.cursor = cursor
+        self.answers = answers
+        self.question_ids = question_ids if question_ids is not None else []
+        self.times = times if times is not None else []
+        self.shown_at = shown_at if shown_at is not None else started_at * 1000
+
+    @property
+    def position(self):
+        """int: 0-based position of the next question to answer"""
+        return len(self.answers)
+
+    @classmethod
+    def start(cls, session, bank_version, sample=None, seed=None, quiz_set=None):
+        """
+        Start a new attempt, replacing any attempt stored in the session.
+
+        Args:
+            session (SessionBase): The user's session
+            bank_version (int): Current question bank version
+            sample (list): Sampled question IDs for a random quiz
+            seed (int): Seed the sample was drawn with
+            quiz_set (str): Slug of the question set to play
+
+        Returns:
+            AttemptState: The new, empty attempt
+        """
+        now = time.time()
+        state = cls(bank_version, int(now), shown_at=int(now * 1000), seed=seed, sample=sample,
+                    quiz_set=quiz_set)
+        session[ATTEMPT_KEY] = [STATE_FORMAT, bank_version, state.started_at, seed, sample, quiz_set]
+        state.save(session)
+        return state
+
+    @classmethod
+    def load(cls, session):
+        """
+        Load the attempt stored in the session.
+
+        Args:
+            session (SessionBase): The user's session
+
+        Returns:
+            AttemptState: The attempt, or None if there is no valid attempt
+        """
+        header = session.get(ATTEMPT_KEY)
+        progress = session.get(PROGRESS_KEY)
+        if not header or header[0] != STATE_FORMAT or not progress:
+            return None
+
+        score, cursor_order, cursor_id, answers, question_ids, times, shown_at = progress
+        cursor = None if cursor_id is None else (cursor_order, cursor_id)
+        return cls(header[1], header[2], score, cursor, answers, question_ids, times, shown_at,
+                   seed=header[3], sample=header[4], quiz_set=header[5])
+
+    def save(self, session):
+        """
+        Write the attempt progress to the session.
+
+        Args:
+            session (SessionBase): The user's session
+        """
+        cursor_order, cursor_id = self.cursor or (None, None)
+        session[PROGRESS_KEY] = [
+            self.score, cursor_order, cursor_id, self.answers, self.question_ids,
+            self.times, self.shown_at,
+        ]
+
+    @staticmethod
+    def clear(session):
+        """Remove any attempt from the session."""
+        session.pop(ATTEMPT_KEY, None)
+        session.pop(PROGRESS_KEY, None)
+
+    def record(self, question, answer, time_ms=None):
+        """
+        Record the answer to a question and advance the cursor.
+
+        Args:
+            question (Question): The question being answered
+            answer (str): The submitted answer value, or None if skipped
+            time_ms (int): Time taken to answer, when measured by the
+                client; defaults to the time since the question was shown
+
+        Returns:
+            bool: True if the answer is correct
+        """
+        correct = bool(answer) and question.is_correct(answer)
+        self.answers += ANSWER_CODES.get(answer, SKIPPED)
+        self.score += correct
+        self.cursor = (question.order, question.id)
+        self.question_ids.append(question.id)
+
+        # Time since the question was shown; the next one is shown now
+        now = int(time.time() * 1000)
+        if time_ms is None:
+            time_ms = now - self.shown_at
+        self.times.append(max(int(time_ms), 0))
+        self.shown_at = now
+        return correct
+
+    def skip(self, question_id):
+        """
+        Record a sampled question that no longer exists as skipped.
+
+        Args:
+            question_id (int): ID of the deleted question
+        """
+        self.answers += SKIPPED
+        self.question_ids.append(question_id)
+        self.times.append(0)
+
+    def decoded_answers(self):
+        """
+        Decode the answer vector.
+
+        Returns:
+            list: Answer value per position (None for skipped questions)
+        """
+        return [ANSWER_VALUES.get(code) for code in self.answers]
+
+    def persist(self, total, key=None, quiz_set_id=None):
+        """
+        Write the completed attempt and all its answers to the database.
+
+        Answers are re-graded against the current correct answers (one
+        ``AnswerKey`` pass; the key is read with one query unless a cached
+        one is passed in), then inserted with a single ``bulk_create``
+        inside the same transaction as the attempt row, the QuestionStats
+        increments and the score histogram bucket. The transaction is
+        retried if SQLite reports a lock conflict.
+
+        Args:
+            total (int): Number of questions in the quiz
+            key (AnswerKey): Current answer key of the quiz's questions,
+                e.g. from a question set manifest; only used when it holds
+                every answered question (a question removed from the set
+                mid-attempt is graded against the database)
+            quiz_set_id (int): ID of the question set played, if any
+
+        Returns:
+            QuizAttempt: The saved attempt
+        """
+        answers = self.decoded_answers()
+        if key is None or not all(question_id in key.index for question_id in self.question_ids):
+            questions = Question.objects.only('id', 'correct_answer').in_bulk(set(self.question_ids))
+            key = AnswerKey.from_questions(questions.values())
+        grade = key.grade(zip(self.question_ids, answers))
+        graded = list(zip(self.question_ids, answers, self.times, grade.correct))
+
+        # Retried as a whole if SQLite reports a lock conflict
+        @retry_on_locked
+        def store():
+            with transaction.atomic():
+                attempt = QuizAttempt.objects.create(
+                    bank_version=self.bank_version,
+                    quiz_set_id=quiz_set_id,
+                    quiz_key=get_quiz_key(quiz_set_id, sampled=self.sample is not None),
+                    score=sum(is_correct for _, _, _, is_correct in graded),
+                    total=total,
+                    started_at=datetime.fromtimestamp(self.started_at, tz=dt_timezone.utc),
+                    completed_at=timezone.now(),
+                )
+                rows = [
+                    AttemptAnswer(
+                        attempt=attempt,
+                        # Questions deleted since they were answered are unlinked
+                        question_id=question_id if question_id in key.index else None,
+                        position=position,
+                        answer=answer or '',
+                        is_correct=is_correct,
+                        time_ms=time_ms,
+                    )
+                    for position, (question_id, answer, time_ms, is_correct) in enumerate(graded)
+                ]
+                AttemptAnswer.objects.bulk_create(rows)
+                record_answer_stats(rows)
+                record_score(attempt.quiz_key, attempt.total, attempt.score)
+            return attempt
+
+        return store()
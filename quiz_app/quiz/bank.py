@@ -0,0 +1,360 @@
+"""
+Question Bank Cache
+===================
+In-process cache of the ordered question bank used by the quiz views.
+
+The bank is held as an immutable, ordered snapshot tagged with a bank
+version number. The version lives in the file-based ``versions`` cache
+alias, shared by every worker process and management command on the
+host, and it is bumped by the ``post_save``/``post_delete`` signals on
+``Question`` (see ``signals.py``) and by bulk imports. As long as the
+version is unchanged, reading the bank costs zero queries.
+
+Large banks are not snapshotted: ``fetch_question_window`` walks them with
+an ``(order, id)`` keyset query that only loads the current and the next
+question, so per-answer cost stays flat regardless of bank size.
+
+The ``a``-prefixed functions are the same lookups for async views
+(``async_views.py``), using the async cache and ORM APIs.
+"""
+
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Count, Max, Q
+
+from .models import Question
+
+# Cache alias shared by all processes, holding the version numbers
+VERSION_CACHE_ALIAS = 'versions'
+
+# Cache key holding the current bank version number
+BANK_VERSION_KEY = 'quiz:bank_version'
+
+# Cache key template for the per-version ``(last_modified, count)`` state
+BANK_STATE_KEY = 'quiz:bank_state:{version}'
+
+# Banks up to this size are served from the in-process snapshot
+DEFAULT_SNAPSHOT_MAX = 1000
+
+# Columns needed to render and grade a question
+QUESTION_FIELDS = (
+    'id', 'order', 'text', 'question_type',
+    'option_a', 'option_b', 'option_c', 'option_d',
+    'correct_answer',
+)
+
+
+class QuestionBank:
+    """
+    Immutable, ordered snapshot of the question bank.
+
+    Attributes:
+        version (int): Bank version the snapshot was loaded for
+        questions (tuple): Question objects in display order
+        keys (tuple): ``(order, id)`` sort key of each question
+        by_id (dict): Question objects keyed by ID
+    """
+
+    __slots__ = ('version', 'questions', 'keys', 'by_id')
+
+    def __init__(self, version, questions):
+        questions = tuple(questions)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'questions', questions)
+        object.__setattr__(self, 'keys', tuple((q.order, q.id) for q in questions))
+        object.__setattr__(self, 'by_id', {q.id: q for q in questions})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QuestionBank snapshots are immutable")
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __getitem__(self, index):
+        return self.questions[index]
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    def window(self, cursor=None, size=2):
+        """
+        Get the questions following a keyset cursor.
+
+        Args:
+            cursor (tuple): ``(order, id)`` of the last answered question,
+                or None to start from the beginning
+            size (int): Maximum number of questions to return
+
+        Returns:
+            tuple: Up to ``size`` questions in display order
+        """
+        start = 0 if cursor is None else bisect.bisect_right(self.keys, tuple(cursor))
+        return self.questions[start:start + size]
+
+
+# Snapshot of the current process and the lock guarding its reload
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_version(key):
+    """
+    Get a version number from the shared ``versions`` cache.
+
+    When the key is missing (first use, cache cleared) it is seeded from
+    the clock, so a stale snapshot can never match it again.
+
+    Args:
+        key (str): Cache key of the version
+
+    Returns:
+        int: Current version
+    """
+    versions = caches[VERSION_CACHE_ALIAS]
+    version = versions.get(key)
+    if version is None:
+        versions.add(key, time.time_ns() // 1000)
+        version = versions.get(key)
+    return version
+
+
+async def aget_version(key):
+    """Async version of ``get_version``."""
+    versions = caches[VERSION_CACHE_ALIAS]
+    version = await versions.aget(key)
+    if version is None:
+        await versions.aadd(key, time.time_ns() // 1000)
+        version = await versions.aget(key)
+    return version
+
+
+def bump_version(key):
+    """
+    Move a version number in the shared ``versions`` cache forward.
+
+    The file cache has no atomic increment, so two processes bumping at
+    once may both read the same version. The new value is therefore also
+    taken from the clock: each bump writes a version no process has seen
+    yet, whichever write lands last.
+
+    Args:
+        key (str): Cache key of the version
+
+    Returns:
+        int: The new version
+    """
+    version = max(get_version(key) + 1, time.time_ns() // 1000)
+    caches[VERSION_CACHE_ALIAS].set(key, version)
+    return version
+
+
+def get_bank_version():
+    """
+    Get the current question bank version.
+
+    Returns:
+        int: Current bank version
+    """
+    return get_version(BANK_VERSION_KEY)
+
+
+async def aget_bank_version():
+    """Async version of ``get_bank_version``."""
+    return await aget_version(BANK_VERSION_KEY)
+
+
+def bump_bank_version():
+    """
+    Invalidate every snapshot, in every process, by moving the bank version.
+
+    Returns:
+        int: The new bank version
+    """
+    return bump_version(BANK_VERSION_KEY)
+
+
+def get_question_bank():
+    """
+    Get the ordered question bank snapshot for the current version.
+
+    The bank is reloaded with a single query only when the version has
+    moved since the last load in this process.
+
+    Returns:
+        QuestionBank: Immutable snapshot of all questions in display order
+    """
+    global _snapshot
+
+    version = get_bank_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _snapshot_lock:
+        # Another thread may have reloaded while we waited for the lock
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != version:
+            # The version is read before the query, so a change racing the
+            # load bumps it again and the next request reloads.
+            snapshot = QuestionBank(version, Question.objects.all())
+            _snapshot = snapshot
+    return snapshot
+
+
+async def aget_question_bank():
+    """
+    Async version of ``get_question_bank``.
+
+    The reload runs without holding the lock (it would block the event
+    loop while the query is awaited); concurrent reloads of the same
+    version are harmless, the first one installed wins.
+
+    Returns:
+        QuestionBank: Immutable snapshot of all questions in display order
+    """
+    global _snapshot
+
+    version = await aget_bank_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    loaded = QuestionBank(version, [question async for question in Question.objects.all()])
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = _snapshot = loaded
+    return snapshot
+
+
+def get_bank_state():
+    """
+    Get the last modification time and size of the question bank.
+
+    Both are read with one aggregate query per bank version and cached.
+    Unlike the version number they are derived from the rows themselves,
+    so every process computes the same values - which makes them suitable
+    for HTTP validators (see ``conditional.py``).
+
+    Returns:
+        tuple: ``(last_modified, count)``; last_modified is None for an
+        empty bank
+    """
+    key = BANK_STATE_KEY.format(version=get_bank_version())
+    state = cache.get(key)
+    if state is None:
+        row = Question.objects.order_by().aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        state = (row['last_modified'], row['count'])
+        cache.set(key, state)
+    return state
+
+
+async def aget_bank_state():
+    """Async version of ``get_bank_state``."""
+    key = BANK_STATE_KEY.format(version=await aget_bank_version())
+    state = await cache.aget(key)
+    if state is None:
+        row = await Question.objects.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('id'))
+        state = (row['last_modified'], row['count'])
+        await cache.aset(key, state)
+    return state
+
+
+def get_question_count():
+    """
+    Get the number of questions in the bank.
+
+    The count is cached per bank version, so it costs one query per
+    version instead of one per request.
+
+    Returns:
+        int: Number of questions
+    """
+    return get_bank_state()[1]
+
+
+async def aget_question_count():
+    """Async version of ``get_question_count``."""
+    return (await aget_bank_state())[1]
+
+
+def _window_queryset(cursor):
+    queryset = Question.objects.only(*QUESTION_FIELDS).order_by('order', 'id')
+    if cursor is not None:
+        order, pk = cursor
+        queryset = queryset.filter(Q(order__gt=order) | Q(order=order, id__gt=pk))
+    return queryset[:2]
+
+
+def fetch_question_window(cursor=None):
+    """
+    Get the current and next question after a keyset cursor.
+
+    Small banks are served from the in-process snapshot. Larger banks are
+    read with a single ``(order, id)`` keyset query using the ``order``
+    index and loading only the columns needed to render and grade.
+
+    Args:
+        cursor (tuple): ``(order, id)`` of the last answered question,
+            or None when the quiz has just started
+
+    Returns:
+        tuple: ``(current, next)`` questions; either may be None
+    """
+    snapshot_max = getattr(settings, 'QUIZ_BANK_SNAPSHOT_MAX', DEFAULT_SNAPSHOT_MAX)
+    if get_question_count() <= snapshot_max:
+        window = get_question_bank().window(cursor)
+    else:
+        window = tuple(_window_queryset(cursor))
+
+    current = window[0] if window else None
+    upcoming = window[1] if len(window) > 1 else None
+    return current, upcoming
+
+
+async def afetch_question_window(cursor=None):
+    """Async version of ``fetch_question_window``."""
+    snapshot_max = getattr(settings, 'QUIZ_BANK_SNAPSHOT_MAX', DEFAULT_SNAPSHOT_MAX)
+    if await aget_question_count() <= snapshot_max:
+        window = (await aget_question_bank()).window(cursor)
+    else:
+        window = [question async for question in _window_queryset(cursor)]
+
+    current = window[0] if window else None
+    upcoming = window[1] if len(window) > 1 else None
+    return current, upcoming
+
+
+def get_questions(question_ids):
+    """
+    Get questions by ID, in the given order.
+
+    Served from the snapshot for small banks, with one ``in_bulk`` query
+    loading only the rendering/grading columns otherwise.
+
+    Args:
+        question_ids (list): Question IDs (a handful - one page of a quiz)
+
+    Returns:
+        list: Question per ID, None for IDs that no longer exist
+    """
+    snapshot_max = getattr(settings, 'QUIZ_BANK_SNAPSHOT_MAX', DEFAULT_SNAPSHOT_MAX)
+    if get_question_count() <= snapshot_max:
+        questions = get_question_bank().by_id
+    else:
+        questions = Question.objects.only(*QUESTION_FIELDS).in_bulk(question_ids)
+    return [questions.get(pk) for pk in question_ids]
+
+
+async def aget_questions(question_ids):
+    """Async version of ``get_questions``."""
+    snapshot_max = getattr(settings, 'QUIZ_BANK_SNAPSHOT_MAX', DEFAULT_SNAPSHOT_MAX)
+    if await aget_question_count() <= snapshot_max:
+        questions = (await aget_question_bank()).by_id
+    else:
+        questions = await Question.objects.only(*QUESTION_FIELDS).ain_bulk(question_ids)
+    return [questions.get(pk) for pk in question_ids]
@@ -0,0 +1,340 @@
+"""
+Quiz Load Benchmark
+===================
+Concurrent load test of the form-driven quiz flow.
+
+M simulated players run in threads, each with its own Django test
+client, and repeatedly play ``GET /quiz/`` -> N answer POSTs ->
+``GET /results/``. Requests go through the full middleware stack and
+URL routing into a throw-away SQLite database seeded with banks of
+increasing size. Per-request query counts and saved session sizes are
+read from the ``Server-Timing`` header of ``PerformanceMiddleware``.
+
+Runs can use the SQLite production profile (``database.py``, with the
+read-only replica of ``routers.py``) or plain SQLite defaults, to compare
+throughput under concurrent writers. The
+test client never closes connections between requests, so without
+persistent connections (``CONN_MAX_AGE = 0``) each player closes its
+connection after every request, as Django would.
+
+The report is plain JSON, so successive runs can be diffed to catch
+regressions. ``manage.py bench_quiz`` is the command-line entry point.
+"""
+
+import math
+import platform
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from .importers import import_questions
+from .models import Question
+from .routers import REPLICA_DB_ALIAS, replica_enabled
+
+DEFAULT_BANK_SIZES = (10, 1000, 100000)
+
+# Request kinds of one attempt, in order
+STEPS = ('start', 'answer', 'results')
+
+# SQLite profiles: the production profile, and SQLite/Django defaults
+SQLITE_PROFILES = ('tuned', 'untuned')
+
+_QUESTION_ID = re.compile(r'name="question_id" value="(\d+)"')
+_ANSWER = re.compile(r'name="answer" value="([^"]+)"')
+_TIMING_ENTRY = re.compile(r'(\w+)(?:;dur=([\d.]+))?(?:;desc="([^"]*)")?')
+
+
+def seed_bank(size):
+    """
+    Grow the question bank to ``size`` questions through the importer.
+
+    Banks are seeded in increasing order, so each run only imports the
+    questions it adds to the previous bank.
+
+    Args:
+        size (int): Number of questions the bank should hold
+    """
+    existing = Question.objects.count()
+
+    def lines():
+        yield 'text,question_type,option_a,option_b,option_c,option_d,correct_answer\r\n'
+        for number in range(existing, size):
+            if number % 2:
+                yield f'سؤال تجريبي {number},TF,,,,,{"True" if number % 3 else "False"}\r\n'
+            else:
+                yield f'سؤال تجريبي {number},MCQ,أ,ب,ج,د,{"ABCD"[number % 4]}\r\n'
+
+    if size > existing:
+        import_questions(lines(), 'csv')
+
+
+@contextmanager
+def sqlite_profile(name):
+    """
+    Run the block with the tuned or the untuned SQLite profile.
+
+    Applies to connections opened inside the block, so enter it before
+    creating the benchmark database.
+
+    Args:
+        name (str): 'tuned' or 'untuned'
+    """
+    settings_dicts = [connections[alias].settings_dict for alias in (DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS)
+                      if alias in connections]
+    saved = [settings_dict['CONN_MAX_AGE'] for settings_dict in settings_dicts]
+    tuned = name == 'tuned'
+    for settings_dict in settings_dicts:
+        # Persistent connections, or one connection per request
+        settings_dict['CONN_MAX_AGE'] = None if tuned else 0
+    try:
+        # The read-only replica needs the WAL journal of the tuned profile
+        with override_settings(QUIZ_SQLITE_TUNING=tuned, QUIZ_READ_REPLICA=tuned):
+            yield
+    finally:
+        for settings_dict, conn_max_age in zip(settings_dicts, saved):
+            settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+
+@contextmanager
+def replica_of(settings_dict):
+    """
+    Point the read-only replica alias at another database file.
+
+    Args:
+        settings_dict (dict): Settings of the primary, e.g. of the
+            benchmark database once created
+    """
+    if REPLICA_DB_ALIAS not in connections:
+        yield
+        return
+    replica = connections[REPLICA_DB_ALIAS]
+    saved = replica.settings_dict['NAME']
+    replica.close()
+    replica.settings_dict['NAME'] = f"file:{settings_dict['NAME']}?mode=ro"
+    try:
+        yield
+    finally:
+        replica.close()
+        replica.settings_dict['NAME'] = saved
+
+
+def parse_server_timing(value):
+    """
+    Parse a ``Server-Timing`` header.
+
+    Args:
+        value (str): Header value (may be None)
+
+    Returns:
+        dict: Entry name -> ``(duration_ms or None, description or None)``
+    """
+    entries = {}
+    for part in (value or '').split(','):
+        match = _TIMING_ENTRY.match(part.strip())
+        if match:
+            name, duration, desc = match.groups()
+            entries[name] = (float(duration) if duration else None, desc)
+    return entries
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values (list): Sorted values
+        fraction (float): Percentile as a fraction (0.95 for p95)
+
+    Returns:
+        float: The percentile, or None for no values
+    """
+    if not values:
+        return None
+    rank = max(math.ceil(fraction * len(values)) - 1, 0)
+    return round(values[min(rank, len(values) - 1)], 3)
+
+
+class Recorder:
+    """
+    Collects per-request measurements from every player thread.
+
+    Attributes:
+        samples (list): ``(step, latency_ms, queries, session_bytes)`` tuples
+        errors (list): Descriptions of failed requests
+        close_connections (bool): Close the thread's connections after
+            each request (no persistent connections)
+    """
+
+    def __init__(self, close_connections=False):
+        self.samples = []
+        self.errors = []
+        self.close_connections = close_connections
+
+    def request(self, step, method, path, data=None):
+        start = time.perf_counter()
+        response = method(path, data, secure=True)
+        if self.close_connections:
+            connections.close_all()
+        latency = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            self.errors.append(f"{step} {path}: HTTP {response.status_code}")
+        timing = parse_server_timing(response.get('Server-Timing'))
+        queries = int(timing.get('db', (None, '0'))[1] or 0)
+        session_bytes = int(timing.get('session', (None, '0'))[1] or 0)
+        self.samples.append((step, latency, queries, session_bytes))
+        return response
+
+
+def play_attempt(client, recorder, answers, rng):
+    """
+    Play one attempt: start, answer up to ``answers`` questions, results.
+
+    Args:
+        client (Client): The player's test client
+        recorder (Recorder): Where measurements go
+        answers (int): Maximum number of answer POSTs
+        rng (Random): Source of the chosen answers
+    """
+    response = recorder.request('start', client.get, '/quiz/')
+    for _ in range(answers):
+        if response.status_code != 200:
+            break
+        page = response.content.decode()
+        question_id = _QUESTION_ID.search(page)
+        options = _ANSWER.findall(page)
+        if question_id is None or not options:
+            break
+        response = recorder.request('answer', client.post, '/quiz/', {
+            'question_id': question_id.group(1),
+            'answer': rng.choice(options),
+        })
+    recorder.request('results', client.get, '/results/')
+
+
+def _summarize(samples):
+    latencies = sorted(sample[1] for sample in samples)
+    count = len(samples)
+    return {
+        'requests': count,
+        'latency_ms': {
+            'mean': round(sum(latencies) / count, 3) if count else None,
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+        },
+        'queries_per_request': round(sum(s[2] for s in samples) / count, 3) if count else None,
+        'session_bytes_per_request': round(sum(s[3] for s in samples) / count, 1) if count else None,
+    }
+
+
+def run_load(bank_size, players, attempts, answers, seed=0):
+    """
+    Run the concurrent quiz flow against the current bank.
+
+    Args:
+        bank_size (int): Size of the seeded bank (reported only)
+        players (int): Concurrent player threads
+        attempts (int): Attempts played by each player
+        answers (int): Answer POSTs per attempt (fewer if the quiz is shorter)
+        seed (int): Seed of the players' answer choices
+
+    Returns:
+        dict: Report of the run
+    """
+    close_connections = connections[DEFAULT_DB_ALIAS].settings_dict['CONN_MAX_AGE'] == 0
+
+    # Warm-up attempt: loads snapshots and caches for this bank version
+    play_attempt(Client(), Recorder(close_connections), answers, random.Random(seed))
+
+    recorder = Recorder(close_connections)
+    barrier = threading.Barrier(players + 1)
+
+    def player(number):
+        client = Client()
+        rng = random.Random(seed * 1000 + number)
+        try:
+            barrier.wait()
+            for _ in range(attempts):
+                play_attempt(client, recorder, answers, rng)
+        except Exception as exc:
+            recorder.errors.append(f"player {number}: {exc!r}")
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=player, args=(number,)) for number in range(players)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    report = {
+        'bank_size': bank_size,
+        'players': players,
+        'attempts_per_player': attempts,
+        'answers_per_attempt': answers,
+        'persistent_connections': not close_connections,
+        'read_replica': replica_enabled(),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(recorder.samples) / elapsed, 1) if elapsed else None,
+        'attempts_per_s': round(players * attempts / elapsed, 2) if elapsed else None,
+        'errors': len(recorder.errors),
+        'error_samples': recorder.errors[:10],
+    }
+    report.update(_summarize(recorder.samples))
+    report['steps'] = {
+        step: _summarize([sample for sample in recorder.samples if sample[0] == step])
+        for step in STEPS
+    }
+    return report
+
+
+def run_benchmark(bank_sizes=DEFAULT_BANK_SIZES, players=8, attempts=3, answers=20, seed=0, progress=None,
+                  profile=None):
+    """
+    Seed each bank size in turn and load-test it.
+
+    Must run against a throw-away database with ``PerformanceMiddleware``
+    enabled and ``Server-Timing`` headers on (``bench_quiz`` sets this up).
+
+    Args:
+        bank_sizes (iterable): Bank sizes, seeded in increasing order
+        players (int): Concurrent player threads
+        attempts (int): Attempts per player and bank
+        answers (int): Answer POSTs per attempt
+        seed (int): Seed of the players' answer choices
+        progress (callable): Optional ``progress(message)`` callback
+        profile (str): SQLite profile in use, recorded in each run report
+
+    Returns:
+        dict: ``{"environment": {...}, "runs": [report, ...]}``
+    """
+    runs = []
+    for size in sorted(bank_sizes):
+        if progress:
+            progress(f"Seeding {size} questions")
+        seed_bank(size)
+        if progress:
+            progress(f"Running {players} players x {attempts} attempts on {size} questions")
+        report = run_load(size, players, attempts, answers, seed)
+        if profile:
+            report['sqlite_profile'] = profile
+        runs.append(report)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+        },
+        'runs': runs,
+    }
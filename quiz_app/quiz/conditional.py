@@ -0,0 +1,96 @@
+"""
+HTTP Conditional Caching
+========================
+ETag and Last-Modified validators for ``django.views.decorators.http.condition``.
+
+Validators are derived from the question bank state (latest ``updated_at``
+plus question count, cached per bank version), so a repeat visit whose
+``If-None-Match``/``If-Modified-Since`` still matches is answered with a
+304 before the view runs any query or renders any template.
+"""
+
+import hashlib
+
+from django.conf import settings
+
+from .bank import aget_bank_state, get_bank_state
+from .models import QuizAttempt
+
+
+def _etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def bank_etag(request, *args, **kwargs):
+    """
+    ETag of pages that only change with the question bank.
+
+    Returns:
+        str: Hash of the bank's last modification time and size
+    """
+    return _etag('bank', *get_bank_state())
+
+
+def bank_last_modified(request, *args, **kwargs):
+    """
+    Last-Modified of pages that only change with the question bank.
+
+    Returns:
+        datetime: Latest question ``updated_at`` (None for an empty bank)
+    """
+    return get_bank_state()[0]
+
+
+async def abank_validators():
+    """
+    ``bank_etag`` and ``bank_last_modified`` for async views.
+
+    Returns:
+        tuple: ``(etag, last_modified)``
+    """
+    state = await aget_bank_state()
+    return _etag('bank', *state), state[0]
+
+
+def _latest_attempt_time(request):
+    # Newest attempt by primary key (index seek, no scan of completed_at),
+    # read once per request for both validators
+    if not hasattr(request, '_quiz_latest_attempt'):
+        request._quiz_latest_attempt = (
+            QuizAttempt.objects.order_by('-id').values_list('completed_at', flat=True).first()
+        )
+    return request._quiz_latest_attempt
+
+
+def manager_etag(request, *args, **kwargs):
+    """
+    ETag of the manager question list.
+
+    Besides the bank state it covers the latest stored attempt (the list
+    shows per-question statistics) and the CSRF cookie, since the page
+    embeds a CSRF token that must stay valid when the browser reuses it.
+    No ETag is produced for visitors without manager access.
+
+    Returns:
+        str: ETag, or None to skip conditional handling
+    """
+    if not request.session.get('manager_access'):
+        return None
+    return _etag(
+        'manager', *get_bank_state(), _latest_attempt_time(request),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    )
+
+
+def manager_last_modified(request, *args, **kwargs):
+    """
+    Last-Modified of the manager question list.
+
+    Returns:
+        datetime: Latest question edit or stored attempt, or None to skip
+        conditional handling
+    """
+    if not request.session.get('manager_access'):
+        return None
+    stamps = [stamp for stamp in (get_bank_state()[0], _latest_attempt_time(request)) if stamp]
+    return max(stamps, default=None)
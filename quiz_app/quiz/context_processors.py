@@ -0,0 +1,23 @@
+"""
+Template Context Processors
+===========================
+Values made available to every template.
+"""
+
+from django.conf import settings
+
+
+def fragment_cache(request):
+    """
+    Expose the fragment cache timeout to ``{% cache %}`` tags.
+
+    The timeout is 0 (fragments expire immediately) when the production
+    template mode is off, so template edits show up during development.
+
+    Args:
+        request (HttpRequest): The HTTP request object
+
+    Returns:
+        dict: ``FRAGMENT_CACHE_TIMEOUT`` in seconds
+    """
+    return {'FRAGMENT_CACHE_TIMEOUT': getattr(settings, 'QUIZ_FRAGMENT_CACHE_TIMEOUT', 0)}
@@ -0,0 +1,119 @@
+"""
+SQLite Production Profile
+=========================
+Connection tuning and lock handling for SQLite deployments.
+
+With ``QUIZ_SQLITE_TUNING = True`` every new SQLite connection is
+configured by ``configure_connection`` (hooked to ``connection_created``
+in ``signals.py``):
+
+- ``journal_mode=WAL``: readers no longer block on a writer and vice versa
+- ``synchronous=NORMAL``: fsync at checkpoints only (safe in WAL mode)
+- ``mmap_size`` / ``cache_size``: serve hot pages from memory
+- ``busy_timeout``: wait for a competing writer instead of failing at once
+
+Even with a busy timeout, SQLite fails immediately with "database is
+locked" when a read transaction must be upgraded to a write while another
+connection writes, because waiting could deadlock. ``retry_on_locked``
+retries such writes with exponential backoff. It is applied to session
+saves (``sessions.py``) and to storing completed attempts (``attempt.py``).
+"""
+
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+# PRAGMAs applied to each new connection by the production profile
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative: KiB, i.e. 64 MiB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 20 * 1000,  # milliseconds
+}
+
+# PRAGMAs that change the database file, skipped on read-only connections
+WRITER_PRAGMAS = frozenset({'journal_mode'})
+
+# Attempts and first backoff delay (seconds, doubled per retry) of locked writes
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.02
+
+
+def configure_connection(connection):
+    """
+    Apply ``SQLITE_PRAGMAS`` to a newly opened connection.
+
+    Executed on the raw DB-API connection, so the statements are not
+    logged or counted as queries of the request that opened it.
+
+    Args:
+        connection (BaseDatabaseWrapper): The new connection
+    """
+    if connection.vendor != 'sqlite' or not getattr(settings, 'QUIZ_SQLITE_TUNING', False):
+        return
+    read_only = 'mode=ro' in str(connection.settings_dict['NAME'])
+    for name, value in SQLITE_PRAGMAS.items():
+        # The journal mode is stored in the file - set by writers only
+        if not (read_only and name in WRITER_PRAGMAS):
+            connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked_error(exc):
+    """
+    Tell whether a database error is a transient SQLite lock conflict.
+
+    Args:
+        exc (Exception): The error raised
+
+    Returns:
+        bool: True for "database is locked" / "database table is locked"
+    """
+    return isinstance(exc, OperationalError) and 'locked' in str(exc)
+
+
+def retry_on_locked(func=None, *, using=DEFAULT_DB_ALIAS, retries=LOCK_RETRIES, backoff=LOCK_BACKOFF):
+    """
+    Retry a database write that failed because SQLite was locked.
+
+    The wrapped function must be safe to run again, i.e. open its own
+    transaction. Inside an enclosing ``atomic`` block the error is
+    re-raised at once, since that transaction has to be retried as a
+    whole by its owner.
+
+    Usage::
+
+        @retry_on_locked
+        def save(self): ...
+
+    Args:
+        func (callable): Function to wrap
+        using (str): Database alias the function writes to
+        retries (int): Retries after the first failed attempt
+        backoff (float): Delay before the first retry in seconds, doubled
+            for each further retry (with up to 50% random jitter)
+
+    Returns:
+        callable: The wrapped function
+    """
+    if func is None:
+        return functools.partial(retry_on_locked, using=using, retries=retries, backoff=backoff)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        delay = backoff
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if (attempt == retries or not is_locked_error(exc)
+                        or connections[using].in_atomic_block):
+                    raise
+            time.sleep(delay * (1 + random.random() / 2))
+            delay *= 2
+
+    return wrapper
@@ -0,0 +1,94 @@
+"""
+Data Export
+===========
+Streaming export of the question bank and the attempt history.
+
+Rows are read with ``QuerySet.iterator(chunk_size=...)`` and formatted one
+line at a time by generators, so neither the manager export endpoint nor
+``manage.py export_questions`` ever materializes a full queryset. The
+question columns match what ``import_questions`` reads back.
+"""
+
+import csv
+import json
+
+from .models import AttemptAnswer, Question
+
+# Rows fetched from the database per round-trip
+DEFAULT_CHUNK_SIZE = 2000
+
+SUPPORTED_FORMATS = ('csv', 'jsonl')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Exported columns per dataset (lookups into the model)
+DATASETS = {
+    'questions': (
+        Question,
+        ('id', 'order', 'text', 'question_type',
+         'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer'),
+    ),
+    'attempts': (
+        AttemptAnswer,
+        ('attempt_id', 'attempt__started_at', 'attempt__completed_at',
+         'attempt__score', 'attempt__total', 'position', 'question_id',
+         'answer', 'is_correct', 'time_ms'),
+    ),
+}
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    # Datetimes are the only non-JSON values in the exported columns
+    return value.isoformat()
+
+
+def iter_rows(dataset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream the rows of a dataset in primary-key order.
+
+    Args:
+        dataset (str): ``'questions'`` or ``'attempts'``
+        chunk_size (int): Rows fetched per database round-trip
+
+    Returns:
+        tuple: ``(columns, rows)`` where rows is an iterator of tuples
+    """
+    model, fields = DATASETS[dataset]
+    queryset = model.objects.order_by('pk').values_list(*fields)
+    # Column names without the relation prefix
+    columns = tuple(field.replace('attempt__', '') for field in fields)
+    return columns, queryset.iterator(chunk_size=chunk_size)
+
+
+def iter_export(dataset, file_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream a dataset as CSV or JSON Lines text.
+
+    Args:
+        dataset (str): ``'questions'`` or ``'attempts'``
+        file_format (str): ``'csv'`` or ``'jsonl'``
+        chunk_size (int): Rows fetched per database round-trip
+
+    Yields:
+        str: One line of output at a time (header first for CSV)
+    """
+    columns, rows = iter_rows(dataset, chunk_size)
+
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default) + '\n'
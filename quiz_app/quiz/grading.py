@@ -0,0 +1,173 @@
+"""
+Answer Grading
+==============
+Batch grading engine shared by every path that scores answers.
+
+An ``AnswerKey`` holds the correct answers of a set of questions as an
+array of small integer codes, normalized exactly like
+``Question.is_correct`` (stripped, case-insensitive). Answer sheets are
+encoded the same way and compared against the key in one vectorized
+pass - with NumPy when it is installed, in pure Python otherwise - so a
+single sheet and thousands of stored sheets go through the same code.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Code of an empty answer or one no question in the key expects
+NO_MATCH = -1
+
+# Key code of a question missing from the key (never matches an answer)
+UNKNOWN_QUESTION = -2
+
+
+def normalize_answer(answer):
+    """
+    Normalize an answer for comparison.
+
+    Args:
+        answer: The raw answer (None for no answer)
+
+    Returns:
+        str: Stripped, lower-cased answer ('' for no answer)
+    """
+    if answer is None:
+        return ''
+    return str(answer).strip().lower()
+
+
+class GradeResult:
+    """
+    Grade of one answer sheet.
+
+    Attributes:
+        score (int): Number of correct answers
+        correct (list): Correctness of each sheet entry, in sheet order
+    """
+
+    __slots__ = ('score', 'correct')
+
+    def __init__(self, score, correct):
+        self.score = score
+        self.correct = correct
+
+    def __repr__(self):
+        return f"GradeResult(score={self.score}, correct={self.correct})"
+
+
+class AnswerKey:
+    """
+    Precomputed, normalized answer key.
+
+    Attributes:
+        index (dict): question_id -> position in the key
+        codes (list or ndarray): Integer code of each correct answer
+        vocabulary (dict): Normalized answer -> integer code
+    """
+
+    def __init__(self, question_ids, correct_answers):
+        """
+        Args:
+            question_ids (iterable): Question IDs
+            correct_answers (iterable): Correct answer of each question
+        """
+        self.vocabulary = {}
+        self.index = {}
+        codes = []
+        for question_id, answer in zip(question_ids, correct_answers):
+            self.index[question_id] = len(codes)
+            normalized = normalize_answer(answer)
+            codes.append(self.vocabulary.setdefault(normalized, len(self.vocabulary)))
+        # Trailing sentinel so unknown questions (index -1) never match
+        codes.append(UNKNOWN_QUESTION)
+        self.codes = np.array(codes, dtype=np.int32) if np is not None else codes
+
+    @classmethod
+    def from_questions(cls, questions):
+        """
+        Build a key from Question objects (only ``id`` and
+        ``correct_answer`` are read).
+
+        Args:
+            questions (iterable): Question objects
+
+        Returns:
+            AnswerKey: The answer key
+        """
+        questions = list(questions)
+        return cls((q.id for q in questions), (q.correct_answer for q in questions))
+
+    def __len__(self):
+        return len(self.index)
+
+    def encode(self, answer):
+        """
+        Get the integer code of a submitted answer.
+
+        Args:
+            answer: The raw answer
+
+        Returns:
+            int: Code of the answer, or NO_MATCH if it cannot be correct
+        """
+        normalized = normalize_answer(answer)
+        if not normalized:
+            return NO_MATCH
+        return self.vocabulary.get(normalized, NO_MATCH)
+
+    def grade(self, sheet):
+        """
+        Grade one answer sheet.
+
+        Args:
+            sheet (iterable): ``(question_id, answer)`` pairs
+
+        Returns:
+            GradeResult: Score and per-entry correctness
+        """
+        return self.grade_many([sheet])[0]
+
+    def grade_many(self, sheets):
+        """
+        Grade many answer sheets in one pass.
+
+        All entries are flattened into two code arrays (key position and
+        answer code) and compared at once; scores are summed per sheet.
+        The cost is linear in the number of answers, independent of the
+        number of questions in the key.
+
+        Args:
+            sheets (iterable): Sheets, each an iterable of
+                ``(question_id, answer)`` pairs
+
+        Returns:
+            list: GradeResult for each sheet, in order
+        """
+        positions = []
+        answers = []
+        lengths = []
+        for sheet in sheets:
+            count = 0
+            for question_id, answer in sheet:
+                positions.append(self.index.get(question_id, -1))
+                answers.append(self.encode(answer))
+                count += 1
+            lengths.append(count)
+
+        if np is not None:
+            matches = (
+                self.codes[np.array(positions, dtype=np.int64)] == np.array(answers, dtype=np.int32)
+            ).tolist() if positions else []
+        else:
+            codes = self.codes
+            matches = [codes[position] == answer for position, answer in zip(positions, answers)]
+
+        results = []
+        start = 0
+        for count in lengths:
+            correct = matches[start:start + count]
+            results.append(GradeResult(sum(correct), correct))
+            start += count
+        return results
@@ -0,0 +1,162 @@
+"""
+Question Import
+===============
+Streaming bulk import of questions from CSV or JSON Lines files.
+
+Rows are read lazily through generators, validated with the same rules as
+the manager page (``validation.py``), and inserted with ``bulk_create`` in
+fixed-size chunks, one transaction per chunk. Each chunk is numbered with
+consecutive ``order`` values after the current maximum, allocated inside
+its transaction under ``QuestionQuerySet.lock_order`` like a manager add,
+so concurrent imports and adds never share an order. Memory use is bounded by the
+chunk size whatever the size of the file.
+
+Expected columns/keys: ``text``, ``question_type`` (MCQ or TF),
+``option_a``..``option_d`` (MCQ only) and ``correct_answer``.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .bank import bump_bank_version
+from .database import retry_on_locked
+from .models import Question
+from .search import index_questions
+from .validation import clean_question_data
+
+# Questions inserted per bulk_create/transaction
+DEFAULT_BATCH_SIZE = 1000
+
+SUPPORTED_FORMATS = ('csv', 'jsonl')
+
+
+class ImportResult:
+    """
+    Summary of an import run.
+
+    Attributes:
+        created (int): Number of questions inserted
+        errors (list): ``(line_number, message)`` for each rejected row
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+
+def read_csv_rows(stream):
+    """
+    Yield ``(line_number, row)`` pairs from a CSV file with a header row.
+
+    Args:
+        stream (file): Text stream opened with ``newline=''``
+
+    Yields:
+        tuple: Line number and dict of column values
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl_rows(stream):
+    """
+    Yield ``(line_number, row)`` pairs from a JSON Lines file.
+
+    Blank lines are skipped; a line that is not a JSON object is yielded
+    as a ``ValueError`` so it is reported like any other invalid row.
+
+    Args:
+        stream (file): Text stream
+
+    Yields:
+        tuple: Line number and dict of values (or ValueError)
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, ValueError(f"Invalid JSON: {exc.msg}")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ValueError("Each line must be a JSON object.")
+            continue
+        yield line_number, row
+
+
+READERS = {
+    'csv': read_csv_rows,
+    'jsonl': read_jsonl_rows,
+}
+
+
+@retry_on_locked
+def insert_batch(questions):
+    """
+    Append a chunk of questions after the current last question.
+
+    Args:
+        questions (list): Unsaved Question objects, in file order
+    """
+    with transaction.atomic():
+        Question.objects.lock_order()
+        first_order = Question.objects.next_order()
+        for offset, question in enumerate(questions):
+            question.pk = None  # IDs of a rolled-back attempt are not ours
+            question.order = first_order + offset
+        Question.objects.bulk_create(questions)
+        index_questions(questions)
+
+
+def import_questions(stream, file_format, batch_size=DEFAULT_BATCH_SIZE, result=None):
+    """
+    Import questions from a CSV or JSONL stream.
+
+    Invalid rows are skipped and reported in the result; valid rows are
+    appended after the current last question in file order.
+
+    Args:
+        stream (file): Text stream to read
+        file_format (str): ``'csv'`` or ``'jsonl'``
+        batch_size (int): Questions per bulk_create/transaction
+        result (ImportResult): Optional result object to fill in
+
+    Returns:
+        ImportResult: Counts of created questions and rejected rows
+    """
+    result = result or ImportResult()
+
+    def valid_questions():
+        for line_number, row in READERS[file_format](stream):
+            if isinstance(row, Exception):
+                result.errors.append((line_number, str(row)))
+                continue
+            try:
+                fields = clean_question_data(row)
+            except ValidationError as exc:
+                result.errors.append((line_number, ' '.join(exc.messages)))
+                continue
+            yield Question(**fields)
+
+    questions = valid_questions()
+    try:
+        while True:
+            batch = list(islice(questions, batch_size))
+            if not batch:
+                break
+            insert_batch(batch)
+            result.created += len(batch)
+    finally:
+        # bulk_create sends no post_save signals - the search index is
+        # updated per chunk above, caches are invalidated once
+        if result.created:
+            bump_bank_version()
+
+    return result
@@ -0,0 +1,169 @@
+"""
+Score Histogram and Leaderboard
+===============================
+Percentile and top-N lookups for the results page.
+
+Attempts are only ranked against attempts of the same quiz, identified
+by a quiz key: ``'bank'`` for the whole bank, ``'sample'`` for random
+quizzes and ``'set:<id>'`` for a question set. A 10-question set is
+therefore never ranked against a 10-question random draw.
+
+Every completed attempt increments one ScoreBucket row, so the histogram
+of a quiz with N questions has exactly N + 1 buckets. A percentile is
+computed by walking those buckets - O(N) in the number of possible
+scores, not in the number of attempts. The histogram and the leaderboard
+are cached per bank version, quiz key and question total, with a short
+timeout to bound staleness across workers.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .bank import get_bank_version
+from .models import QuizAttempt, ScoreBucket
+
+# Quiz keys of full-bank and sampled attempts, and of question sets
+BANK_QUIZ = 'bank'
+SAMPLE_QUIZ = 'sample'
+SET_QUIZ = 'set:{set_id}'
+
+# Cache key templates for the histogram and leaderboard
+HISTOGRAM_KEY = 'quiz:histogram:{version}:{quiz}:{total}'
+LEADERBOARD_KEY = 'quiz:leaderboard:{version}:{quiz}:{total}:{limit}'
+
+# Seconds a cached histogram or leaderboard may lag behind other workers
+CACHE_TIMEOUT = 60
+
+# Number of attempts shown on the leaderboard
+LEADERBOARD_SIZE = 10
+
+
+def get_quiz_key(quiz_set_id=None, sampled=False):
+    """
+    Get the key of the quiz an attempt is ranked in.
+
+    Args:
+        quiz_set_id (int): ID of the question set played, if any
+        sampled (bool): Whether the attempt is a random sample
+
+    Returns:
+        str: ``'set:<id>'``, ``'sample'`` or ``'bank'``
+    """
+    if quiz_set_id is not None:
+        return SET_QUIZ.format(set_id=quiz_set_id)
+    return SAMPLE_QUIZ if sampled else BANK_QUIZ
+
+
+def _histogram_key(quiz_key, total):
+    return HISTOGRAM_KEY.format(version=get_bank_version(), quiz=quiz_key, total=total)
+
+
+def _leaderboard_key(quiz_key, total, limit):
+    return LEADERBOARD_KEY.format(version=get_bank_version(), quiz=quiz_key, total=total, limit=limit)
+
+
+def get_histogram(quiz_key, total):
+    """
+    Get the score histogram of a quiz with ``total`` questions.
+
+    Args:
+        quiz_key (str): Quiz key (see ``get_quiz_key``)
+        total (int): Number of questions in the quiz
+
+    Returns:
+        list: Attempt count per score, indexed by score (length total + 1)
+    """
+    key = _histogram_key(quiz_key, total)
+    histogram = cache.get(key)
+    if histogram is None:
+        histogram = [0] * (total + 1)
+        buckets = ScoreBucket.objects.filter(quiz_key=quiz_key, total=total).values_list('score', 'count')
+        for score, count in buckets:
+            if score <= total:
+                histogram[score] = count
+        cache.set(key, histogram, CACHE_TIMEOUT)
+    return histogram
+
+
+def record_score(quiz_key, total, score):
+    """
+    Add a completed attempt to the score histogram of its quiz.
+
+    Must be called inside the transaction that saves the attempt. The
+    cached histogram is updated in place once the transaction commits.
+
+    Args:
+        quiz_key (str): Quiz key (see ``get_quiz_key``)
+        total (int): Number of questions in the quiz
+        score (int): Score of the attempt
+    """
+    ScoreBucket.objects.bulk_create([ScoreBucket(quiz_key=quiz_key, total=total, score=score)],
+                                    ignore_conflicts=True)
+    ScoreBucket.objects.filter(quiz_key=quiz_key, total=total, score=score).update(count=F('count') + 1)
+
+    def update_caches():
+        key = _histogram_key(quiz_key, total)
+        histogram = cache.get(key)
+        if histogram is not None and score < len(histogram):
+            histogram[score] += 1
+            cache.set(key, histogram, CACHE_TIMEOUT)
+
+        # Drop the cached leaderboard only if the new score makes it
+        key = _leaderboard_key(quiz_key, total, LEADERBOARD_SIZE)
+        leaderboard = cache.get(key)
+        if leaderboard is not None and (
+                len(leaderboard) < LEADERBOARD_SIZE or score > leaderboard[-1]['score']):
+            cache.delete(key)
+
+    transaction.on_commit(update_caches)
+
+
+def get_percentile(quiz_key, score, total):
+    """
+    Get the percentile rank of a score among all attempts of the quiz.
+
+    Ties count half, so the percentile of a score everyone shares is 50.
+
+    Args:
+        quiz_key (str): Quiz key (see ``get_quiz_key``)
+        score (int): The score to rank
+        total (int): Number of questions in the quiz
+
+    Returns:
+        float: Percentile rank (0-100), or None if there are no attempts
+    """
+    histogram = get_histogram(quiz_key, total)
+    attempts = sum(histogram)
+    if not attempts:
+        return None
+    below = sum(histogram[:score])
+    equal = histogram[score] if score < len(histogram) else 0
+    return (below + equal / 2) / attempts * 100
+
+
+def get_leaderboard(quiz_key, total, limit=LEADERBOARD_SIZE):
+    """
+    Get the best attempts of a quiz with ``total`` questions.
+
+    Uses the ``(quiz_key, total, -score, completed_at)`` index, so only
+    ``limit`` rows are read.
+
+    Args:
+        quiz_key (str): Quiz key (see ``get_quiz_key``)
+        total (int): Number of questions in the quiz
+        limit (int): Number of attempts to return
+
+    Returns:
+        list: Dicts with ``id``, ``score`` and ``completed_at``, best first
+    """
+    key = _leaderboard_key(quiz_key, total, limit)
+    leaderboard = cache.get(key)
+    if leaderboard is None:
+        leaderboard = list(
+            QuizAttempt.objects.filter(quiz_key=quiz_key, total=total)
+            .order_by('-score', 'completed_at')
+            .values('id', 'score', 'completed_at')[:limit]
+        )
+        cache.set(key, leaderboard, CACHE_TIMEOUT)
+    return leaderboard
@@ -0,0 +1,143 @@
+"""
+Benchmark Quiz
+==============
+Load-test the quiz flow with concurrent simulated players and report
+latency percentiles, throughput, queries and session bytes per request
+as JSON.
+
+Runs against a temporary SQLite database (created in a temporary
+directory and removed afterwards), never against the project database.
+
+``--sqlite-profile both`` runs the benchmark once with the SQLite
+production profile and once with plain SQLite defaults, each on a fresh
+database, to compare them under concurrent writers.
+
+Usage:
+    python manage.py bench_quiz
+    python manage.py bench_quiz --bank-sizes 10,1000 --players 16 -o bench.json
+    python manage.py bench_quiz --bank-sizes 1000 --answers 3 --sqlite-profile both
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from quiz.benchmark import DEFAULT_BANK_SIZES, SQLITE_PROFILES, replica_of, run_benchmark, sqlite_profile
+
+
+def _bank_sizes(value):
+    try:
+        sizes = [int(size) for size in value.split(',') if size.strip()]
+    except ValueError:
+        raise CommandError(f"Invalid --bank-sizes: {value!r}")
+    if not sizes or min(sizes) < 1:
+        raise CommandError("--bank-sizes needs positive sizes")
+    return sizes
+
+
+class Command(BaseCommand):
+    help = "Load-test the quiz flow against a temporary database and report JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bank-sizes',
+            default=','.join(str(size) for size in DEFAULT_BANK_SIZES),
+            help="Comma-separated question bank sizes (default: %(default)s)",
+        )
+        parser.add_argument(
+            '--players',
+            type=int,
+            default=8,
+            help="Concurrent simulated players (default: 8)",
+        )
+        parser.add_argument(
+            '--attempts',
+            type=int,
+            default=3,
+            help="Attempts played by each player per bank size (default: 3)",
+        )
+        parser.add_argument(
+            '--answers',
+            type=int,
+            default=20,
+            help="Answers submitted per attempt (default: 20)",
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help="Seed of the players' answer choices (default: 0)",
+        )
+        parser.add_argument(
+            '--sqlite-profile',
+            choices=SQLITE_PROFILES + ('both',),
+            default='tuned',
+            help="SQLite connection profile to benchmark (default: tuned)",
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help="Output file (default: standard output)",
+        )
+
+    def handle(self, *args, **options):
+        bank_sizes = _bank_sizes(options['bank_sizes'])
+        if options['players'] < 1 or options['attempts'] < 1 or options['answers'] < 1:
+            raise CommandError("--players, --attempts and --answers must be positive")
+        if connection.vendor != 'sqlite':
+            raise CommandError("bench_quiz only supports the SQLite backend")
+
+        profiles = SQLITE_PROFILES if options['sqlite_profile'] == 'both' else (options['sqlite_profile'],)
+        report = None
+        for profile in profiles:
+            result = self.run_profile(profile, bank_sizes, options)
+            if report is None:
+                report = result
+            else:
+                report['runs'].extend(result['runs'])
+
+        output = json.dumps(report, indent=2, ensure_ascii=False) + '\n'
+        if not options['output']:
+            sys.stdout.write(output)
+            return
+        try:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(output)
+        except OSError as exc:
+            raise CommandError(f"Cannot write {options['output']}: {exc}")
+
+    def run_profile(self, profile, bank_sizes, options):
+        """
+        Benchmark one SQLite profile on a fresh temporary database.
+
+        Returns:
+            dict: Report of ``run_benchmark``
+        """
+        workdir = tempfile.mkdtemp(prefix='bench_quiz_')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+        with sqlite_profile(profile):
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with replica_of(connection.settings_dict), override_settings(
+                    ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver'],
+                    QUIZ_METRICS_ENABLED=True,
+                    QUIZ_METRICS_SERVER_TIMING=True,
+                ):
+                    return run_benchmark(
+                        bank_sizes,
+                        players=options['players'],
+                        attempts=options['attempts'],
+                        answers=options['answers'],
+                        seed=options['seed'],
+                        progress=lambda message: self.stderr.write(f"[{profile}] {message}"),
+                        profile=profile,
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,57 @@
+"""
+Export Questions
+================
+Stream the question bank (or the attempt history) as CSV or JSON Lines.
+
+Usage:
+    python manage.py export_questions > questions.csv
+    python manage.py export_questions --format jsonl --output questions.jsonl
+    python manage.py export_questions --attempts --format jsonl
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.exporters import DEFAULT_CHUNK_SIZE, SUPPORTED_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream the question bank or attempt history to CSV or JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=SUPPORTED_FORMATS,
+            default='csv',
+            help="Output format (default: csv)",
+        )
+        parser.add_argument(
+            '--attempts',
+            action='store_true',
+            help="Export the attempt answer history instead of the questions",
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help="Output file (default: standard output)",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"Rows fetched per database round-trip (default: {DEFAULT_CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        dataset = 'attempts' if options['attempts'] else 'questions'
+        lines = iter_export(dataset, options['format'], options['chunk_size'])
+
+        if not options['output']:
+            sys.stdout.writelines(lines)
+            return
+
+        try:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as stream:
+                stream.writelines(lines)
+        except OSError as exc:
+            raise CommandError(f"Cannot write {options['output']}: {exc}")
@@ -0,0 +1,60 @@
+"""
+Import Questions
+================
+Bulk-load questions from a CSV or JSON Lines file.
+
+Usage:
+    python manage.py import_questions questions.csv
+    python manage.py import_questions questions.jsonl --batch-size 5000
+    cat questions.jsonl | python manage.py import_questions - --format jsonl
+"""
+
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.importers import DEFAULT_BATCH_SIZE, SUPPORTED_FORMATS, ImportResult, import_questions
+
+
+class Command(BaseCommand):
+    help = "Stream questions from a CSV or JSONL file into the question bank."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for standard input")
+        parser.add_argument(
+            '--format',
+            choices=SUPPORTED_FORMATS,
+            help="File format (default: guessed from the file extension)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Questions inserted per transaction (default: {DEFAULT_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format']
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lower().lstrip('.')
+            file_format = {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(extension)
+            if file_format is None:
+                raise CommandError("Cannot guess the file format, use --format csv|jsonl.")
+
+        result = ImportResult()
+        if path == '-':
+            import_questions(sys.stdin, file_format, options['batch_size'], result)
+        else:
+            try:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    import_questions(stream, file_format, options['batch_size'], result)
+            except OSError as exc:
+                raise CommandError(f"Cannot read {path}: {exc}")
+
+        for line_number, message in result.errors:
+            self.stderr.write(f"Line {line_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} questions ({len(result.errors)} rows rejected)."
+        ))
@@ -0,0 +1,31 @@
+"""
+Rebuild Question Statistics
+===========================
+Recompute the QuestionStats rollup from the stored attempt answers.
+
+Usage:
+    python manage.py rebuild_question_stats [--batch-size 500]
+"""
+
+from django.core.management.base import BaseCommand
+
+from quiz.stats import rebuild_question_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute per-question statistics from stored attempt answers in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Number of questions aggregated per batch (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        for processed in rebuild_question_stats(batch_size=options['batch_size']):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{processed} questions processed")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {processed} questions."))
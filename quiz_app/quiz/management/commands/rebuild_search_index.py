@@ -0,0 +1,36 @@
+"""
+Rebuild Search Index
+====================
+Recreate the full-text question search index from the question table.
+
+Usage:
+    python manage.py rebuild_search_index [--batch-size 2000]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from quiz.search import REBUILD_BATCH_SIZE, create_index, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the full-text search index over question text (SQLite FTS5)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help=f"Number of questions indexed per batch (default: {REBUILD_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        if not create_index(connection):
+            raise CommandError("Full-text search needs SQLite with FTS5; searches use icontains instead.")
+
+        indexed = 0
+        with transaction.atomic():
+            for indexed in rebuild_index(connection, batch_size=options['batch_size']):
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{indexed} questions indexed")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} questions."))
@@ -0,0 +1,40 @@
+"""
+Re-score Attempts
+=================
+Re-grade every stored answer against the current correct answers.
+
+Usage:
+    python manage.py rescore_attempts [--question 12 --question 15] [--chunk-size 2000]
+"""
+
+from django.core.management.base import BaseCommand
+
+from quiz.rescoring import DEFAULT_CHUNK_SIZE, rescore_attempts
+
+
+class Command(BaseCommand):
+    help = "Re-grade stored attempt answers and fix scores, histogram and statistics."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--question',
+            type=int,
+            action='append',
+            dest='questions',
+            help="Only re-grade answers to this question ID (repeatable)",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"Answer rows per transaction (default: {DEFAULT_CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        checked = changed = 0
+        for checked, changed in rescore_attempts(options['questions'], options['chunk_size']):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{checked} answers checked, {changed} changed")
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-scored {checked} answers ({changed} changed)."
+        ))
@@ -0,0 +1,192 @@
+"""
+Performance Metrics
+===================
+In-process metric registry rendered in the Prometheus text format.
+
+``PerformanceMiddleware`` (``middleware.py``) records into the registry:
+
+- ``quiz_requests_total``: requests by view, method and status code
+- ``quiz_request_duration_seconds``: latency histogram per view
+- ``quiz_request_queries``: histogram of database queries per request
+- ``quiz_db_query_seconds_total``: time spent in database queries per view
+- ``quiz_template_render_seconds_total``: time spent rendering templates
+- ``quiz_session_save_bytes``: histogram of saved session payload sizes
+
+Each worker process keeps its own registry; scrape every worker (or sum
+across them) when running more than one.
+"""
+
+import bisect
+import threading
+from collections import defaultdict
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with labels.
+
+    Attributes:
+        name (str): Metric name
+        help (str): Description shown in the exposition
+        labels (tuple): Label names
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = defaultdict(int)
+
+    def inc(self, label_values=(), amount=1):
+        self.values[label_values] += amount
+
+    def samples(self):
+        for label_values, value in sorted(self.values.items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    """
+    Cumulative histogram with labels.
+
+    Attributes:
+        name (str): Metric name
+        help (str): Description shown in the exposition
+        labels (tuple): Label names
+        buckets (tuple): Sorted bucket upper bounds (``+Inf`` is implied)
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self.values = {}
+
+    def observe(self, label_values, value):
+        row = self.values.get(label_values)
+        if row is None:
+            row = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0]
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def samples(self):
+        for label_values, row in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), row):
+                cumulative += count
+                labels = _format_labels(self.labels + ('le',), label_values + (bound,))
+                yield self.name + '_bucket', labels, cumulative
+            labels = _format_labels(self.labels, label_values)
+            yield self.name + '_sum', labels, row[-1]
+            yield self.name + '_count', labels, cumulative
+
+
+class Registry:
+    """
+    Thread-safe collection of metrics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter(
+            'quiz_requests_total', "Requests handled", ('view', 'method', 'status'))
+        self.duration = Histogram(
+            'quiz_request_duration_seconds', "Request latency", ('view',), DURATION_BUCKETS)
+        self.queries = Histogram(
+            'quiz_request_queries', "Database queries per request", ('view',), QUERY_BUCKETS)
+        self.query_time = Counter(
+            'quiz_db_query_seconds_total', "Time spent in database queries", ('view',))
+        self.render_time = Counter(
+            'quiz_template_render_seconds_total', "Time spent rendering templates", ('view',))
+        self.session_size = Histogram(
+            'quiz_session_save_bytes', "Encoded size of saved sessions", ('view',), SIZE_BUCKETS)
+        self.metrics = (
+            self.requests, self.duration, self.queries, self.query_time,
+            self.render_time, self.session_size,
+        )
+
+    def record(self, view, method, status, sample):
+        """
+        Record one handled request.
+
+        Args:
+            view (str): URL name of the view, or 'unmatched' for unrouted requests
+            method (str): HTTP method
+            status (int): Response status code
+            sample (RequestSample): Measurements of the request
+        """
+        with self.lock:
+            self.requests.inc((view, method, status))
+            self.duration.observe((view,), sample.duration)
+            self.queries.observe((view,), sample.query_count)
+            self.query_time.inc((view,), sample.query_time)
+            self.render_time.inc((view,), sample.render_time)
+            if sample.session_bytes is not None:
+                self.session_size.observe((view,), sample.session_bytes)
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                for name, labels, value in metric.samples():
+                    lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+class RequestSample:
+    """
+    Measurements collected while one request is handled.
+
+    Attributes:
+        duration (float): Wall time of the request in seconds
+        query_count (int): Number of database queries
+        query_time (float): Seconds spent in database queries
+        render_time (float): Seconds spent rendering templates
+        session_bytes (int): Encoded session size if it was saved, else None
+    """
+
+    __slots__ = ('duration', 'query_count', 'query_time', 'render_time', 'session_bytes')
+
+    def __init__(self):
+        self.duration = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self.render_time = 0.0
+        self.session_bytes = None
+
+
+# Registry of this process
+registry = Registry()
@@ -0,0 +1,126 @@
+"""
+Performance Middleware
+======================
+Optional per-request instrumentation feeding ``metrics.registry``.
+
+Enabled with ``QUIZ_METRICS_ENABLED = True``. When disabled the
+middleware raises ``MiddlewareNotUsed`` at startup, so Django drops it
+from the handler chain and requests pay nothing.
+
+Measured per request:
+
+- Wall time, from this middleware down to the view and back (place it
+  first in ``MIDDLEWARE`` so session saves are included)
+- Database query count and time, through ``connection.execute_wrapper``
+- Template render time, by timing the Django template backend
+- Encoded session size, when the session was modified and saved
+
+With ``QUIZ_METRICS_SERVER_TIMING = True`` the measurements of each
+request are also sent back in a ``Server-Timing`` header, which is how
+``manage.py bench_quiz`` reads per-request costs.
+"""
+
+import contextvars
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends import django as django_backend
+
+from .metrics import RequestSample, registry
+
+# Sample of the request being handled in this thread/task
+_current = contextvars.ContextVar('quiz_request_sample', default=None)
+
+
+def _query_timer(execute, sql, params, many, context):
+    # execute_wrapper hook: time each query of the current request
+    sample = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if sample is not None:
+            sample.query_count += 1
+            sample.query_time += time.perf_counter() - start
+
+
+def _install_render_timer():
+    """Time top-level template renders (``include`` is part of its parent)."""
+    template_class = django_backend.Template
+    if getattr(template_class, '_quiz_timed', False):
+        return
+    render = template_class.render
+
+    def timed_render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return render(self, context, request)
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            sample.render_time += time.perf_counter() - start
+
+    template_class.render = timed_render
+    template_class._quiz_timed = True
+
+
+def format_server_timing(sample):
+    """
+    Format a request sample as a ``Server-Timing`` header value.
+
+    Args:
+        sample (RequestSample): Measurements of the request
+
+    Returns:
+        str: e.g. ``app;dur=4.1, db;dur=0.3;desc="2", tpl;dur=1.2, session;desc="310"``
+        (query count and session bytes in ``desc``)
+    """
+    parts = [
+        f'app;dur={sample.duration * 1000:.3f}',
+        f'db;dur={sample.query_time * 1000:.3f};desc="{sample.query_count}"',
+        f'tpl;dur={sample.render_time * 1000:.3f}',
+    ]
+    if sample.session_bytes is not None:
+        parts.append(f'session;desc="{sample.session_bytes}"')
+    return ', '.join(parts)
+
+
+class PerformanceMiddleware:
+    """
+    Record latency, query, render and session metrics of every request.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUIZ_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'QUIZ_METRICS_SERVER_TIMING', False)
+        _install_render_timer()
+
+    def __call__(self, request):
+        sample = RequestSample()
+        token = _current.set(sample)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_query_timer))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        sample.duration = time.perf_counter() - start
+
+        session = getattr(request, 'session', None)
+        if session is not None and session.modified and not session.is_empty():
+            sample.session_bytes = len(session.encode(session._session))
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unmatched'
+        registry.record(view, request.method, response.status_code, sample)
+        if self.server_timing:
+            response['Server-Timing'] = format_server_timing(sample)
+        return response
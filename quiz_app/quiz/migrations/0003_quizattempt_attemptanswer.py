@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_alter_question_options_alter_question_correct_answer_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bank_version', models.BigIntegerField(default=0, verbose_name='إصدار بنك الأسئلة')),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='النتيجة')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='عدد الأسئلة')),
+                ('started_at', models.DateTimeField(verbose_name='وقت البدء')),
+                ('completed_at', models.DateTimeField(verbose_name='وقت الانتهاء')),
+            ],
+            options={
+                'verbose_name': 'محاولة',
+                'verbose_name_plural': 'المحاولات',
+                'ordering': ['-completed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AttemptAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='الترتيب')),
+                ('answer', models.CharField(blank=True, max_length=5, verbose_name='الإجابة')),
+                ('is_correct', models.BooleanField(default=False, verbose_name='إجابة صحيحة')),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quiz.quizattempt', verbose_name='المحاولة')),
+                ('question', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempt_answers', to='quiz.question', verbose_name='السؤال')),
+            ],
+            options={
+                'verbose_name': 'إجابة',
+                'verbose_name_plural': 'الإجابات',
+                'ordering': ['attempt', 'position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attemptanswer',
+            constraint=models.UniqueConstraint(fields=('attempt', 'position'), name='quiz_unique_attempt_position'),
+        ),
+    ]
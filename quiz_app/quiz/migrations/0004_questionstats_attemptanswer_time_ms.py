@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_quizattempt_attemptanswer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz.question', verbose_name='السؤال')),
+                ('answered_count', models.PositiveIntegerField(default=0, verbose_name='عدد الإجابات')),
+                ('correct_count', models.PositiveIntegerField(default=0, verbose_name='الإجابات الصحيحة')),
+                ('count_a', models.PositiveIntegerField(default=0)),
+                ('count_b', models.PositiveIntegerField(default=0)),
+                ('count_c', models.PositiveIntegerField(default=0)),
+                ('count_d', models.PositiveIntegerField(default=0)),
+                ('count_true', models.PositiveIntegerField(default=0)),
+                ('count_false', models.PositiveIntegerField(default=0)),
+                ('timed_count', models.PositiveIntegerField(default=0)),
+                ('total_time_ms', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'إحصائيات سؤال',
+                'verbose_name_plural': 'إحصائيات الأسئلة',
+            },
+        ),
+        migrations.AddField(
+            model_name='attemptanswer',
+            name='time_ms',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='وقت الإجابة (ms)'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_questionstats_attemptanswer_time_ms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(verbose_name='عدد الأسئلة')),
+                ('score', models.PositiveIntegerField(verbose_name='النتيجة')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+            ],
+            options={
+                'verbose_name': 'فئة النتائج',
+                'verbose_name_plural': 'توزيع النتائج',
+                'ordering': ['total', 'score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['total', '-score', 'completed_at'], name='quiz_attempt_leaderboard_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='scorebucket',
+            constraint=models.UniqueConstraint(fields=('total', 'score'), name='quiz_unique_score_bucket'),
+        ),
+    ]
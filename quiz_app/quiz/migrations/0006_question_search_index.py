@@ -0,0 +1,80 @@
+import re
+
+from django.db import OperationalError, migrations
+
+# Frozen copies of the table and normalization of quiz/search.py at the
+# time of this migration: migrations must not change with the app code.
+# Later normalization changes are applied by ``manage.py rebuild_search_index``.
+FTS_TABLE = 'quiz_question_fts'
+
+BATCH_SIZE = 2000
+
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+_LETTER_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+
+_WORD = re.compile(r'\w+')
+
+
+def _strip_article(word):
+    for prefix in ('وال', 'فال', 'بال', 'كال', 'ال', 'لل'):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            return word[len(prefix):]
+    return word
+
+
+def _index_text(text):
+    words = _WORD.findall(_DIACRITICS.sub('', text or '').translate(_LETTER_MAP).casefold())
+    stems = [stem for stem in map(_strip_article, words) if stem not in words]
+    return ' '.join(words + stems)
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 question index (SQLite only) and fill it."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(text, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite compiled without FTS5 - searches fall back to icontains
+            return
+
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        last_id = 0
+        while True:
+            cursor.execute(
+                "SELECT id, text FROM quiz_question WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)",
+                [(pk, _index_text(text)) for pk, text in rows],
+            )
+            last_id = rows[-1][0]
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_scorebucket_leaderboard_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_question_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='اسم المجموعة')),
+                ('slug', models.SlugField(allow_unicode=True, max_length=100, unique=True, verbose_name='المعرف في الرابط')),
+                ('description', models.TextField(blank=True, verbose_name='الوصف')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('questions', models.ManyToManyField(blank=True, related_name='quiz_sets', to='quiz.question', verbose_name='الأسئلة')),
+            ],
+            options={
+                'verbose_name': 'مجموعة أسئلة',
+                'verbose_name_plural': 'مجموعات الأسئلة',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='quiz_set',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempts', to='quiz.quizset', verbose_name='مجموعة الأسئلة'),
+        ),
+    ]
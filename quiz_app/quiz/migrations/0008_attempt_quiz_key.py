@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:12
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rebuild_score_buckets(apps, fields):
+    """Recount the score histogram from the stored attempts."""
+    QuizAttempt = apps.get_model('quiz', 'QuizAttempt')
+    ScoreBucket = apps.get_model('quiz', 'ScoreBucket')
+    ScoreBucket.objects.all().delete()
+    ScoreBucket.objects.bulk_create([
+        ScoreBucket(count=row.pop('count'), **row)
+        for row in QuizAttempt.objects.order_by().values(*fields).annotate(count=Count('id'))
+    ], batch_size=500)
+
+
+def split_by_quiz(apps, schema_editor):
+    """
+    Rank stored attempts per quiz.
+
+    Question set attempts get their set's key. Earlier sampled attempts
+    cannot be told apart from full-bank ones and stay in 'bank'.
+    """
+    QuizAttempt = apps.get_model('quiz', 'QuizAttempt')
+    set_ids = QuizAttempt.objects.filter(quiz_set__isnull=False).values_list('quiz_set_id', flat=True).distinct()
+    for set_id in list(set_ids):
+        QuizAttempt.objects.filter(quiz_set_id=set_id).update(quiz_key=f'set:{set_id}')
+    rebuild_score_buckets(apps, ('quiz_key', 'total', 'score'))
+
+
+def merge_quizzes(apps, schema_editor):
+    apps.get_model('quiz', 'QuizAttempt').objects.update(quiz_key='bank')
+    rebuild_score_buckets(apps, ('total', 'score'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_quizset'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='scorebucket',
+            options={'ordering': ['quiz_key', 'total', 'score'], 'verbose_name': 'فئة النتائج', 'verbose_name_plural': 'توزيع النتائج'},
+        ),
+        migrations.RemoveConstraint(
+            model_name='scorebucket',
+            name='quiz_unique_score_bucket',
+        ),
+        migrations.RemoveIndex(
+            model_name='quizattempt',
+            name='quiz_attempt_leaderboard_idx',
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='quiz_key',
+            field=models.CharField(default='bank', max_length=32, verbose_name='الاختبار'),
+        ),
+        migrations.AddField(
+            model_name='scorebucket',
+            name='quiz_key',
+            field=models.CharField(default='bank', max_length=32, verbose_name='الاختبار'),
+        ),
+        migrations.RunPython(split_by_quiz, merge_quizzes),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz_key', 'total', '-score', 'completed_at'], name='quiz_attempt_leaderboard_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='scorebucket',
+            constraint=models.UniqueConstraint(fields=('quiz_key', 'total', 'score'), name='quiz_unique_score_bucket'),
+        ),
+    ]
@@ -5,11 +5,118 @@ Modern, well-documented models for the Quiz Application.
 Supports both Multiple Choice (MCQ) and True/False (TF) question types.
 
 This module defines the Question model which stores all quiz data
-including question text, type, options, and correct answers.
+including question text, type, options, and correct answers, and the
+QuizAttempt/AttemptAnswer models that keep the history of completed
+attempts, with per-question rollups in QuestionStats and the score
+histogram in ScoreBucket.
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Func, Max, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .grading import normalize_answer
+
+
+class QuestionQuerySet(models.QuerySet):
+    """
+    QuerySet with race-free helpers for maintaining the display order.
+    """
+
+    def lock_order(self):
+        """
+        Serialize ``order`` allocation until the current transaction ends.
+        
+        SQLite runs one writer at a time and its transactions are
+        serializable, so a MAX(order) read and the INSERT that uses it can
+        never interleave with another writer's - nothing to lock. Under
+        PostgreSQL's READ COMMITTED a concurrent transaction doesn't see
+        our uncommitted rows, so the table is locked in SHARE ROW
+        EXCLUSIVE mode: other writers wait, readers don't. Other backends
+        take no lock.
+        
+        Must be called inside ``transaction.atomic()``.
+        """
+        connection = transaction.get_connection(self.db)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE {connection.ops.quote_name(self.model._meta.db_table)} '
+                    f'IN SHARE ROW EXCLUSIVE MODE'
+                )
+    
+    def next_order(self):
+        """
+        Get the order that follows the current last question.
+        
+        Call ``lock_order`` first, in the same transaction, to keep the
+        value (and the ones after it) free until the transaction commits.
+        
+        Returns:
+            int: ``MAX(order) + 1``, or 1 for an empty bank
+        """
+        return (self.model.objects.aggregate(max_order=Max('order'))['max_order'] or 0) + 1
+    
+    def create_at_end(self, **fields):
+        """
+        Create a question placed after the current last question.
+        
+        The order is computed inside the INSERT itself
+        (``INSERT ... VALUES (..., COALESCE((SELECT MAX(order) ...), 0) + 1)``),
+        under ``lock_order``, so concurrent managers and imports are never
+        handed the same order value.
+        
+        Args:
+            **fields: Question field values (without ``order``)
+            
+        Returns:
+            Question: The created question with its allocated order
+        """
+        max_order = self.model.objects.order_by().values(
+            max_order=Func(F('order'), function='MAX')
+        )
+        with transaction.atomic(using=self.db):
+            self.lock_order()
+            question = self.create(
+                order=Coalesce(Subquery(max_order), Value(0)) + 1,
+                **fields
+            )
+        # Replace the expression with the value the database assigned
+        question.refresh_from_db(fields=['order'])
+        return question
+    
+    def reorder(self, orders, batch_size=500):
+        """
+        Rewrite the display order of many questions at once.
+        
+        Uses ``bulk_update``, i.e. one ``UPDATE ... CASE`` statement per
+        batch instead of one UPDATE per question.
+        
+        Args:
+            orders (dict): question_id -> new order
+            batch_size (int): Questions per UPDATE statement
+            
+        Returns:
+            int: Number of questions updated
+        """
+        if not orders:
+            return 0
+        
+        now = timezone.now()
+        questions = [
+            self.model(id=question_id, order=order, updated_at=now)
+            for question_id, order in orders.items()
+        ]
+        
+        from .bank import bump_bank_version  # bank imports this module
+        
+        with transaction.atomic():
+            updated = self.bulk_update(questions, ['order', 'updated_at'], batch_size=batch_size)
+            # bulk_update sends no post_save signals - invalidate caches here
+            transaction.on_commit(bump_bank_version)
+        return updated
 
 
 class Question(models.Model):
@@ -100,6 +207,8 @@ class Question(models.Model):
         verbose_name="تاريخ التحديث"
     )
 
+    objects = QuestionQuerySet.as_manager()
+
     class Meta:
         """Model metadata configuration"""
         ordering = ['order', 'id']  # Sort by display order, then by ID
@@ -114,6 +223,27 @@ class Question(models.Model):
         """String representation of the question"""
         return f"{self.order}. {self.text[:50]}..." if len(self.text) > 50 else f"{self.order}. {self.text}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the correct answer as loaded, so saves can tell whether it
+        changed (stored attempts are then re-scored, see ``signals.py``).
+        """
+        instance = super().from_db(db, field_names, values)
+        if 'correct_answer' in field_names:
+            instance._loaded_correct_answer = instance.correct_answer
+        return instance
+
+    def correct_answer_changed(self):
+        """
+        Check whether the correct answer differs from the loaded value.
+        
+        Returns:
+            bool: True if the object was loaded and its answer has changed
+        """
+        loaded = getattr(self, '_loaded_correct_answer', None)
+        return loaded is not None and normalize_answer(loaded) != normalize_answer(self.correct_answer)
+
     def get_options(self):
         """
         Get formatted options for the question.
@@ -149,5 +279,312 @@ class Question(models.Model):
         Returns:
             bool: True if answer matches correct_answer, False otherwise
         """
-        return str(answer).strip().lower() == str(self.correct_answer).strip().lower()
+        return normalize_answer(answer) == normalize_answer(self.correct_answer)
+
+
+
+class QuizSet(models.Model):
+    """
+    QuizSet Model
+    =============
+    A named set of questions played as its own quiz at ``/quiz/<slug>/``.
+    
+    Questions keep their global display order inside a set. Each set's
+    ordered IDs and answer key are served from a cached manifest (see
+    ``quizsets.py``), so running many sets adds no per-request queries.
+    
+    Attributes:
+        name (CharField): Display name of the set
+        slug (SlugField): URL identifier of the set
+        description (TextField): Optional description
+        questions (ManyToManyField): Questions in the set
+        created_at (DateTimeField): Auto-set on creation
+        updated_at (DateTimeField): Auto-updated on save
+    """
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name="اسم المجموعة"
+    )
+    slug = models.SlugField(
+        max_length=100,
+        unique=True,
+        allow_unicode=True,
+        verbose_name="المعرف في الرابط"
+    )
+    description = models.TextField(
+        blank=True,
+        verbose_name="الوصف"
+    )
+    questions = models.ManyToManyField(
+        Question,
+        blank=True,
+        related_name='quiz_sets',
+        verbose_name="الأسئلة"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="تاريخ الإنشاء"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="تاريخ التحديث"
+    )
 
+    class Meta:
+        """Model metadata configuration"""
+        ordering = ['name']
+        verbose_name = "مجموعة أسئلة"
+        verbose_name_plural = "مجموعات الأسئلة"
+
+    def __str__(self):
+        """String representation of the set"""
+        return self.name
+
+
+class QuizAttempt(models.Model):
+    """
+    QuizAttempt Model
+    =================
+    A completed quiz attempt, persisted when the results page is reached.
+    
+    Attributes:
+        bank_version (BigIntegerField): Question bank version the attempt started on
+        quiz_set (ForeignKey): Question set played, or null for the whole bank
+        quiz_key (CharField): Quiz the attempt is ranked in: 'bank',
+            'sample' or 'set:<id>' (see ``leaderboard.py``)
+        score (PositiveIntegerField): Number of correct answers
+        total (PositiveIntegerField): Number of questions in the quiz
+        started_at (DateTimeField): When the attempt started
+        completed_at (DateTimeField): When the results page was reached
+    """
+
+    bank_version = models.BigIntegerField(
+        default=0,
+        verbose_name="إصدار بنك الأسئلة"
+    )
+    quiz_set = models.ForeignKey(
+        QuizSet,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='attempts',
+        verbose_name="مجموعة الأسئلة"
+    )
+    quiz_key = models.CharField(
+        max_length=32,
+        default='bank',
+        verbose_name="الاختبار"
+    )
+    score = models.PositiveIntegerField(
+        default=0,
+        verbose_name="النتيجة"
+    )
+    total = models.PositiveIntegerField(
+        default=0,
+        verbose_name="عدد الأسئلة"
+    )
+    started_at = models.DateTimeField(
+        verbose_name="وقت البدء"
+    )
+    completed_at = models.DateTimeField(
+        verbose_name="وقت الانتهاء"
+    )
+
+    class Meta:
+        """Model metadata configuration"""
+        ordering = ['-completed_at']
+        verbose_name = "محاولة"
+        verbose_name_plural = "المحاولات"
+        indexes = [
+            # Leaderboard: best scores of a quiz first, earliest completion wins ties
+            models.Index(fields=['quiz_key', 'total', '-score', 'completed_at'],
+                         name='quiz_attempt_leaderboard_idx'),
+        ]
+
+    def __str__(self):
+        """String representation of the attempt"""
+        return f"{self.score}/{self.total} @ {self.completed_at:%Y-%m-%d %H:%M}"
+
+
+class AttemptAnswer(models.Model):
+    """
+    AttemptAnswer Model
+    ===================
+    One answer given during a quiz attempt.
+    
+    Answers are buffered in the session while the attempt is in progress
+    and written together with ``bulk_create`` when it completes.
+    
+    Attributes:
+        attempt (ForeignKey): The attempt this answer belongs to
+        question (ForeignKey): The answered question (null if since deleted)
+        position (PositiveIntegerField): 0-based position in the attempt
+        answer (CharField): The submitted answer (empty if skipped)
+        is_correct (BooleanField): Whether the answer was correct
+        time_ms (PositiveIntegerField): Time taken to answer in milliseconds
+    """
+
+    attempt = models.ForeignKey(
+        QuizAttempt,
+        on_delete=models.CASCADE,
+        related_name='answers',
+        verbose_name="المحاولة"
+    )
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='attempt_answers',
+        verbose_name="السؤال"
+    )
+    position = models.PositiveIntegerField(
+        verbose_name="الترتيب"
+    )
+    answer = models.CharField(
+        max_length=5,
+        blank=True,
+        verbose_name="الإجابة"
+    )
+    is_correct = models.BooleanField(
+        default=False,
+        verbose_name="إجابة صحيحة"
+    )
+    time_ms = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="وقت الإجابة (ms)"
+    )
+
+    class Meta:
+        """Model metadata configuration"""
+        ordering = ['attempt', 'position']
+        verbose_name = "إجابة"
+        verbose_name_plural = "الإجابات"
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'position'], name='quiz_unique_attempt_position'),
+        ]
+
+    def __str__(self):
+        """String representation of the answer"""
+        return f"{self.attempt_id}#{self.position}: {self.answer or '-'}"
+
+
+class QuestionStats(models.Model):
+    """
+    QuestionStats Model
+    ===================
+    Precomputed per-question answer statistics.
+    
+    Counters are incremented when an attempt completes (see ``stats.py``),
+    so the manager page reads ready-made numbers instead of aggregating
+    every answer row. ``manage.py rebuild_question_stats`` recomputes them
+    from the raw AttemptAnswer rows.
+    
+    Attributes:
+        question (OneToOneField): The question these statistics describe
+        answered_count (PositiveIntegerField): Number of times answered
+        correct_count (PositiveIntegerField): Number of correct answers
+        count_a ... count_false (PositiveIntegerField): Answers per option
+        timed_count (PositiveIntegerField): Answers with a recorded time
+        total_time_ms (BigIntegerField): Sum of answer times in milliseconds
+        updated_at (DateTimeField): Auto-updated on save
+    """
+
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name="السؤال"
+    )
+    answered_count = models.PositiveIntegerField(default=0, verbose_name="عدد الإجابات")
+    correct_count = models.PositiveIntegerField(default=0, verbose_name="الإجابات الصحيحة")
+    count_a = models.PositiveIntegerField(default=0)
+    count_b = models.PositiveIntegerField(default=0)
+    count_c = models.PositiveIntegerField(default=0)
+    count_d = models.PositiveIntegerField(default=0)
+    count_true = models.PositiveIntegerField(default=0)
+    count_false = models.PositiveIntegerField(default=0)
+    timed_count = models.PositiveIntegerField(default=0)
+    total_time_ms = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
+
+    # Counter field for each answer value
+    OPTION_FIELDS = {
+        'A': 'count_a',
+        'B': 'count_b',
+        'C': 'count_c',
+        'D': 'count_d',
+        'True': 'count_true',
+        'False': 'count_false',
+    }
+
+    class Meta:
+        """Model metadata configuration"""
+        verbose_name = "إحصائيات سؤال"
+        verbose_name_plural = "إحصائيات الأسئلة"
+
+    def __str__(self):
+        """String representation of the statistics"""
+        return f"{self.question_id}: {self.correct_count}/{self.answered_count}"
+
+    @property
+    def correct_rate(self):
+        """float: Percentage of correct answers (0-100), or None if unanswered"""
+        if not self.answered_count:
+            return None
+        return self.correct_count / self.answered_count * 100
+
+    @property
+    def average_time_ms(self):
+        """float: Average time to answer in milliseconds, or None if untimed"""
+        if not self.timed_count:
+            return None
+        return self.total_time_ms / self.timed_count
+
+    def get_distribution(self):
+        """
+        Get the number of answers per option.
+        
+        Returns:
+            dict: Answer value -> count
+        """
+        return {value: getattr(self, field) for value, field in self.OPTION_FIELDS.items()}
+
+
+class ScoreBucket(models.Model):
+    """
+    ScoreBucket Model
+    =================
+    One bucket of the score histogram: how many completed attempts of a
+    quiz with ``total`` questions scored exactly ``score``.
+    
+    Percentiles are computed from these ``total + 1`` buckets instead of
+    counting every attempt (see ``leaderboard.py``).
+    
+    Attributes:
+        quiz_key (CharField): Quiz of the histogram: 'bank', 'sample' or
+            'set:<id>'
+        total (PositiveIntegerField): Number of questions in the quiz
+        score (PositiveIntegerField): Score of the bucket
+        count (PositiveIntegerField): Number of attempts with that score
+    """
+
+    quiz_key = models.CharField(max_length=32, default='bank', verbose_name="الاختبار")
+    total = models.PositiveIntegerField(verbose_name="عدد الأسئلة")
+    score = models.PositiveIntegerField(verbose_name="النتيجة")
+    count = models.PositiveIntegerField(default=0, verbose_name="عدد المحاولات")
+
+    class Meta:
+        """Model metadata configuration"""
+        ordering = ['quiz_key', 'total', 'score']
+        verbose_name = "فئة النتائج"
+        verbose_name_plural = "توزيع النتائج"
+        constraints = [
+            models.UniqueConstraint(fields=['quiz_key', 'total', 'score'], name='quiz_unique_score_bucket'),
+        ]
+
+    def __str__(self):
+        """String representation of the bucket"""
+        return f"{self.quiz_key} {self.score}/{self.total}: {self.count}"
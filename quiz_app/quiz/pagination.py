@@ -0,0 +1,101 @@
+"""
+Keyset Pagination
+=================
+``(order, id)`` keyset pagination of question lists.
+
+A page is fetched with one ``LIMIT size + 1`` query starting after (or
+before) the cursor of a neighbouring page, which SQLite answers from the
+``order`` index (the primary key is part of every index entry). Unlike
+``OFFSET`` paging the cost does not grow with the page number, and no
+``COUNT`` query is needed to tell whether more pages exist.
+"""
+
+from django.db.models import Q
+
+# Questions shown per manager list page
+DEFAULT_PAGE_SIZE = 50
+
+
+def parse_cursor(value):
+    """
+    Parse a ``"<order>.<id>"`` cursor from a query string.
+
+    Args:
+        value (str): The raw cursor (may be None or malformed)
+
+    Returns:
+        tuple: ``(order, id)``, or None if the value is not a cursor
+    """
+    try:
+        order, pk = value.split('.')
+        return int(order), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_cursor(question):
+    """
+    Format the cursor of a question for a query string.
+
+    Args:
+        question (Question): A question of the page
+
+    Returns:
+        str: ``"<order>.<id>"``
+    """
+    return f"{question.order}.{question.id}"
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated question list.
+
+    Attributes:
+        items (list): Questions of the page in ``(order, id)`` order
+        next_cursor (str): Cursor for the following page, or None
+        previous_cursor (str): Cursor for the preceding page, or None
+    """
+
+    __slots__ = ('items', 'next_cursor', 'previous_cursor')
+
+    def __init__(self, items, has_next, has_previous):
+        self.items = items
+        self.next_cursor = format_cursor(items[-1]) if items and has_next else None
+        self.previous_cursor = format_cursor(items[0]) if items and has_previous else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def get_keyset_page(queryset, after=None, before=None, size=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of questions ordered by ``(order, id)``.
+
+    Args:
+        queryset (QuerySet): Questions to paginate (filters and ``only()``
+            already applied)
+        after (tuple): ``(order, id)`` the page starts after
+        before (tuple): ``(order, id)`` the page ends before (used when
+            ``after`` is None, to page backwards)
+        size (int): Questions per page
+
+    Returns:
+        KeysetPage: The requested page
+    """
+    if after is None and before is not None:
+        order, pk = before
+        rows = list(
+            queryset.filter(Q(order__lt=order) | Q(order=order, id__lt=pk))
+            .order_by('-order', '-id')[:size + 1]
+        )
+        has_previous = len(rows) > size
+        return KeysetPage(rows[:size][::-1], has_next=True, has_previous=has_previous)
+
+    if after is not None:
+        order, pk = after
+        queryset = queryset.filter(Q(order__gt=order) | Q(order=order, id__gt=pk))
+    rows = list(queryset.order_by('order', 'id')[:size + 1])
+    return KeysetPage(rows[:size], has_next=len(rows) > size, has_previous=after is not None)
@@ -0,0 +1,131 @@
+"""
+Question Set Manifests
+======================
+Cached per-set data for quizzes played at ``/quiz/<slug>/``.
+
+A manifest holds everything ``quiz()`` and ``results()`` need from a set:
+its ordered question IDs (with their ``(order, id)`` keys for keyset
+walking), the question count and the answer key. Manifests are kept
+in-process and stamped with the question bank version and a sets
+version. The sets version lives in the shared ``versions`` cache alias
+next to the bank version (see ``bank.py``) and is bumped when a set or
+its membership changes (see ``signals.py``). As long as both
+versions are unchanged, serving a set costs zero queries, however many
+sets the deployment runs.
+"""
+
+import bisect
+import threading
+
+from .bank import bump_version, get_bank_version, get_version
+from .grading import AnswerKey
+from .models import QuizSet
+
+# Cache key holding the current sets version number
+SETS_VERSION_KEY = 'quiz:sets_version'
+
+# In-process manifests keyed by slug, and the lock guarding their reload
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+class SetManifest:
+    """
+    Immutable, ordered summary of one question set.
+
+    Attributes:
+        stamp (tuple): ``(bank_version, sets_version)`` it was loaded for
+        set_id (int): QuizSet ID
+        slug (str): QuizSet slug
+        name (str): QuizSet display name
+        question_ids (tuple): Question IDs in display order
+        keys (tuple): ``(order, id)`` sort key of each question
+        key (AnswerKey): Answer key of the set's questions
+    """
+
+    __slots__ = ('stamp', 'set_id', 'slug', 'name', 'question_ids', 'keys', 'key')
+
+    def __init__(self, stamp, quiz_set, rows):
+        rows = tuple(rows)
+        object.__setattr__(self, 'stamp', stamp)
+        object.__setattr__(self, 'set_id', quiz_set.id)
+        object.__setattr__(self, 'slug', quiz_set.slug)
+        object.__setattr__(self, 'name', quiz_set.name)
+        object.__setattr__(self, 'question_ids', tuple(pk for pk, _, _ in rows))
+        object.__setattr__(self, 'keys', tuple((order, pk) for pk, order, _ in rows))
+        object.__setattr__(self, 'key', AnswerKey(self.question_ids, (answer for _, _, answer in rows)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SetManifest snapshots are immutable")
+
+    @property
+    def count(self):
+        """int: Number of questions in the set"""
+        return len(self.question_ids)
+
+    def window(self, cursor=None, size=2):
+        """
+        Get the IDs of the questions following a keyset cursor.
+
+        Args:
+            cursor (tuple): ``(order, id)`` of the last answered question,
+                or None to start from the beginning
+            size (int): Maximum number of IDs to return
+
+        Returns:
+            tuple: Up to ``size`` question IDs in display order
+        """
+        start = 0 if cursor is None else bisect.bisect_right(self.keys, tuple(cursor))
+        return self.question_ids[start:start + size]
+
+
+def get_sets_version():
+    """
+    Get the current sets version (seeded from the clock when missing).
+
+    Returns:
+        int: Current sets version
+    """
+    return get_version(SETS_VERSION_KEY)
+
+
+def bump_sets_version():
+    """
+    Invalidate every set manifest, in every process, by moving the sets version.
+
+    Returns:
+        int: The new sets version
+    """
+    return bump_version(SETS_VERSION_KEY)
+
+
+def get_set_manifest(slug):
+    """
+    Get the manifest of a question set.
+
+    Loaded with two queries (the set row and its ordered question IDs and
+    answers) only when the set was not loaded yet for the current bank
+    and sets versions.
+
+    Args:
+        slug (str): QuizSet slug
+
+    Returns:
+        SetManifest: The set's manifest, or None if no such set exists
+    """
+    stamp = (get_bank_version(), get_sets_version())
+    manifest = _manifests.get(slug)
+    if manifest is not None and manifest.stamp == stamp:
+        return manifest
+
+    with _manifests_lock:
+        manifest = _manifests.get(slug)
+        if manifest is None or manifest.stamp != stamp:
+            quiz_set = QuizSet.objects.only('id', 'slug', 'name').filter(slug=slug).first()
+            if quiz_set is None:
+                _manifests.pop(slug, None)
+                return None
+            rows = quiz_set.questions.order_by('order', 'id').values_list('id', 'order', 'correct_answer')
+            manifest = SetManifest(stamp, quiz_set, rows)
+            _manifests[slug] = manifest
+    return manifest
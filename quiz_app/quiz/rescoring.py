@@ -0,0 +1,236 @@
+"""
+Attempt Re-scoring
+==================
+Re-grade stored attempt answers after correct answers have changed.
+
+Stored answers are walked in keyset-paginated chunks (``id > last_id``).
+Each chunk is graded with one ``AnswerKey.grade_many`` call and only the
+rows whose correctness flipped are written, together with the matching
+attempt scores, score histogram buckets and QuestionStats counters.
+
+A chunk's rows and the correct answers they are graded against are read
+in the same transaction that writes the flips, so re-scores running at
+the same time (two workers, or a worker and ``manage.py
+rescore_attempts``) never apply the same flip twice. The rows are locked
+where the database supports ``SELECT ... FOR UPDATE``; SQLite instead
+fails the later writer with a lock error once another one has committed,
+and the chunk is retried on fresh rows.
+
+``schedule_rescore`` runs the job on a background thread pool, so saving a
+question in the admin returns immediately instead of waiting for a rescan
+of the attempt history.
+"""
+
+import logging
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+
+from .database import retry_on_locked
+from .grading import AnswerKey
+from .models import AttemptAnswer, Question, QuestionStats, QuizAttempt, ScoreBucket
+from .stats import counter_increment
+
+logger = logging.getLogger(__name__)
+
+# Answer rows graded per chunk/transaction
+DEFAULT_CHUNK_SIZE = 2000
+
+# Background workers and the questions waiting for a re-score
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def build_answer_key(question_ids=None):
+    """
+    Build an answer key from the current correct answers.
+
+    Args:
+        question_ids (iterable): Restrict the key to these questions
+            (default: the whole bank)
+
+    Returns:
+        AnswerKey: Key of the selected questions
+    """
+    rows = Question.objects.order_by().values_list('id', 'correct_answer')
+    if question_ids is not None:
+        rows = rows.filter(id__in=list(question_ids))
+    rows = list(rows)
+    return AnswerKey((pk for pk, _ in rows), (answer for _, answer in rows))
+
+
+def _apply_changes(flips, attempt_deltas, question_deltas):
+    """
+    Write the effects of one graded chunk.
+
+    Args:
+        flips (dict): New is_correct value -> list of AttemptAnswer IDs
+        attempt_deltas (Counter): attempt_id -> score change
+        question_deltas (Counter): question_id -> correct_count change
+    """
+    for is_correct, answer_ids in flips.items():
+        if answer_ids:
+            AttemptAnswer.objects.filter(id__in=answer_ids, is_correct=not is_correct).update(
+                is_correct=is_correct)
+
+    attempt_deltas = {pk: delta for pk, delta in attempt_deltas.items() if delta}
+    if attempt_deltas:
+        # Move changed attempts between score histogram buckets
+        buckets = Counter()
+        for quiz_key, total, score, pk in QuizAttempt.objects.filter(id__in=attempt_deltas).values_list(
+                'quiz_key', 'total', 'score', 'id'):
+            buckets[(quiz_key, total, score)] -= 1
+            buckets[(quiz_key, total, score + attempt_deltas[pk])] += 1
+        ScoreBucket.objects.bulk_create(
+            [ScoreBucket(quiz_key=quiz_key, total=total, score=score)
+             for (quiz_key, total, score), n in buckets.items() if n > 0],
+            ignore_conflicts=True,
+        )
+        for (quiz_key, total, score), n in buckets.items():
+            if n:
+                ScoreBucket.objects.filter(quiz_key=quiz_key, total=total, score=score).update(
+                    count=F('count') + n)
+
+        by_delta = defaultdict(list)
+        for pk, delta in attempt_deltas.items():
+            by_delta[delta].append(pk)
+        for delta, pks in by_delta.items():
+            QuizAttempt.objects.filter(id__in=pks).update(score=F('score') + delta)
+
+    question_deltas = {pk: delta for pk, delta in question_deltas.items() if delta}
+    if question_deltas:
+        QuestionStats.objects.filter(question_id__in=question_deltas).update(
+            correct_count=counter_increment('correct_count', question_deltas)
+        )
+
+
+@retry_on_locked
+def _rescore_chunk(answers, last_id, chunk_size):
+    """
+    Re-grade and fix one chunk of stored answers in its own transaction.
+
+    Args:
+        answers (QuerySet): ``(id, attempt_id, question_id, answer,
+            is_correct)`` rows of the answers to re-score, ordered by ID
+        last_id (int): ID of the last answer of the previous chunk
+        chunk_size (int): Answer rows per chunk
+
+    Returns:
+        tuple: ``(rows_checked, rows_changed, last_id)`` of the chunk
+    """
+    with transaction.atomic():
+        rows = list(answers.select_for_update().filter(id__gt=last_id)[:chunk_size])
+        if not rows:
+            return 0, 0, last_id
+        key = build_answer_key({row[2] for row in rows})
+
+        # One sheet per attempt, graded together
+        sheets = defaultdict(list)
+        for row in rows:
+            sheets[row[1]].append(row)
+        results = key.grade_many(
+            [(question_id, answer) for _, _, question_id, answer, _ in sheet]
+            for sheet in sheets.values()
+        )
+
+        flips = {True: [], False: []}
+        attempt_deltas = Counter()
+        question_deltas = Counter()
+        for sheet, result in zip(sheets.values(), results):
+            for (pk, attempt_id, question_id, _, was_correct), is_correct in zip(sheet, result.correct):
+                if is_correct != was_correct:
+                    delta = 1 if is_correct else -1
+                    flips[is_correct].append(pk)
+                    attempt_deltas[attempt_id] += delta
+                    question_deltas[question_id] += delta
+
+        if attempt_deltas:
+            _apply_changes(flips, attempt_deltas, question_deltas)
+    return len(rows), len(flips[True]) + len(flips[False]), rows[-1][0]
+
+
+def rescore_attempts(question_ids=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Re-grade stored answers against the current correct answers.
+
+    Args:
+        question_ids (iterable): Only re-grade answers to these questions
+            (default: every stored answer)
+        chunk_size (int): Answer rows per chunk/transaction
+
+    Yields:
+        tuple: ``(rows_checked, rows_changed)`` running totals after each chunk
+    """
+    answers = AttemptAnswer.objects.order_by('id').values_list(
+        'id', 'attempt_id', 'question_id', 'answer', 'is_correct'
+    )
+    if question_ids is not None:
+        answers = answers.filter(question_id__in=list(question_ids))
+    else:
+        answers = answers.filter(question__isnull=False)
+
+    checked = changed = 0
+    last_id = 0
+    while True:
+        rows_checked, rows_changed, last_id = _rescore_chunk(answers, last_id, chunk_size)
+        if not rows_checked:
+            break
+        checked += rows_checked
+        changed += rows_changed
+        yield checked, changed
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'QUIZ_RESCORE_WORKERS', 2),
+                thread_name_prefix='quiz-rescore',
+            )
+        return _executor
+
+
+def _run_rescore(question_ids):
+    """Background job: re-score answers to the given questions."""
+    with _executor_lock:
+        # A change arriving from now on needs a new run
+        _pending.difference_update(question_ids)
+    close_old_connections()
+    try:
+        checked = changed = 0
+        for checked, changed in rescore_attempts(question_ids):
+            pass
+        logger.info("Re-scored %d answers to questions %s (%d changed)", checked, question_ids, changed)
+    except Exception:
+        logger.exception("Re-scoring questions %s failed", question_ids)
+    finally:
+        connections.close_all()
+
+
+def schedule_rescore(question_ids):
+    """
+    Re-score answers to the given questions in the background.
+
+    Questions already waiting for a run are not queued twice. With
+    ``QUIZ_RESCORE_ASYNC = False`` the job runs inline instead.
+
+    Args:
+        question_ids (iterable): IDs of questions whose answer changed
+    """
+    if not getattr(settings, 'QUIZ_RESCORE_ASYNC', True):
+        for _ in rescore_attempts(question_ids):
+            pass
+        return
+
+    with _executor_lock:
+        question_ids = sorted(set(question_ids) - _pending)
+        if not question_ids:
+            return
+        _pending.update(question_ids)
+    _get_executor().submit(_run_rescore, question_ids)
@@ -0,0 +1,108 @@
+"""
+Read Replica Routing
+====================
+Send question reads to a read-only SQLite connection.
+
+With ``QUIZ_READ_REPLICA = True``, reads of ``Question``, ``QuizSet``
+(and its membership table) and ``QuestionStats`` use the ``replica``
+database alias. That alias opens the same database file with
+``mode=ro``. In WAL mode (see ``database.py``) its reads see every
+committed write, yet never wait on the write locks taken by session
+and attempt saves on the primary connection. All writes go to the
+primary.
+
+Read-your-writes:
+
+- Reads inside a transaction on the primary stay on the primary, so a
+  transaction sees its own uncommitted rows
+- The manager views run under ``read_from_primary``: the people editing
+  the bank always read it from the connection that wrote it
+- The bank version is only bumped after commit (``signals.py``), so a
+  snapshot reloaded for the new version through the replica already
+  contains the write
+"""
+
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Alias of the read-only connection
+REPLICA_DB_ALIAS = 'replica'
+
+# Models (``app_label.model``) read through the replica
+REPLICA_MODELS = frozenset({
+    'quiz.question',
+    'quiz.quizset',
+    'quiz.quizset_questions',
+    'quiz.questionstats',
+})
+
+# True while the current request/task must read from the primary
+_read_primary = contextvars.ContextVar('quiz_read_primary', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """Route every read inside the block to the primary."""
+    token = _read_primary.set(True)
+    try:
+        yield
+    finally:
+        _read_primary.reset(token)
+
+
+def read_from_primary(view):
+    """
+    View decorator: read from the primary for the whole request.
+
+    Place it above the other decorators, so conditional-request
+    validators run on the primary too.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with primary_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def replica_enabled():
+    """
+    Tell whether question reads may use the replica.
+
+    Returns:
+        bool: True when enabled and the replica alias is configured
+    """
+    return getattr(settings, 'QUIZ_READ_REPLICA', False) and REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class ReadReplicaRouter:
+    """
+    Database router: question reads to the replica, all writes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in REPLICA_MODELS:
+            return None
+        if (not replica_enabled() or _read_primary.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Also for instances read through the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
@@ -0,0 +1,161 @@
+"""
+Question Sampling
+=================
+Random K-question quizzes drawn from large banks.
+
+The question IDs of the bank are held in-process as compact arrays, one
+per question type, loaded with a single ``values_list`` query per bank
+version (the same versioning as the ``bank.py`` snapshot). Drawing a
+sample is then ``random.sample`` over those arrays, which is O(K)
+whatever the bank size - no ``ORDER BY RANDOM()`` sort of the whole
+table. The sampled IDs and the seed are stored in the attempt state, and
+each request loads only the current and the next sampled question.
+"""
+
+import random
+import threading
+from array import array
+
+from .bank import aget_questions, get_bank_version, get_questions
+from .models import Question
+
+# In-process ID pool for the current bank version
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class QuestionIdPool:
+    """
+    Immutable question ID arrays of one bank version.
+
+    Attributes:
+        version (int): Bank version the pool was loaded for
+        by_type (dict): question_type -> ``array`` of question IDs
+    """
+
+    __slots__ = ('version', 'by_type')
+
+    def __init__(self, version, rows):
+        by_type = {}
+        for question_type, pk in rows:
+            by_type.setdefault(question_type, array('q')).append(pk)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'by_type', by_type)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QuestionIdPool snapshots are immutable")
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.by_type.values())
+
+
+def get_id_pool():
+    """
+    Get the question ID pool for the current bank version.
+
+    Returns:
+        QuestionIdPool: IDs of every question, grouped by type
+    """
+    global _pool
+
+    version = get_bank_version()
+    pool = _pool
+    if pool is not None and pool.version == version:
+        return pool
+
+    with _pool_lock:
+        pool = _pool
+        if pool is None or pool.version != version:
+            rows = Question.objects.order_by('id').values_list('question_type', 'id')
+            pool = QuestionIdPool(version, rows.iterator(chunk_size=10000))
+            _pool = pool
+    return pool
+
+
+def _allocate(sizes, k):
+    """
+    Split a sample size across strata in proportion to their sizes.
+
+    Uses largest remainders, so the parts add up to ``k`` exactly.
+
+    Args:
+        sizes (dict): Stratum -> number of questions
+        k (int): Sample size (at most the sum of the sizes)
+
+    Returns:
+        dict: Stratum -> number of questions to draw
+    """
+    total = sum(sizes.values())
+    quotas = {key: k * size / total for key, size in sizes.items()}
+    counts = {key: int(quota) for key, quota in quotas.items()}
+    by_remainder = sorted(sizes, key=lambda key: quotas[key] - counts[key], reverse=True)
+    for key in by_remainder[:k - sum(counts.values())]:
+        counts[key] += 1
+    return counts
+
+
+def sample_question_ids(size, seed, stratify=False):
+    """
+    Draw a random sample of question IDs.
+
+    Args:
+        size (int): Number of questions to draw (capped at the bank size)
+        seed (int): Random seed; the same seed and bank version always
+            give the same sample
+        stratify (bool): Keep the share of each question type as in the bank
+
+    Returns:
+        list: Sampled question IDs in quiz order
+    """
+    pool = get_id_pool()
+    rng = random.Random(seed)
+    size = min(size, len(pool))
+
+    if stratify:
+        counts = _allocate({key: len(ids) for key, ids in pool.by_type.items()}, size)
+        sample = []
+        for question_type in sorted(pool.by_type):
+            sample.extend(rng.sample(pool.by_type[question_type], counts[question_type]))
+        rng.shuffle(sample)
+        return sample
+
+    # Index into the concatenated per-type arrays without building it
+    strata = [pool.by_type[key] for key in sorted(pool.by_type)]
+    sample = []
+    for index in rng.sample(range(len(pool)), size):
+        for ids in strata:
+            if index < len(ids):
+                sample.append(ids[index])
+                break
+            index -= len(ids)
+    return sample
+
+
+def fetch_sampled_window(sample, position):
+    """
+    Get the current and next question of a sampled attempt.
+
+    Args:
+        sample (list): Sampled question IDs
+        position (int): 0-based position of the current question
+
+    Returns:
+        tuple: ``(current, next)`` questions; either is None when past the
+        end of the sample or deleted since the sample was drawn
+    """
+    ids = sample[position:position + 2]
+    if not ids:
+        return None, None
+
+    window = get_questions(ids) + [None]
+    return window[0], window[1]
+
+
+async def afetch_sampled_window(sample, position):
+    """Async version of ``fetch_sampled_window``."""
+    ids = sample[position:position + 2]
+    if not ids:
+        return None, None
+
+    window = await aget_questions(ids) + [None]
+    return window[0], window[1]
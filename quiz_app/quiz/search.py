@@ -0,0 +1,232 @@
+"""
+Question Search
+===============
+Full-text search over question text for the admin and the manager page.
+
+On SQLite the text is indexed in an FTS5 virtual table (``rowid`` is the
+question ID), so a search is an index lookup instead of a
+``LIKE '%term%'`` scan of every question. Other backends, and SQLite
+builds without FTS5, fall back to ``icontains``.
+
+Indexed text and search terms go through the same normalization:
+lower-casing, removal of Arabic diacritics and tatweel, unification of
+alef/yaa/taa marbuta variants, and an extra token without the definite
+article (``ال``) so ``كتاب`` also finds ``الكتاب``. Terms match as word
+prefixes.
+
+The index is kept in sync by the ``Question`` signals (``signals.py``)
+and by the bulk importer; ``manage.py rebuild_search_index`` recreates it
+from scratch.
+"""
+
+import re
+
+from django.db import OperationalError, connections
+from django.db.models.expressions import RawSQL
+
+# FTS5 table holding the normalized question text
+FTS_TABLE = 'quiz_question_fts'
+
+# Rows indexed per INSERT batch when rebuilding
+REBUILD_BATCH_SIZE = 2000
+
+# Arabic harakat, superscript alef and tatweel
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+# Letter variants folded to one form
+_LETTER_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+
+_WORD = re.compile(r'\w+')
+
+# FTS availability per (alias, database name)
+_available = {}
+
+
+def normalize_text(text):
+    """
+    Normalize text for indexing and searching.
+
+    Args:
+        text (str): Raw question text or search term
+
+    Returns:
+        str: Lower-cased text without diacritics, with letter variants unified
+    """
+    return _DIACRITICS.sub('', text or '').translate(_LETTER_MAP).casefold()
+
+
+def _strip_article(word):
+    # Definite article, optionally after a conjunction (و/ف) or preposition (ب/ك/ل)
+    for prefix in ('وال', 'فال', 'بال', 'كال', 'ال', 'لل'):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            return word[len(prefix):]
+    return word
+
+
+def index_text(text):
+    """
+    Build the text stored in the index for a question.
+
+    Args:
+        text (str): Raw question text
+
+    Returns:
+        str: Normalized words followed by their article-less forms
+    """
+    words = _WORD.findall(normalize_text(text))
+    stems = [stem for stem in map(_strip_article, words) if stem not in words]
+    return ' '.join(words + stems)
+
+
+def build_match_query(term):
+    """
+    Build an FTS5 MATCH expression from a search term.
+
+    Every word must appear, as a prefix of an indexed token.
+
+    Args:
+        term (str): Raw search term
+
+    Returns:
+        str: MATCH expression, or None if the term has no words
+    """
+    words = [_strip_article(word) for word in _WORD.findall(normalize_text(term))]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def fts_available(using='default'):
+    """
+    Check whether the FTS index exists on a database.
+
+    Args:
+        using (str): Database alias
+
+    Returns:
+        bool: True on SQLite with the index table created
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    key = (using, str(connection.settings_dict['NAME']))
+    if key not in _available:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+            )
+            _available[key] = cursor.fetchone() is not None
+    return _available[key]
+
+
+def create_index(connection):
+    """
+    Create the FTS5 table on a SQLite connection.
+
+    Args:
+        connection: Database connection (schema editor connection in migrations)
+
+    Returns:
+        bool: True if the table exists afterwards (False without FTS5)
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(text, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+    except OperationalError:
+        # SQLite compiled without FTS5 - searches fall back to icontains
+        return False
+    return True
+
+
+def index_questions(questions, using='default'):
+    """
+    Add or refresh questions in the index.
+
+    Args:
+        questions (iterable): Saved Question objects (``id`` and ``text``)
+        using (str): Database alias
+    """
+    if not fts_available(using):
+        return
+    rows = [(question.id, index_text(question.text)) for question in questions]
+    if rows:
+        with connections[using].cursor() as cursor:
+            cursor.executemany(f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)", rows)
+
+
+def remove_questions(question_ids, using='default'):
+    """
+    Remove questions from the index.
+
+    Args:
+        question_ids (iterable): IDs of deleted questions
+        using (str): Database alias
+    """
+    if not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in question_ids])
+
+
+def rebuild_index(connection, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recreate the index contents from the question table.
+
+    Reads the table with raw SQL, so it can also run inside migrations.
+
+    Args:
+        connection: Database connection
+        batch_size (int): Questions indexed per batch
+
+    Yields:
+        int: Number of questions indexed so far, after each batch
+    """
+    indexed = 0
+    last_id = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        while True:
+            cursor.execute(
+                "SELECT id, text FROM quiz_question WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, batch_size],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)",
+                [(pk, index_text(text)) for pk, text in rows],
+            )
+            indexed += len(rows)
+            last_id = rows[-1][0]
+            yield indexed
+
+
+def filter_questions(queryset, term):
+    """
+    Restrict a question queryset to questions matching a search term.
+
+    The result stays a lazy queryset, so ordering, ``only()`` and keyset
+    pagination still apply.
+
+    Args:
+        queryset (QuerySet): Questions to search
+        term (str): Raw search term
+
+    Returns:
+        QuerySet: Matching questions
+    """
+    match = build_match_query(term)
+    if match is None or not fts_available(queryset.db):
+        return queryset.filter(text__icontains=term)
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+    )
@@ -0,0 +1,80 @@
+"""
+Quiz Session Engine
+===================
+Cache + database hybrid session backend with write coalescing.
+
+Built on Django's ``cached_db`` backend. Saves that only change the
+in-progress attempt progress (``quiz_progress``) go to the session cache
+alone; anything else - a new session, the start of an attempt, a manager
+login - is written through to the database as usual. Over a quiz of N
+questions the ``django_session`` table therefore sees two writes (attempt
+start and the flush at completion) instead of N + 2.
+
+Enable it with ``SESSION_ENGINE = 'quiz.sessions'``. The cache alias in
+``SESSION_CACHE_ALIAS`` must be shared by every worker (a file-based cache
+works without any external service). If a cached entry is lost, the
+session falls back to its last database copy and the attempt resumes from
+the last durable point.
+
+Database writes are retried when SQLite reports a lock conflict
+(``database.retry_on_locked``).
+"""
+
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+from .attempt import PROGRESS_KEY
+from .database import retry_on_locked
+
+
+class SessionStore(CachedDBStore):
+    """
+    Session store that keeps attempt progress in the cache only.
+
+    Attributes:
+        TRANSIENT_KEYS (tuple): Session keys whose changes alone never
+            trigger a database write
+    """
+
+    TRANSIENT_KEYS = (PROGRESS_KEY,)
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        # Fingerprint of the durable data as last read from/written to the DB
+        self._durable_digest = None
+
+    def _durable_fingerprint(self, data):
+        """
+        Serialize everything but the transient keys for comparison.
+
+        Args:
+            data (dict): Session data
+
+        Returns:
+            bytes: Canonical serialization of the durable session data
+        """
+        durable = {
+            key: value for key, value in sorted(data.items())
+            if key not in self.TRANSIENT_KEYS
+        }
+        return self.serializer().dumps(durable)
+
+    def load(self):
+        data = super().load()
+        self._durable_digest = self._durable_fingerprint(data)
+        return data
+
+    @retry_on_locked
+    def save(self, must_create=False):
+        if not must_create and self.session_key is not None and self._durable_digest is not None:
+            data = self._get_session()
+            if self._durable_fingerprint(data) == self._durable_digest:
+                # Only attempt progress changed - coalesce into the cache
+                self._cache.set(self.cache_key, data, self.get_expiry_age())
+                return
+
+        super().save(must_create)
+        self._durable_digest = self._durable_fingerprint(self._get_session())
+
+    @retry_on_locked
+    def delete(self, session_key=None):
+        super().delete(session_key)
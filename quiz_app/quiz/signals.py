@@ -0,0 +1,83 @@
+"""
+Quiz Signal Handlers
+====================
+Keeps derived caches in sync with the Question table.
+
+Any save or delete of a question - from the manager page, the admin or
+the shell - bumps the question bank version so cached snapshots are
+reloaded on the next request, and updates the full-text search index in
+the same transaction. Changing a question's correct answer also
+queues a background re-score of the stored attempts. Changes to question
+sets and their membership bump the sets version, so set manifests are
+rebuilt. New database connections get the SQLite production profile
+(``database.py``).
+"""
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .bank import bump_bank_version
+from .database import configure_connection
+from .models import Question, QuizSet
+from .quizsets import bump_sets_version
+from .rescoring import schedule_rescore
+from .search import index_questions, remove_questions
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_bank(sender, **kwargs):
+    """
+    Bump the bank version once the surrounding transaction commits.
+
+    Bumping after commit prevents another worker from caching the old
+    rows under the new version while the write is still uncommitted.
+    """
+    transaction.on_commit(bump_bank_version)
+
+
+@receiver(post_save, sender=Question)
+def rescore_on_answer_change(sender, instance, created, **kwargs):
+    """
+    Queue a re-score of stored attempts when the correct answer changed.
+
+    The job starts after commit, so it grades against the saved answer.
+    """
+    if not created and instance.correct_answer_changed():
+        transaction.on_commit(lambda: schedule_rescore([instance.pk]))
+    instance._loaded_correct_answer = instance.correct_answer
+
+
+@receiver(post_save, sender=Question)
+def index_question_text(sender, instance, using, update_fields=None, **kwargs):
+    """Add or refresh the question in the search index."""
+    if update_fields is None or 'text' in update_fields:
+        index_questions([instance], using=using)
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, using, **kwargs):
+    """Remove a deleted question from the search index."""
+    remove_questions([instance.pk], using=using)
+
+
+@receiver(post_save, sender=QuizSet)
+@receiver(post_delete, sender=QuizSet)
+def invalidate_set_manifests(sender, **kwargs):
+    """Rebuild set manifests once a set change commits."""
+    transaction.on_commit(bump_sets_version)
+
+
+@receiver(m2m_changed, sender=QuizSet.questions.through)
+def invalidate_set_membership(sender, action, **kwargs):
+    """Rebuild set manifests once a membership change commits."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_sets_version)
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    """Apply the SQLite production profile to a new connection."""
+    configure_connection(connection)
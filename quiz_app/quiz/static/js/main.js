@@ -268,3 +268,155 @@ document.head.appendChild(style);
 
 // Call form handler
 handleQuizSubmit();
+
+/**
+ * Client-side quiz driver
+ * Loads every question with one API call and submits all answers at once,
+ * so an attempt costs two requests instead of one page load per question.
+ * If the API is unavailable the regular form flow keeps working.
+ */
+function initQuizApi() {
+    const container = document.querySelector('.quiz-container[data-api-start]');
+    if (!container || !window.fetch) return;
+
+    const form = container.querySelector('.answer-form');
+    const csrfInput = form && form.querySelector('input[name="csrfmiddlewaretoken"]');
+    if (!csrfInput) return;
+
+    fetch(container.dataset.apiStart, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': csrfInput.value },
+        credentials: 'same-origin',
+    })
+        .then(response => response.ok ? response.json() : Promise.reject(response))
+        .then(data => {
+            if (data.questions.length) {
+                runClientQuiz(container, form, csrfInput.value, data);
+            }
+        })
+        .catch(() => {
+            // Keep the server-rendered form flow
+        });
+}
+
+/**
+ * Run the attempt locally and submit the answer sheet at the end
+ */
+function runClientQuiz(container, form, csrfToken, data) {
+    const questions = data.questions;
+    const answers = [];
+    let index = 0;
+    let shownAt = performance.now();
+
+    const questionText = container.querySelector('.question-text');
+    const optionsContainer = container.querySelector('.options-container');
+    const questionIdInput = form.querySelector('input[name="question_id"]');
+    const counter = container.querySelector('.question-counter');
+    const progressBar = container.querySelector('.progress-bar');
+    const progressPercentage = container.querySelector('.progress-percentage');
+    const questionCard = container.querySelector('.question-card');
+    const submitButton = form.querySelector('button[type="submit"]');
+
+    function buildOption(option) {
+        const label = document.createElement('label');
+        label.className = 'option-label';
+
+        const input = document.createElement('input');
+        input.type = 'radio';
+        input.name = 'answer';
+        input.value = option.value;
+        input.className = 'option-input';
+        input.required = true;
+
+        const box = document.createElement('div');
+        box.className = 'option-box';
+        const letter = document.createElement('span');
+        letter.className = 'option-letter';
+        letter.textContent = option.label;
+        const text = document.createElement('span');
+        text.className = 'option-text';
+        text.textContent = option.text;
+        box.append(letter, text);
+
+        label.append(input, box);
+        return label;
+    }
+
+    function showQuestion() {
+        const question = questions[index];
+        const progress = Math.round(((index + 1) / questions.length) * 100);
+
+        questionText.textContent = question.text;
+        questionIdInput.value = question.id;
+        optionsContainer.replaceChildren(...question.options.map(buildOption));
+
+        counter.textContent = `السؤال ${index + 1} من ${questions.length}`;
+        progressBar.style.width = `${progress}%`;
+        progressPercentage.textContent = `${progress}%`;
+
+        // Undo the submit effects of the page-load handlers
+        questionCard.style.opacity = '1';
+        submitButton.disabled = false;
+        submitButton.style.opacity = '';
+        submitButton.innerHTML = '';
+        submitButton.append(index === questions.length - 1 ? 'إنهاء الكويز ' : 'السؤال التالي ');
+        const arrow = document.createElement('span');
+        arrow.className = 'btn-arrow';
+        arrow.textContent = '→';
+        submitButton.append(arrow);
+
+        addOptionListeners();
+        initializeAnimations();
+        shownAt = performance.now();
+    }
+
+    function submitAnswers() {
+        fetch(data.submit_url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({ answers: answers }),
+        })
+            .then(response => response.ok ? response.json() : Promise.reject(response))
+            .then(result => {
+                window.location.href = result.results_url;
+            })
+            .catch(() => {
+                showNotification('حدث خطأ، حاولي مرة أخرى', 'error');
+                submitButton.disabled = false;
+                submitButton.style.opacity = '';
+            });
+    }
+
+    form.addEventListener('submit', function (e) {
+        e.preventDefault();
+        // Every question is answered - retry a failed submission as is
+        if (index >= questions.length) {
+            submitAnswers();
+            return;
+        }
+
+        const selected = form.querySelector('input[name="answer"]:checked');
+        if (!selected) return;
+
+        answers.push({
+            question_id: questions[index].id,
+            answer: selected.value,
+            time_ms: Math.round(performance.now() - shownAt),
+        });
+        index += 1;
+
+        if (index < questions.length) {
+            showQuestion();
+        } else {
+            submitAnswers();
+        }
+    });
+
+    showQuestion();
+}
+
+document.addEventListener('DOMContentLoaded', initQuizApi);
@@ -0,0 +1,135 @@
+"""
+Question Statistics
+===================
+Incremental maintenance of the QuestionStats rollup table.
+
+``record_answer_stats`` folds the answers of one completed attempt into
+the counters with a fixed number of statements (an idempotent insert of
+missing rows plus one UPDATE per chunk of questions), independent of how
+many attempts have been stored. ``rebuild_question_stats`` recomputes the
+table from the raw AttemptAnswer rows in bounded batches.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from .models import AttemptAnswer, Question, QuestionStats
+
+# Questions updated per UPDATE statement (keeps the SQL parameter count low)
+UPDATE_CHUNK_SIZE = 200
+
+
+def counter_increment(field, increments):
+    """
+    Build ``field + CASE question_id WHEN ... END`` for an UPDATE.
+
+    Questions sharing the same increment are grouped into one WHEN clause.
+
+    Args:
+        field (str): Counter field name
+        increments (dict): question_id -> amount to add
+
+    Returns:
+        Expression: Update expression for the field
+    """
+    by_amount = defaultdict(list)
+    for question_id, amount in increments.items():
+        by_amount[amount].append(question_id)
+
+    whens = [When(question_id__in=ids, then=Value(amount)) for amount, ids in by_amount.items()]
+    return F(field) + Case(*whens, default=Value(0))
+
+
+def record_answer_stats(answers):
+    """
+    Add the answers of a completed attempt to the QuestionStats counters.
+
+    Must be called inside the transaction that saves the answers.
+
+    Args:
+        answers (list): AttemptAnswer objects of the attempt
+    """
+    counters = defaultdict(lambda: defaultdict(int))
+    for row in answers:
+        if row.question_id is None:
+            continue
+        counters['answered_count'][row.question_id] += 1
+        if row.is_correct:
+            counters['correct_count'][row.question_id] += 1
+        option_field = QuestionStats.OPTION_FIELDS.get(row.answer)
+        if option_field:
+            counters[option_field][row.question_id] += 1
+        if row.time_ms is not None:
+            counters['timed_count'][row.question_id] += 1
+            counters['total_time_ms'][row.question_id] += row.time_ms
+
+    question_ids = list(counters['answered_count'])
+    if not question_ids:
+        return
+
+    QuestionStats.objects.bulk_create(
+        [QuestionStats(question_id=question_id) for question_id in question_ids],
+        ignore_conflicts=True,
+    )
+
+    for start in range(0, len(question_ids), UPDATE_CHUNK_SIZE):
+        chunk = set(question_ids[start:start + UPDATE_CHUNK_SIZE])
+        updates = {}
+        for field, increments in counters.items():
+            chunk_increments = {qid: n for qid, n in increments.items() if qid in chunk}
+            if chunk_increments:
+                updates[field] = counter_increment(field, chunk_increments)
+        QuestionStats.objects.filter(question_id__in=chunk).update(**updates)
+
+
+def rebuild_question_stats(batch_size=500):
+    """
+    Recompute QuestionStats from the raw AttemptAnswer rows.
+
+    Questions are processed in keyset-paginated batches; each batch is one
+    GROUP BY query and one transaction replacing its statistics rows, so
+    memory use is bounded by ``batch_size`` whatever the number of answers.
+
+    Args:
+        batch_size (int): Number of questions per batch
+
+    Yields:
+        int: Number of questions processed so far, after each batch
+    """
+    aggregates = {
+        'answered_count': Count('id'),
+        'correct_count': Count('id', filter=Q(is_correct=True)),
+        'timed_count': Count('time_ms'),
+        'total_time_ms': Sum('time_ms', default=0),
+    }
+    for value, field in QuestionStats.OPTION_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(answer=value))
+
+    processed = 0
+    last_id = 0
+    while True:
+        question_ids = list(
+            Question.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not question_ids:
+            break
+
+        rows = (
+            AttemptAnswer.objects.filter(question_id__in=question_ids)
+            .order_by()
+            .values('question_id')
+            .annotate(**aggregates)
+        )
+        stats = [QuestionStats(**row) for row in rows]
+
+        with transaction.atomic():
+            QuestionStats.objects.filter(question_id__in=question_ids).delete()
+            QuestionStats.objects.bulk_create(stats)
+
+        processed += len(question_ids)
+        last_id = question_ids[-1]
+        yield processed
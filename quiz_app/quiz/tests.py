@@ -0,0 +1,1615 @@
+"""
+Quiz Tests
+==========
+Behaviour tests of the quiz app, and exact database query budgets for
+every page, checked against question banks of several sizes.
+
+Query budgets: each view and HTTP method has a fixed number of queries in
+``QUERY_BUDGETS``. The tests seed banks of growing size, play each
+request once to warm the per-version caches, then measure it. A test
+fails when:
+
+- a request runs more or fewer queries than its budget (update the
+  budget deliberately when a change is meant to alter it), or
+- the rows a request fetches grow with the bank (the two largest banks
+  are both bigger than any page or window, so they must fetch the same
+  number of rows).
+
+Set ``QUIZ_QUERY_BUDGET_REPORT=<path>`` to also write the measured
+queries and rows per bank size as JSON.
+
+Usage:
+    python manage.py test quiz
+"""
+
+import csv
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from unittest import mock, skipIf
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.serializers import JSONSerializer
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.backends.utils import CursorWrapper
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import async_views, grading, metrics, urls
+from .api import MAX_TIME_MS
+from .attempt import ATTEMPT_KEY, PROGRESS_KEY, STATE_FORMAT, AttemptState
+from .bank import (
+    VERSION_CACHE_ALIAS, bump_bank_version, fetch_question_window, get_bank_version, get_question_bank,
+    get_question_count,
+)
+from .benchmark import STEPS, parse_server_timing, percentile, run_load, seed_bank
+from .database import LOCK_RETRIES, SQLITE_PRAGMAS, retry_on_locked
+from .exporters import SUPPORTED_FORMATS as SUPPORTED_EXPORT_FORMATS, iter_export
+from . import rescoring
+from .importers import import_questions
+from .metrics import RequestSample
+from .middleware import format_server_timing
+from .models import AttemptAnswer, Question, QuestionQuerySet, QuestionStats, QuizAttempt, QuizSet, ScoreBucket
+from .leaderboard import BANK_QUIZ, SAMPLE_QUIZ, get_histogram, get_leaderboard, get_quiz_key
+from .pagination import get_keyset_page, parse_cursor
+from .quizsets import bump_sets_version, get_set_manifest
+from .routers import REPLICA_DB_ALIAS, primary_reads, read_from_primary
+from .search import FTS_TABLE, build_match_query, filter_questions, fts_available, index_text, normalize_text
+from .stats import rebuild_question_stats
+from .views import MANAGER_PASSWORD, get_quiz_context
+
+# Bank sizes measured; the two largest must exceed every page/window size
+BANK_SIZES = (10, 150, 600)
+
+# Questions of the completed attempt whose results page is measured
+ANSWERS_BEFORE_RESULTS = 3
+
+# Exact queries per request, once the bank version caches are warm
+QUERY_BUDGETS = {
+    ('home', 'GET'): 0,
+    ('quiz', 'GET'): 1,
+    ('quiz', 'POST'): 0,
+    ('results', 'GET'): 11,
+    ('manager', 'GET'): 2,
+    ('manager', 'POST add'): 4,
+    ('manager', 'POST delete'): 7,
+    ('admin changelist', 'GET'): 3,
+}
+
+# Emitted by TestCase's wrapping transaction only, not counted
+SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+class FrozenClock:
+    """
+    Stand-in for the ``time`` module of ``attempt.py``: time only moves
+    when the test says so.
+
+    Attempt start times are part of the durable session data, so whether
+    a request writes ``django_session`` must not depend on the wall clock.
+    """
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def tick(self, seconds=1):
+        self.now += seconds
+
+
+# Every cache alias in memory, one store per alias: the file-based version
+# and session caches of settings.py are shared with a running server
+TEST_CACHES = {
+    alias: {**config, 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'quiz-tests-{alias}'}
+    for alias, config in settings.CACHES.items()
+}
+
+
+class EmptyCachesMixin:
+    """
+    Start every test with empty caches.
+
+    For test classes running with ``override_settings(CACHES=TEST_CACHES)``:
+    the in-memory stores outlive a test class, and on_commit version bumps
+    never run inside TestCase, so snapshots cached by one class would be
+    served to the next.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+
+@contextmanager
+def count_rows():
+    """
+    Count the rows fetched from database cursors inside the block.
+
+    Yields:
+        list: One-item list holding the running row count
+    """
+    fetched = [0]
+
+    def wrap(name, count):
+        def fetch(self, *args):
+            rows = self.db.wrap_database_errors(getattr(self.cursor, name))(*args)
+            fetched[0] += count(rows)
+            return rows
+        return fetch
+
+    with mock.patch.multiple(
+        CursorWrapper,
+        create=True,
+        fetchone=wrap('fetchone', lambda row: row is not None),
+        fetchmany=wrap('fetchmany', len),
+        fetchall=wrap('fetchall', len),
+    ):
+        yield fetched
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, QUIZ_RESCORE_ASYNC=False, CACHES=TEST_CACHES)
+class QueryBudgetTests(EmptyCachesMixin, TestCase):
+    """
+    Query budgets of every view, against banks of ``BANK_SIZES``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.measured = {}
+        self.clock = FrozenClock()
+        patcher = mock.patch('quiz.attempt.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def measure(self, size, step, request):
+        """
+        Run one request and store its query and row counts.
+
+        Args:
+            size (int): Current bank size
+            step (tuple): ``QUERY_BUDGETS`` key of the request
+            request (callable): Performs the request and returns the response
+
+        Returns:
+            HttpResponse: The response
+        """
+        with CaptureQueriesContext(connection) as queries, count_rows() as rows:
+            response = request()
+        self.assertLess(response.status_code, 400, f"{step} failed at bank size {size}")
+        sql = [
+            query['sql'] for query in queries.captured_queries
+            if not query['sql'].startswith(SAVEPOINT_PREFIXES)
+        ]
+        self.measured.setdefault(step, {})[size] = {'queries': len(sql), 'rows': rows[0], 'sql': sql}
+        return response
+
+    def play_quiz(self, size, client):
+        # Warm the bank caches with a first attempt, then measure a second
+        url = reverse('quiz')
+        response = client.get(url)
+        client.post(url, {'question_id': response.context['question'].id, 'answer': 'A'})
+        # Starting the new attempt stamps a new start time: one durable write
+        self.clock.tick(60)
+        response = self.measure(size, ('quiz', 'GET'), lambda: client.get(url))
+
+        data = {'question_id': response.context['question'].id, 'answer': 'A'}
+        self.measure(size, ('quiz', 'POST'), lambda: client.post(url, data))
+
+        # Only completed attempts are stored and ranked: finish a sampled
+        # quiz, so the answers stored don't grow with the bank
+        response = client.get(url, {'sample': ANSWERS_BEFORE_RESULTS})
+        for _ in range(ANSWERS_BEFORE_RESULTS):
+            response = client.post(url, {'question_id': response.context['question'].id, 'answer': 'A'})
+        self.assertRedirects(response, reverse('results'), fetch_redirect_response=False)
+        self.measure(size, ('results', 'GET'), lambda: client.get(reverse('results')))
+
+    def manage_questions(self, size, client):
+        client.post(reverse('manager_login'), {'password': MANAGER_PASSWORD})
+        url = reverse('manager')
+        client.get(url)
+        self.measure(size, ('manager', 'GET'), lambda: client.get(url))
+        self.measure(size, ('manager', 'POST add'), lambda: client.post(url, {
+            'action': 'add',
+            'question_text': 'سؤال جديد',
+            'question_type': 'TF',
+            'correct_answer': 'True',
+        }))
+        last = Question.objects.order_by('-id').values_list('id', flat=True).first()
+        self.measure(size, ('manager', 'POST delete'), lambda: client.post(url, {
+            'action': 'delete',
+            'question_id': last,
+        }))
+
+    def browse_admin(self, size, client, admin_user):
+        client.force_login(admin_user)
+        url = reverse('admin:quiz_question_changelist')
+        client.get(url)
+        self.measure(size, ('admin changelist', 'GET'), lambda: client.get(url))
+
+    def test_query_budgets(self):
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+
+        for size in BANK_SIZES:
+            seed_bank(size)
+            # New bank version: on_commit bumps never run inside TestCase
+            for alias in TEST_CACHES:
+                caches[alias].clear()
+            # Every bank size ranks its attempt against an empty leaderboard
+            QuizAttempt.objects.all().delete()
+            ScoreBucket.objects.all().delete()
+
+            home = reverse('home')
+            self.client.get(home)
+            self.measure(size, ('home', 'GET'), lambda: self.client.get(home))
+            self.play_quiz(size, self.client_class())
+            self.manage_questions(size, self.client_class())
+            self.browse_admin(size, self.client_class(), admin_user)
+
+        report_path = os.environ.get('QUIZ_QUERY_BUDGET_REPORT')
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as stream:
+                json.dump({
+                    ' '.join(step): {size: {'queries': data['queries'], 'rows': data['rows']}
+                                     for size, data in sizes.items()}
+                    for step, sizes in self.measured.items()
+                }, stream, indent=2)
+
+        largest, second = BANK_SIZES[-1], BANK_SIZES[-2]
+        for step, budget in QUERY_BUDGETS.items():
+            with self.subTest(step=' '.join(step)):
+                sizes = self.measured[step]
+                for size in BANK_SIZES:
+                    self.assertEqual(
+                        sizes[size]['queries'], budget,
+                        f"{' '.join(step)} ran {sizes[size]['queries']} queries at bank size {size} "
+                        f"(budget {budget}):\n" + '\n'.join(sizes[size]['sql']),
+                    )
+                self.assertEqual(
+                    sizes[largest]['rows'], sizes[second]['rows'],
+                    f"{' '.join(step)} fetched {sizes[second]['rows']} rows at bank size {second} "
+                    f"but {sizes[largest]['rows']} at {largest}",
+                )
+
+
+def run_in_process(code, **environ):
+    """
+    Run Python code in a separate Django process of this project.
+
+    Args:
+        code (str): Code to run after ``django.setup()``
+        **environ: Extra environment variables
+
+    Returns:
+        str: Standard output of the process
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', 'import django; django.setup()\n' + code],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'quiz_project.settings', **environ},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    if result.returncode:
+        raise AssertionError(result.stderr)
+    return result.stdout
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SharedVersionTests(EmptyCachesMixin, TestCase):
+    """
+    The bank and sets versions are shared by every process on the host.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.version_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.version_dir.cleanup)
+        # A file-based store of its own, like the one settings.py configures
+        versions = {
+            **TEST_CACHES[VERSION_CACHE_ALIAS],
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.version_dir.name,
+        }
+        override = override_settings(CACHES={**settings.CACHES, VERSION_CACHE_ALIAS: versions})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_bump_from_another_process_reloads_snapshot(self):
+        Question.objects.create(text='سؤال 1', question_type='TF', correct_answer='True')
+        bank = get_question_bank()
+        self.assertEqual(len(bank), 1)
+
+        # Added without a bump (on_commit never runs inside TestCase)
+        Question.objects.create(text='سؤال 2', question_type='TF', correct_answer='False')
+        self.assertIs(get_question_bank(), bank)
+
+        # e.g. import_questions run from a management command
+        output = run_in_process(
+            'from quiz.bank import bump_bank_version; print(bump_bank_version())',
+            QUIZ_VERSION_CACHE_DIR=self.version_dir.name,
+        )
+        self.assertEqual(get_bank_version(), int(output))
+        self.assertEqual(len(get_question_bank()), 2)
+
+    def test_sets_bump_from_another_process_reloads_manifest(self):
+        first = Question.objects.create(text='سؤال 1', question_type='TF', correct_answer='True')
+        second = Question.objects.create(text='سؤال 2', question_type='TF', correct_answer='False')
+        quiz_set = QuizSet.objects.create(name='مجموعة', slug='set')
+        quiz_set.questions.add(first)
+        manifest = get_set_manifest('set')
+        self.assertEqual(manifest.question_ids, (first.id,))
+
+        quiz_set.questions.add(second)
+        self.assertIs(get_set_manifest('set'), manifest)
+
+        run_in_process(
+            'from quiz.quizsets import bump_sets_version; bump_sets_version()',
+            QUIZ_VERSION_CACHE_DIR=self.version_dir.name,
+        )
+        self.assertEqual(get_set_manifest('set').question_ids, (first.id, second.id))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QuestionWindowTests(EmptyCachesMixin, TestCase):
+    """
+    The current/next question window walks the bank in ``(order, id)`` order.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.questions = [
+            Question.objects.create(text=f'سؤال {number}', question_type='TF', correct_answer='True', order=order)
+            for number, order in enumerate((3, 2, 1, 2, 2), start=1)
+        ]
+
+    def walk(self):
+        walked = []
+        cursor = None
+        while True:
+            current, upcoming = fetch_question_window(cursor)
+            if current is None:
+                return walked
+            walked.append((current.id, upcoming.id if upcoming else None))
+            cursor = (current.order, current.id)
+
+    def test_snapshot_and_query_walk_the_same_order(self):
+        ids = [question.id for question in sorted(self.questions, key=lambda question: (question.order, question.id))]
+        expected = list(zip(ids, ids[1:] + [None]))
+
+        self.assertEqual(self.walk(), expected)
+        with self.settings(QUIZ_BANK_SNAPSHOT_MAX=0):
+            self.assertEqual(self.walk(), expected)
+
+    @override_settings(QUIZ_BANK_SNAPSHOT_MAX=0)
+    def test_large_bank_fetches_two_rows(self):
+        get_question_count()
+        middle = self.questions[1]
+        with self.assertNumQueries(1), count_rows() as rows:
+            current, upcoming = fetch_question_window((middle.order, middle.id))
+
+        self.assertEqual((current.id, upcoming.id), (self.questions[3].id, self.questions[4].id))
+        self.assertEqual(rows[0], 2)
+
+
+@override_settings(CACHES=TEST_CACHES, QUIZ_FRAGMENT_CACHE_TIMEOUT=3600)
+class FragmentCacheTests(EmptyCachesMixin, SimpleTestCase):
+    """
+    Question cards are cached per question and bank version.
+    """
+
+    def render(self, question, bank_version):
+        request = RequestFactory().get('/quiz/')
+        return render_to_string('quiz.html', get_quiz_context(question, 0, 3, bank_version), request=request)
+
+    def test_card_reused_until_bank_version_changes(self):
+        question = Question(id=5, order=1, text='السؤال الأول', question_type='TF', correct_answer='True')
+        self.assertIn('السؤال الأول', self.render(question, bank_version=1))
+
+        question.text = 'السؤال المعدل'
+        self.assertIn('السؤال الأول', self.render(question, bank_version=1))
+        self.assertIn('السؤال المعدل', self.render(question, bank_version=2))
+
+    @override_settings(QUIZ_FRAGMENT_CACHE_TIMEOUT=0)
+    def test_development_mode_never_reuses(self):
+        question = Question(id=5, order=1, text='السؤال الأول', question_type='TF', correct_answer='True')
+        self.render(question, bank_version=1)
+
+        question.text = 'السؤال المعدل'
+        self.assertIn('السؤال المعدل', self.render(question, bank_version=1))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=TEST_CACHES)
+class ConditionalGetTests(EmptyCachesMixin, TestCase):
+    """
+    Repeat visitors of the home page are answered from the bank validators.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Question.objects.create(text='سؤال 1', question_type='TF', correct_answer='True', order=1)
+
+    def test_home_not_modified_until_bank_changes(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        Question.objects.create(text='سؤال 2', question_type='TF', correct_answer='True', order=2)
+        # on_commit never runs inside TestCase
+        bump_bank_version()
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=TEST_CACHES, QUIZ_METRICS_ENABLED=True,
+                   QUIZ_METRICS_SERVER_TIMING=True, QUIZ_METRICS_TOKEN='scrape-token')
+class MetricsTests(EmptyCachesMixin, TestCase):
+    """
+    Request instrumentation: Server-Timing headers and the metrics endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Question.objects.create(text='سؤال 1', question_type='TF', correct_answer='True', order=1)
+
+    def setUp(self):
+        super().setUp()
+        # A registry of this test only, shared by the middleware and the endpoint
+        self.registry = metrics.Registry()
+        for target in ('quiz.metrics.registry', 'quiz.middleware.registry'):
+            patcher = mock.patch(target, self.registry)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_server_timing_reports_queries_and_session(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quiz'))
+
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+", tpl;dur=[\d.]+, session;desc="\d+"$')
+        self.assertIn(f';desc="{len(queries)}", tpl;', timing)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('home'))
+        self.client.get(reverse('home'))
+
+        self.assertRedirects(self.client.get(reverse('manager_metrics')), reverse('manager_login'))
+        response = self.client.get(reverse('manager_metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('quiz_requests_total{view="home",method="GET",status="200"} 2\n', body)
+        self.assertIn('quiz_request_duration_seconds_count{view="home"} 2\n', body)
+
+    @override_settings(QUIZ_METRICS_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(self.client.get(reverse('manager_metrics')).status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=TEST_CACHES)
+class ClientDriverTests(EmptyCachesMixin, TestCase):
+    """
+    The JSON API client driver only takes over fresh full-bank attempts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.questions = [
+            Question.objects.create(text=f'سؤال {number}', question_type='TF', correct_answer='True', order=number)
+            for number in range(1, 6)
+        ]
+
+    def start_api(self):
+        return self.client.post(reverse('api_start'))
+
+    def test_full_bank_attempt_uses_client_driver(self):
+        response = self.client.get(reverse('quiz'))
+        self.assertContains(response, 'data-api-start=')
+
+        response = self.start_api()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], len(self.questions))
+
+        # Answer pages of the form flow never restart the attempt
+        response = self.client.post(reverse('quiz'), {'question_id': self.questions[0].id, 'answer': 'True'})
+        self.assertNotContains(response, 'data-api-start=')
+
+    def test_sample_survives_page_load(self):
+        response = self.client.get(reverse('quiz'), {'sample': 3})
+        self.assertNotContains(response, 'data-api-start=')
+        sample = AttemptState.load(self.client.session).sample
+        self.assertEqual(len(sample), 3)
+
+        # What the driver would have sent, had the page linked it
+        self.assertEqual(self.start_api().status_code, 409)
+        state = AttemptState.load(self.client.session)
+        self.assertEqual(state.sample, sample)
+
+        response = self.client.post(reverse('quiz'), {'question_id': sample[0], 'answer': 'True'})
+        self.assertEqual(response.context['question'].id, sample[1])
+        self.assertEqual(response.context['total_questions'], 3)
+
+    def test_question_set_survives_page_load(self):
+        quiz_set = QuizSet.objects.create(name='مجموعة', slug='set')
+        quiz_set.questions.add(self.questions[1], self.questions[3])
+
+        response = self.client.get(reverse('quiz_set', args=['set']))
+        self.assertNotContains(response, 'data-api-start=')
+        self.assertEqual(self.start_api().status_code, 409)
+        self.assertEqual(AttemptState.load(self.client.session).quiz_set, 'set')
+
+        response = self.client.post(reverse('quiz_set', args=['set']),
+                                    {'question_id': self.questions[1].id, 'answer': 'True'})
+        self.assertEqual(response.context['question'].id, self.questions[3].id)
+        self.assertEqual(response.context['total_questions'], 2)
+
+    def test_submit_validates_answer_times(self):
+        submit = reverse('api_submit')
+
+        for time_ms in (True, '12', 1.5):
+            with self.subTest(time_ms=time_ms):
+                self.client.get(reverse('quiz'))
+                self.start_api()
+                response = self.client.post(submit, json.dumps({'answers': [
+                    {'question_id': self.questions[0].id, 'answer': 'True', 'time_ms': time_ms},
+                ]}), content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+        self.start_api()
+        response = self.client.post(submit, json.dumps({'answers': [
+            {'question_id': self.questions[0].id, 'answer': 'True', 'time_ms': 10 ** 20},
+            {'question_id': self.questions[1].id, 'answer': 'True', 'time_ms': -5},
+            {'question_id': self.questions[2].id, 'answer': 'True', 'time_ms': 1200},
+        ]}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AttemptState.load(self.client.session).times[:3], [MAX_TIME_MS, 0, 1200])
+
+        response = self.client.get(reverse('results'))
+        self.assertEqual(response.context['score'], 3)
+
+    def test_submit_rejects_malformed_entries(self):
+        submit = reverse('api_submit')
+        question_id = self.questions[0].id
+        malformed = [
+            {'question_id': question_id, 'answer': ['True']},
+            {'question_id': question_id, 'answer': {'value': 'True'}},
+            {'question_id': question_id, 'answer': 1},
+            {'question_id': str(question_id), 'answer': 'True'},
+            {'question_id': True, 'answer': 'True'},
+            {'question_id': None, 'answer': 'True'},
+            {'answer': 'True'},
+            'True',
+        ]
+        self.client.get(reverse('quiz'))
+        for entry in malformed:
+            with self.subTest(entry=entry):
+                self.start_api()
+                response = self.client.post(submit, json.dumps({'answers': [entry]}),
+                                            content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                # The attempt is left untouched
+                self.assertEqual(AttemptState.load(self.client.session).position, 0)
+
+        # A skipped question may be sent with a null answer
+        response = self.client.post(submit, json.dumps({'answers': [
+            {'question_id': question_id, 'answer': None},
+            {'question_id': self.questions[1].id, 'answer': 'True'},
+        ]}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['score'], 1)
+
+    @override_settings(QUIZ_BANK_SNAPSHOT_MAX=3)
+    def test_large_bank_keeps_form_flow(self):
+        response = self.client.get(reverse('quiz'))
+        self.assertNotContains(response, 'data-api-start=')
+        self.assertEqual(self.start_api().status_code, 409)
+
+        response = self.client.post(reverse('api_submit'), json.dumps({'answers': []}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+
+
+@override_settings(QUIZ_SQLITE_TUNING=False, CACHES=TEST_CACHES)
+class SQLiteProfileTests(EmptyCachesMixin, TransactionTestCase):
+    """
+    Connection PRAGMAs and lock retries of the SQLite production profile.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'profile.sqlite3')
+        # An existing database in the default rollback journal mode
+        sqlite3.connect(self.path).close()
+
+    def open(self, name):
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': name}, alias='profile')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    @override_settings(QUIZ_SQLITE_TUNING=True)
+    def test_pragmas_applied_to_new_connections(self):
+        wrapper = self.open(self.path)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)  # MEMORY
+        for name in ('mmap_size', 'cache_size', 'busy_timeout'):
+            with self.subTest(pragma=name):
+                self.assertEqual(self.pragma(wrapper, name), SQLITE_PRAGMAS[name])
+
+    @override_settings(QUIZ_SQLITE_TUNING=True)
+    def test_read_only_connection_skips_journal_mode(self):
+        wrapper = self.open(f'file:{self.path}?mode=ro')
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), SQLITE_PRAGMAS['busy_timeout'])
+
+    def test_untuned_connection_keeps_defaults(self):
+        wrapper = self.open(self.path)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 2)  # FULL
+
+    def test_locked_write_retried_outside_atomic(self):
+        write = mock.Mock(side_effect=[OperationalError('database is locked')] * 2 + ['saved'])
+        with mock.patch('quiz.database.time.sleep') as sleep:
+            self.assertEqual(retry_on_locked(write)(), 'saved')
+        self.assertEqual(write.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+        write = mock.Mock(side_effect=OperationalError('database is locked'))
+        with mock.patch('quiz.database.time.sleep'), self.assertRaises(OperationalError):
+            retry_on_locked(write)()
+        self.assertEqual(write.call_count, LOCK_RETRIES + 1)
+
+    def test_locked_write_reraised_inside_atomic(self):
+        write = mock.Mock(side_effect=OperationalError('database is locked'))
+        with mock.patch('quiz.database.time.sleep') as sleep, self.assertRaises(OperationalError):
+            with transaction.atomic():
+                retry_on_locked(write)()
+        self.assertEqual(write.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_other_errors_not_retried(self):
+        write = mock.Mock(side_effect=OperationalError('no such table: quiz_question'))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(write)()
+        self.assertEqual(write.call_count, 1)
+
+
+@override_settings(QUIZ_READ_REPLICA=True, CACHES=TEST_CACHES)
+class ReadReplicaRouterTests(EmptyCachesMixin, TransactionTestCase):
+    """
+    Question reads go to the replica unless they must see the primary's writes.
+    """
+    databases = {'default', REPLICA_DB_ALIAS}
+
+    def setUp(self):
+        super().setUp()
+        self.question = Question.objects.create(text='سؤال', question_type='TF', correct_answer='True')
+
+    def test_reads_outside_transaction_use_replica(self):
+        for queryset in (Question.objects.all(), QuizSet.objects.all(), QuestionStats.objects.all()):
+            with self.subTest(model=queryset.model.__name__):
+                self.assertEqual(queryset.db, REPLICA_DB_ALIAS)
+        question = Question.objects.get(pk=self.question.pk)
+        self.assertEqual(question._state.db, REPLICA_DB_ALIAS)
+        # Other models stay on the primary
+        self.assertEqual(QuizAttempt.objects.all().db, 'default')
+
+    def test_reads_inside_transaction_use_primary(self):
+        with transaction.atomic():
+            created = Question.objects.create(text='سؤال جديد', question_type='TF', correct_answer='False')
+            self.assertEqual(Question.objects.all().db, 'default')
+            # Sees its own uncommitted row
+            self.assertTrue(Question.objects.filter(pk=created.pk).exists())
+        self.assertEqual(Question.objects.all().db, REPLICA_DB_ALIAS)
+
+    def test_reads_under_primary_reads_use_primary(self):
+        with primary_reads():
+            self.assertEqual(Question.objects.all().db, 'default')
+        self.assertEqual(Question.objects.all().db, REPLICA_DB_ALIAS)
+
+        view = read_from_primary(lambda request: Question.objects.all().db)
+        self.assertEqual(view(None), 'default')
+
+    def test_writes_use_primary(self):
+        self.assertEqual(self.question._state.db, 'default')
+        # Also for instances read through the replica
+        question = Question.objects.get(pk=self.question.pk)
+        question.text = 'سؤال معدل'
+        with CaptureQueriesContext(connections['default']) as queries:
+            question.save()
+        self.assertTrue(any(query['sql'].startswith('UPDATE "quiz_question"') for query in queries))
+        self.assertEqual(question._state.db, 'default')
+        self.assertEqual(Question.objects.get(pk=question.pk).text, 'سؤال معدل')
+
+    @override_settings(QUIZ_READ_REPLICA=False)
+    def test_disabled_replica_reads_primary(self):
+        self.assertEqual(Question.objects.all().db, 'default')
+
+
+class AnswerKeyTests(SimpleTestCase):
+    """
+    ``AnswerKey.grade_many`` grades the same with and without NumPy.
+    """
+
+    QUESTION_IDS = [10, 11, 12, 13]
+    CORRECT_ANSWERS = ['B', 'True', ' false ', 'd']
+
+    SHEETS = [
+        [(10, 'B'), (11, 'True'), (12, 'False'), (13, 'D')],
+        # Normalized like Question.is_correct: stripped, case-insensitive
+        [(10, ' b '), (11, 'TRUE'), (12, 'false'), (13, 'd ')],
+        [(10, 'A'), (11, 'False'), (12, ''), (13, None)],
+        # Answers no question expects
+        [(10, 'E'), (11, 'maybe')],
+        [],
+        # Unknown questions never match, even with an answer the key knows
+        [(99, 'B'), (10, 'B'), (-1, 'True'), (100, ''), (101, None)],
+    ]
+
+    def grade(self, numpy):
+        with mock.patch.object(grading, 'np', grading.np if numpy else None):
+            key = grading.AnswerKey(self.QUESTION_IDS, self.CORRECT_ANSWERS)
+            return [(result.score, result.correct) for result in key.grade_many(self.SHEETS)]
+
+    def test_pure_python_grades(self):
+        self.assertEqual(self.grade(numpy=False), [
+            (4, [True, True, True, True]),
+            (4, [True, True, True, True]),
+            (0, [False, False, False, False]),
+            (0, [False, False]),
+            (0, []),
+            (1, [False, True, False, False, False]),
+        ])
+
+    @skipIf(grading.np is None, "NumPy is not installed")
+    def test_numpy_matches_pure_python(self):
+        self.assertEqual(self.grade(numpy=True), self.grade(numpy=False))
+
+    def test_unknown_questions_never_match(self):
+        for numpy in (True, False):
+            if numpy and grading.np is None:
+                continue
+            with self.subTest(numpy=numpy), mock.patch.object(grading, 'np', grading.np if numpy else None):
+                key = grading.AnswerKey([], [])
+                result = key.grade([(1, ''), (2, None), (3, 'True')])
+                self.assertEqual((result.score, result.correct), (0, [False, False, False]))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=TEST_CACHES)
+@mock.patch('quiz.views.DEFAULT_PAGE_SIZE', 2)
+class ManagerDeleteTests(EmptyCachesMixin, TestCase):
+    """
+    Deleting from the manager list returns to a page that still lists questions.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.questions = [
+            Question.objects.create(text=f'سؤال {number}', question_type='TF', correct_answer='True', order=number)
+            for number in range(1, 4)
+        ]
+        self.client.post(reverse('manager_login'), {'password': MANAGER_PASSWORD})
+
+    def delete(self, query, question):
+        return self.client.post(f"{reverse('manager')}?{query}", {'action': 'delete', 'question_id': question.id})
+
+    def test_stays_on_page_with_questions_left(self):
+        query = f'after=1.{self.questions[0].id}'
+        response = self.delete(query, self.questions[1])
+        self.assertRedirects(response, f"{reverse('manager')}?{query}")
+
+    def test_empty_page_falls_back_to_first_page(self):
+        first_page = self.client.get(reverse('manager'))
+        cursor = first_page.context['questions'].next_cursor
+        self.assertEqual(len(self.client.get(reverse('manager') + f'?after={cursor}').context['questions']), 1)
+
+        response = self.delete(f'after={cursor}', self.questions[2])
+        self.assertRedirects(response, reverse('manager'))
+
+    def test_empty_search_page_keeps_search(self):
+        response = self.delete(f'q=سؤال&after=3.{self.questions[2].id}', self.questions[2])
+        self.assertRedirects(response, reverse('manager') + '?q=%D8%B3%D8%A4%D8%A7%D9%84', fetch_redirect_response=False)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KeysetPaginationTests(EmptyCachesMixin, TestCase):
+    """
+    ``(order, id)`` pages stay complete across runs of equal ``order`` values.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        orders = (2, 1, 2, 4, 2, 3, 2)
+        Question.objects.bulk_create(
+            Question(text=f'سؤال {number}', question_type='TF', correct_answer='True', order=order)
+            for number, order in enumerate(orders, start=1)
+        )
+        cls.ids = list(Question.objects.order_by('order', 'id').values_list('id', flat=True))
+
+    def page_ids(self, page):
+        return [question.id for question in page]
+
+    def test_forward_and_backward_pages_cover_every_question_once(self):
+        queryset = Question.objects.all()
+        pages = [get_keyset_page(queryset, size=3)]
+        while pages[-1].next_cursor:
+            pages.append(get_keyset_page(queryset, after=parse_cursor(pages[-1].next_cursor), size=3))
+
+        self.assertEqual([self.page_ids(page) for page in pages], [self.ids[0:3], self.ids[3:6], self.ids[6:]])
+        self.assertIsNone(pages[0].previous_cursor)
+
+        previous = get_keyset_page(queryset, before=parse_cursor(pages[-1].previous_cursor), size=3)
+        self.assertEqual(self.page_ids(previous), self.ids[3:6])
+        previous = get_keyset_page(queryset, before=parse_cursor(previous.previous_cursor), size=3)
+        self.assertEqual(self.page_ids(previous), self.ids[0:3])
+        self.assertIsNone(previous.previous_cursor)
+
+    def test_malformed_cursors_ignored(self):
+        for value in (None, '', '2', '2.x', '1.2.3'):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_cursor(value))
+
+
+def store_attempt(questions, answers, total=None):
+    """
+    Play and persist an attempt outside the views.
+
+    Args:
+        questions (list): Questions answered, in order
+        answers (list): Answer per question (None to skip)
+        total (int): Quiz size (default: number of questions)
+
+    Returns:
+        QuizAttempt: The stored attempt
+    """
+    state = AttemptState.start({}, get_bank_version())
+    for question, answer in zip(questions, answers):
+        state.record(question, answer)
+    return state.persist(len(questions) if total is None else total)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LeaderboardTests(EmptyCachesMixin, TestCase):
+    """
+    Attempts are only ranked against attempts of the same quiz.
+    """
+
+    def test_quizzes_of_the_same_length_ranked_apart(self):
+        questions = [
+            Question.objects.create(text=f'سؤال {number}', question_type='TF', correct_answer='True')
+            for number in range(3)
+        ]
+        quiz_set = QuizSet.objects.create(name='مجموعة', slug='set')
+        quiz_set.questions.add(*questions[:2])
+
+        bank = store_attempt(questions[:2], ['True', 'True'], total=3)
+        state = AttemptState.start({}, get_bank_version(), sample=[q.id for q in questions[:2]], seed=1)
+        state.record(questions[0], 'False')
+        state.record(questions[1], 'False')
+        sampled = state.persist(2)
+        state = AttemptState.start({}, get_bank_version(), quiz_set='set')
+        state.record(questions[0], 'True')
+        state.record(questions[1], 'False')
+        in_set = state.persist(2, quiz_set_id=quiz_set.id)
+
+        set_quiz = get_quiz_key(quiz_set.id)
+        self.assertEqual((bank.quiz_key, sampled.quiz_key, in_set.quiz_key), (BANK_QUIZ, SAMPLE_QUIZ, set_quiz))
+        self.assertEqual(get_histogram(SAMPLE_QUIZ, 2), [1, 0, 0])
+        self.assertEqual(get_histogram(set_quiz, 2), [0, 1, 0])
+        self.assertEqual([entry['id'] for entry in get_leaderboard(set_quiz, 2)], [in_set.id])
+        self.assertEqual([entry['id'] for entry in get_leaderboard(BANK_QUIZ, 3)], [bank.id])
+        self.assertEqual(get_leaderboard(BANK_QUIZ, 2), [])
+
+
+class AttemptStateTests(SimpleTestCase):
+    """
+    Compact session encoding of an in-progress attempt.
+    """
+
+    def setUp(self):
+        self.clock = FrozenClock()
+        patcher = mock.patch('quiz.attempt.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def play(self, session):
+        state = AttemptState.start(session, bank_version=7, sample=[12, 10, 11, 13], seed=42)
+        questions = [
+            (Question(id=12, order=1, question_type='MCQ', correct_answer='B'), 'B'),
+            (Question(id=10, order=2, question_type='TF', correct_answer='True'), 'False'),
+            (Question(id=11, order=2, question_type='TF', correct_answer='True'), None),
+        ]
+        for question, answer in questions:
+            self.clock.tick(2)
+            state.record(question, answer)
+        state.skip(13)
+        state.save(session)
+        return state
+
+    def test_round_trip_through_session_serializer(self):
+        session = {}
+        self.play(session)
+        serializer = JSONSerializer()
+        state = AttemptState.load(serializer.loads(serializer.dumps(session)))
+
+        self.assertEqual(
+            (state.bank_version, state.started_at, state.seed, state.sample, state.quiz_set),
+            (7, 1_700_000_000, 42, [12, 10, 11, 13], None),
+        )
+        self.assertEqual((state.score, state.cursor, state.position), (1, (2, 11), 4))
+        self.assertEqual(state.decoded_answers(), ['B', 'False', None, None])
+        self.assertEqual(state.question_ids, [12, 10, 11, 13])
+        self.assertEqual(state.times, [2000, 2000, 2000, 0])
+
+    def test_progress_is_flat(self):
+        session = {}
+        self.play(session)
+
+        self.assertEqual(session[PROGRESS_KEY], [1, 2, 11, 'BF--', [12, 10, 11, 13], [2000, 2000, 2000, 0],
+                                                 1_700_000_006_000])
+
+    def test_other_formats_discarded(self):
+        session = {}
+        self.play(session)
+        session[ATTEMPT_KEY] = [STATE_FORMAT - 1] + session[ATTEMPT_KEY][1:]
+
+        self.assertIsNone(AttemptState.load(session))
+        self.assertIsNone(AttemptState.load({}))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=TEST_CACHES, SESSION_ENGINE='quiz.sessions')
+class SessionWriteTests(EmptyCachesMixin, TestCase):
+    """
+    The session engine writes ``django_session`` at the start and the end
+    of an attempt only; answers go to the session cache.
+    """
+
+    QUESTIONS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.questions = [
+            Question.objects.create(text=f'سؤال {number}', question_type='TF', correct_answer='True', order=number)
+            for number in range(1, cls.QUESTIONS + 1)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        # Start times are durable session data - keep them off the wall clock
+        self.clock = FrozenClock()
+        patcher = mock.patch('quiz.attempt.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def session_writes(self, queries):
+        return [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('INSERT INTO "django_session"', 'UPDATE "django_session"',
+                                        'DELETE FROM "django_session"'))
+        ]
+
+    def answer(self, response):
+        self.clock.tick()
+        return self.client.post(reverse('quiz'), {'question_id': response.context['question'].id, 'answer': 'True'})
+
+    def test_attempt_writes_session_table_twice(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quiz'))
+            for _ in range(self.QUESTIONS):
+                response = self.answer(response)
+            self.assertRedirects(response, reverse('results'), fetch_redirect_response=False)
+            response = self.client.get(reverse('results'))
+
+        self.assertEqual(response.context['score'], self.QUESTIONS)
+        writes = self.session_writes(queries)
+        self.assertEqual(len(writes), 2, writes)
+        self.assertTrue(writes[0].startswith('INSERT'))
+        self.assertTrue(writes[1].startswith('DELETE'))
+
+    def test_lost_cache_entry_resumes_from_database(self):
+        response = self.client.get(reverse('quiz'))
+        for _ in range(2):
+            response = self.answer(response)
+        self.assertEqual(response.context['question'].id, self.questions[2].id)
+
+        # The cached progress is lost, e.g. evicted or a cache restart
+        caches['sessions'].clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.answer(response)
+        # Resumed from the last database copy: the start of the attempt,
+        # so the submission is stale and the first question is shown again
+        self.assertEqual(response.context['question'].id, self.questions[0].id)
+        self.assertEqual(self.session_writes(queries), [])
+
+        for _ in range(self.QUESTIONS):
+            response = self.answer(response)
+        response = self.client.get(reverse('results'))
+        attempt = QuizAttempt.objects.get(pk=response.context['attempt_id'])
+        self.assertEqual((attempt.score, attempt.total, attempt.answers.count()), (5, 5, 5))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=TEST_CACHES)
+class ResultsTests(EmptyCachesMixin, TestCase):
+    """
+    Only completed attempts are stored and ranked.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.questions = [
+            Question.objects.create(text=f'سؤال {number}', question_type='TF', correct_answer='True', order=number)
+            for number in range(1, 4)
+        ]
+
+    def answer(self, count):
+        response = self.client.get(reverse('quiz'))
+        for _ in range(count):
+            response = self.client.post(reverse('quiz'), {
+                'question_id': response.context['question'].id,
+                'answer': 'True',
+            })
+        return response
+
+    def test_incomplete_attempt_not_stored(self):
+        self.answer(2)
+        response = self.client.get(reverse('results'))
+        self.assertEqual((response.context['score'], response.context['total']), (2, 3))
+        self.assertIsNone(response.context['attempt_id'])
+        self.assertIsNone(response.context['percentile'])
+        self.assertFalse(QuizAttempt.objects.exists())
+        self.assertFalse(ScoreBucket.objects.exists())
+        self.assertFalse(QuestionStats.objects.exists())
+
+    def test_completed_attempt_stored_and_ranked(self):
+        self.assertRedirects(self.answer(3), reverse('results'), fetch_redirect_response=False)
+        response = self.client.get(reverse('results'))
+        attempt = QuizAttempt.objects.get()
+        self.assertEqual(response.context['attempt_id'], attempt.id)
+        self.assertEqual((attempt.score, attempt.total), (3, 3))
+        self.assertEqual(get_histogram(BANK_QUIZ, 3), [0, 0, 0, 1])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PersistTests(EmptyCachesMixin, TestCase):
+    """
+    Storing completed attempts: answers, links and statistics.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.mcq = Question.objects.create(
+            text='سؤال 1', question_type='MCQ', option_a='أ', option_b='ب', option_c='ج', option_d='د',
+            correct_answer='B', order=1,
+        )
+        self.tf = Question.objects.create(text='سؤال 2', question_type='TF', correct_answer='True', order=2)
+        self.skipped = Question.objects.create(text='سؤال 3', question_type='TF', correct_answer='False', order=3)
+
+    def play(self, answers, times=(1200, 800, 500)):
+        state = AttemptState.start({}, get_bank_version())
+        for question, answer, time_ms in zip((self.mcq, self.tf, self.skipped), answers, times):
+            state.record(question, answer, time_ms=time_ms)
+        return state
+
+    def test_answers_written_in_one_insert(self):
+        state = self.play(['B', 'False', None])
+        with CaptureQueriesContext(connection) as queries:
+            attempt = state.persist(3)
+
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "quiz_attemptanswer"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual((attempt.score, attempt.total), (1, 3))
+        self.assertEqual(
+            list(attempt.answers.order_by('position').values_list(
+                'question_id', 'position', 'answer', 'is_correct', 'time_ms')),
+            [(self.mcq.id, 0, 'B', True, 1200),
+             (self.tf.id, 1, 'False', False, 800),
+             (self.skipped.id, 2, '', False, 500)],
+        )
+
+    def test_stats_incremented(self):
+        self.play(['B', 'False', None]).persist(3)
+        self.play(['A', 'True', 'False'], times=(300, 200, 100)).persist(3)
+
+        stats = {row.question_id: row for row in QuestionStats.objects.all()}
+        mcq, tf, skipped = stats[self.mcq.id], stats[self.tf.id], stats[self.skipped.id]
+        self.assertEqual((mcq.answered_count, mcq.correct_count), (2, 1))
+        self.assertEqual((mcq.count_a, mcq.count_b, mcq.count_c, mcq.count_d), (1, 1, 0, 0))
+        self.assertEqual((mcq.timed_count, mcq.total_time_ms), (2, 1500))
+        self.assertEqual((tf.answered_count, tf.correct_count, tf.count_true, tf.count_false), (2, 1, 1, 1))
+        # Skipped answers count as answered, without an option
+        self.assertEqual((skipped.answered_count, skipped.correct_count), (2, 1))
+        self.assertEqual((skipped.count_true, skipped.count_false), (0, 1))
+        self.assertEqual((skipped.timed_count, skipped.total_time_ms), (2, 600))
+
+    def test_rebuild_matches_increments(self):
+        self.play(['B', 'False', None]).persist(3)
+        self.play(['A', 'True', 'False'], times=(300, 200, 100)).persist(3)
+        counters = ('question_id', 'answered_count', 'correct_count', 'count_a', 'count_b', 'count_c', 'count_d',
+                    'count_true', 'count_false', 'timed_count', 'total_time_ms')
+        incremented = list(QuestionStats.objects.order_by('question_id').values_list(*counters))
+
+        QuestionStats.objects.update(answered_count=0, correct_count=0, total_time_ms=0)
+        self.assertEqual(list(rebuild_question_stats(batch_size=2)), [2, 3])
+        self.assertEqual(list(QuestionStats.objects.order_by('question_id').values_list(*counters)), incremented)
+
+    def test_deleted_question_unlinked(self):
+        state = self.play(['B', 'True', 'False'])
+        deleted_id = self.tf.id
+        self.tf.delete()
+        attempt = state.persist(3)
+
+        # Graded against the current bank: the deleted question scores nothing
+        self.assertEqual(attempt.score, 2)
+        self.assertEqual(list(attempt.answers.order_by('position').values_list('question_id', 'is_correct')),
+                         [(self.mcq.id, True), (None, False), (self.skipped.id, True)])
+        self.assertFalse(QuestionStats.objects.filter(question_id=deleted_id).exists())
+        self.assertEqual(QuestionStats.objects.count(), 2)
+
+    def test_question_removed_from_set_mid_attempt(self):
+        first, second = [
+            Question.objects.create(text=f'سؤال {number}', question_type='TF', correct_answer='True')
+            for number in range(2)
+        ]
+        quiz_set = QuizSet.objects.create(name='مجموعة', slug='set')
+        quiz_set.questions.add(first, second)
+
+        state = AttemptState.start({}, get_bank_version(), quiz_set='set')
+        state.record(first, 'True')
+        quiz_set.questions.remove(first)
+        bump_sets_version()
+        state.record(second, 'True')
+
+        manifest = get_set_manifest('set')
+        self.assertNotIn(first.id, manifest.key.index)
+        attempt = state.persist(2, key=manifest.key, quiz_set_id=manifest.set_id)
+
+        self.assertEqual(attempt.score, 2)
+        self.assertEqual(list(attempt.answers.order_by('position').values_list('question_id', 'is_correct')),
+                         [(first.id, True), (second.id, True)])
+
+
+@override_settings(QUIZ_RESCORE_ASYNC=False, CACHES=TEST_CACHES)
+class ConcurrentRescoreTests(EmptyCachesMixin, TransactionTestCase):
+    """
+    Re-scores of the same question running at once apply each flip once.
+    """
+
+    def test_concurrent_rescores_apply_each_flip_once(self):
+        question = Question.objects.create(text='سؤال', question_type='TF', correct_answer='True')
+        for answer in ('True', 'False', 'False'):
+            store_attempt([question], [answer])
+        # Answer changed without signals, as by a bulk edit
+        Question.objects.filter(pk=question.pk).update(correct_answer='False')
+
+        # Both jobs read their chunk before either of them writes
+        barrier = threading.Barrier(2)
+        waited = threading.local()
+        build_answer_key = rescoring.build_answer_key
+
+        def build_together(question_ids=None):
+            key = build_answer_key(question_ids)
+            if not getattr(waited, 'done', False):
+                waited.done = True
+                barrier.wait(timeout=10)
+            return key
+
+        errors = []
+
+        def job():
+            try:
+                for _ in rescoring.rescore_attempts([question.pk]):
+                    pass
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        with mock.patch.object(rescoring, 'build_answer_key', build_together):
+            threads = [threading.Thread(target=job) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(AttemptAnswer.objects.values_list('is_correct', flat=True)), [False, True, True])
+        self.assertEqual(sorted(QuizAttempt.objects.values_list('score', flat=True)), [0, 1, 1])
+        self.assertEqual(QuestionStats.objects.get(question=question).correct_count, 2)
+        self.assertEqual(dict(ScoreBucket.objects.filter(quiz_key=BANK_QUIZ, total=1).values_list('score', 'count')), {0: 1, 1: 2})
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImportTests(EmptyCachesMixin, TestCase):
+    """
+    Streaming import: per-row validation, chunked inserts and one bank bump.
+    """
+
+    CSV = (
+        'text,question_type,option_a,option_b,option_c,option_d,correct_answer\n'
+        'عاصمة مصر؟,MCQ,القاهرة,الإسكندرية,أسوان,الأقصر,a\n'
+        ',TF,,,,,True\n'
+        'الأرض كروية,tf,,,,,true\n'
+        'سؤال ناقص,MCQ,أ,ب,,,A\n'
+        'سؤال,ESSAY,,,,,A\n'
+        'الشمس نجم,TF,,,,,False\n'
+        'سؤال خاطئ,TF,,,,,Maybe\n'
+    )
+
+    def test_csv_rows_validated_and_reported(self):
+        existing = Question.objects.create(text='سؤال قديم', question_type='TF', correct_answer='True', order=7)
+
+        result = import_questions(io.StringIO(self.CSV), 'csv')
+
+        self.assertEqual(result.created, 3)
+        self.assertEqual([line for line, _ in result.errors], [3, 5, 6, 8])
+        messages = dict(result.errors)
+        self.assertIn('text is required', messages[3])
+        self.assertIn('all four options', messages[5])
+        self.assertIn("Unknown question type: 'ESSAY'", messages[6])
+        self.assertIn("Invalid correct answer 'Maybe'", messages[8])
+
+        # Normalized like the manager form, appended in file order
+        imported = Question.objects.exclude(pk=existing.pk).order_by('order')
+        self.assertEqual(
+            list(imported.values_list('order', 'question_type', 'correct_answer', 'option_a')),
+            [(8, 'MCQ', 'A', 'القاهرة'), (9, 'TF', 'True', ''), (10, 'TF', 'False', '')],
+        )
+
+    def test_jsonl_bad_lines_reported(self):
+        lines = [
+            '{"text": "سؤال 1", "question_type": "TF", "correct_answer": "True"}\n',
+            '\n',
+            '{"text": "سؤال 2", \n',
+            '["not", "an", "object"]\n',
+            '{"text": "سؤال 3", "question_type": "TF", "correct_answer": "False"}\n',
+        ]
+        result = import_questions(iter(lines), 'jsonl')
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, _ in result.errors], [3, 4])
+        self.assertTrue(result.errors[0][1].startswith('Invalid JSON'))
+        self.assertEqual(result.errors[1][1], 'Each line must be a JSON object.')
+
+    def test_chunked_insert_and_single_bank_bump(self):
+        lines = ['text,question_type,correct_answer\n'] + [f'سؤال {number},TF,True\n' for number in range(5)]
+        version = get_bank_version()
+        self.assertEqual(len(get_question_bank()), 0)
+
+        with mock.patch('quiz.importers.bump_bank_version', wraps=bump_bank_version) as bump, \
+                CaptureQueriesContext(connection) as queries:
+            result = import_questions(iter(lines), 'csv', batch_size=2)
+
+        self.assertEqual(result.created, 5)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "quiz_question"')]
+        self.assertEqual(len(inserts), 3)
+        bump.assert_called_once_with()
+        self.assertNotEqual(get_bank_version(), version)
+        # The new version reloads the snapshot with the imported questions
+        self.assertEqual(len(get_question_bank()), 5)
+        self.assertEqual(list(Question.objects.order_by('order').values_list('order', flat=True)), [1, 2, 3, 4, 5])
+
+    def test_command_reports_rejected_rows(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as stream:
+            stream.write(self.CSV)
+        self.addCleanup(os.remove, stream.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        call_command('import_questions', stream.name, stdout=stdout, stderr=stderr)
+
+        self.assertIn('Imported 3 questions (4 rows rejected).', stdout.getvalue())
+        self.assertEqual(len(stderr.getvalue().splitlines()), 4)
+        self.assertTrue(stderr.getvalue().startswith('Line 3: '))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=TEST_CACHES)
+class ExportTests(EmptyCachesMixin, TestCase):
+    """
+    Streaming export of the bank and the attempt history.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mcq = Question.objects.create(
+            text='عاصمة مصر، "القاهرة"؟', question_type='MCQ', option_a='القاهرة', option_b='الجيزة',
+            option_c='أسوان', option_d='الأقصر', correct_answer='A', order=1,
+        )
+        cls.tf = Question.objects.create(text='الأرض كروية', question_type='TF', correct_answer='True', order=2)
+
+    def export(self, dataset, file_format, chunk_size=1):
+        return ''.join(iter_export(dataset, file_format, chunk_size=chunk_size))
+
+    def test_questions_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export('questions', 'csv'))))
+        self.assertEqual(rows[0], ['id', 'order', 'text', 'question_type',
+                                   'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer'])
+        self.assertEqual(rows[1], [str(self.mcq.id), '1', 'عاصمة مصر، "القاهرة"؟', 'MCQ',
+                                   'القاهرة', 'الجيزة', 'أسوان', 'الأقصر', 'A'])
+        self.assertEqual(rows[2][2:4], ['الأرض كروية', 'TF'])
+        self.assertEqual(len(rows), 3)
+
+    def test_attempts_jsonl(self):
+        attempt = store_attempt([self.mcq, self.tf], ['A', None])
+        output = self.export('attempts', 'jsonl')
+
+        lines = output.splitlines()
+        self.assertEqual(len(lines), 2)
+        first = json.loads(lines[0])
+        self.assertEqual(
+            {key: first[key] for key in ('attempt_id', 'score', 'total', 'position', 'question_id', 'answer',
+                                         'is_correct')},
+            {'attempt_id': attempt.id, 'score': 1, 'total': 2, 'position': 0, 'question_id': self.mcq.id,
+             'answer': 'A', 'is_correct': True},
+        )
+        self.assertEqual(first['completed_at'], attempt.completed_at.isoformat())
+        self.assertEqual((json.loads(lines[1])['answer'], json.loads(lines[1])['is_correct']), ('', False))
+
+    def test_round_trip(self):
+        fields = ('text', 'question_type', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer')
+        bank = list(Question.objects.order_by('order').values_list(*fields))
+
+        for file_format in SUPPORTED_EXPORT_FORMATS:
+            with self.subTest(file_format=file_format):
+                output = self.export('questions', file_format)
+                Question.objects.all().delete()
+                result = import_questions(io.StringIO(output, newline=''), file_format)
+                self.assertEqual((result.created, result.errors), (2, []))
+                self.assertEqual(list(Question.objects.order_by('order').values_list(*fields)), bank)
+
+    def test_manager_download_streams(self):
+        self.client.post(reverse('manager_login'), {'password': MANAGER_PASSWORD})
+        response = self.client.get(reverse('manager_export'), {'dataset': 'questions', 'format': 'jsonl'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="questions.jsonl"')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual([json.loads(line)['id'] for line in content.splitlines()], [self.mcq.id, self.tf.id])
+
+        response = self.client.get(reverse('manager_export'), {'dataset': 'users'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchTests(EmptyCachesMixin, TestCase):
+    """
+    Arabic normalization and the FTS index kept in sync by the signals.
+    """
+
+    def search(self, term):
+        return list(filter_questions(Question.objects.order_by('id'), term).values_list('id', flat=True))
+
+    def indexed_rows(self, question_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT text FROM {FTS_TABLE} WHERE rowid = %s", [question_id])
+            return [text for text, in cursor.fetchall()]
+
+    def test_normalize_text(self):
+        # Harakat and tatweel go, alef/yaa/taa marbuta variants fold, Latin casefolds
+        self.assertEqual(normalize_text('الْمَدْرَسَةُ'), 'المدرسه')
+        self.assertEqual(normalize_text('كتـــاب'), 'كتاب')
+        self.assertEqual(normalize_text('أحمد إلى آخر'), 'احمد الي اخر')
+        self.assertEqual(normalize_text('Python'), 'python')
+
+    def test_index_text_adds_article_less_forms(self):
+        self.assertEqual(index_text('الكتاب والقلم'), 'الكتاب والقلم كتاب قلم')
+        # Too short to be an article plus a word
+        self.assertEqual(index_text('الم'), 'الم')
+
+    def test_build_match_query(self):
+        self.assertEqual(build_match_query('الكتابُ أحمر'), '"كتاب"* "احمر"*')
+        self.assertIsNone(build_match_query(' ؟! '))
+
+    def test_index_follows_save_and_delete(self):
+        if not fts_available():
+            self.skipTest('SQLite built without FTS5')
+        question = Question.objects.create(text='مؤلف الكِتاب الأول', question_type='TF', correct_answer='True')
+        other = Question.objects.create(text='عاصمة مصر', question_type='TF', correct_answer='False')
+
+        self.assertEqual(self.indexed_rows(question.id), [index_text(question.text)])
+        self.assertEqual(self.search('كتاب'), [question.id])
+        self.assertEqual(self.search('الكتاب'), [question.id])
+        self.assertEqual(self.search('مولف اول'), [question.id])
+        self.assertEqual(self.search('عاص'), [other.id])
+
+        question.text = 'عاصمة الأردن'
+        question.save()
+        self.assertEqual(self.search('كتاب'), [])
+        self.assertEqual(self.search('عاصمه'), [question.id, other.id])
+
+        question.delete()
+        self.assertEqual(self.indexed_rows(question.id), [])
+        self.assertEqual(self.search('عاصمة'), [other.id])
+
+
+@override_settings(CACHES=TEST_CACHES, QUIZ_METRICS_ENABLED=True, QUIZ_METRICS_SERVER_TIMING=True)
+class BenchmarkTests(EmptyCachesMixin, TransactionTestCase):
+    """
+    Load benchmark helpers and a small concurrent run.
+    """
+
+    def test_server_timing_round_trip(self):
+        sample = RequestSample()
+        sample.duration, sample.query_count, sample.query_time, sample.session_bytes = 0.004, 3, 0.0005, 310
+
+        self.assertEqual(parse_server_timing(format_server_timing(sample)), {
+            'app': (4.0, None),
+            'db': (0.5, '3'),
+            'tpl': (0.0, None),
+            'session': (None, '310'),
+        })
+        self.assertEqual(parse_server_timing(None), {})
+
+    def test_percentile_is_nearest_rank(self):
+        values = [float(value) for value in range(1, 21)]
+        self.assertEqual(
+            [percentile(values, fraction) for fraction in (0.0, 0.5, 0.95, 0.99, 1.0)], [1.0, 10.0, 19.0, 20.0, 20.0]
+        )
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_run_load_plays_every_attempt(self):
+        seed_bank(5)
+        report = run_load(5, players=2, attempts=2, answers=5)
+
+        self.assertEqual(report['errors'], 0, report['error_samples'])
+        # Per attempt: start, 5 answers, results
+        self.assertEqual([report['steps'][step]['requests'] for step in STEPS], [4, 20, 4])
+        self.assertEqual(report['requests'], 28)
+        # Read from the Server-Timing headers: results stores the attempt, answers save the session
+        self.assertGreater(report['steps']['results']['queries_per_request'], 0)
+        self.assertGreater(report['steps']['answer']['session_bytes_per_request'], 0)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConcurrentOrderTests(EmptyCachesMixin, TransactionTestCase):
+    """
+    Concurrent imports and manager adds never share an order value.
+    """
+
+    def test_concurrent_imports_get_distinct_orders(self):
+        Question.objects.create_at_end(text='سؤال', question_type='TF', correct_answer='True')
+
+        # Both imports read the last order before either of them inserts
+        barrier = threading.Barrier(2)
+        waited = threading.local()
+        next_order = QuestionQuerySet.next_order
+
+        def next_order_together(queryset):
+            order = next_order(queryset)
+            if not getattr(waited, 'done', False):
+                waited.done = True
+                barrier.wait(timeout=10)
+            return order
+
+        errors = []
+
+        def job(name):
+            try:
+                lines = ['text,question_type,correct_answer\n'] + [f'{name} {number},TF,True\n' for number in range(3)]
+                import_questions(iter(lines), 'csv')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        with mock.patch.object(QuestionQuerySet, 'next_order', next_order_together):
+            threads = [threading.Thread(target=job, args=(name,)) for name in ('أ', 'ب')]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        orders = list(Question.objects.order_by('order').values_list('order', flat=True))
+        self.assertEqual(orders, list(range(1, 8)))
+        # Each import's chunk stays in one consecutive run
+        for name in ('أ', 'ب'):
+            imported = Question.objects.filter(text__startswith=name).order_by('order').values_list('order', flat=True)
+            self.assertEqual(list(imported), list(range(imported[0], imported[0] + 3)))
+
+        question = Question.objects.create_at_end(text='سؤال أخير', question_type='TF', correct_answer='True')
+        self.assertEqual(question.order, 8)
+
+
+class AsyncFlowURLConf:
+    """URLconf serving the quiz flow with the async views (as under ASGI)."""
+    urlpatterns = urls.flow_urlpatterns(async_views) + urls.urlpatterns
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ROOT_URLCONF=AsyncFlowURLConf, CACHES=TEST_CACHES)
+class AsyncFlowTests(EmptyCachesMixin, TestCase):
+    """
+    The async views play the same flows as the sync views.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.questions = [
+            Question.objects.create(text=f'سؤال {number}', question_type='TF', correct_answer='True', order=number)
+            for number in range(1, 4)
+        ]
+
+    async def play(self, url, answers):
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for answer in answers:
+            response = await self.async_client.post(url.split('?')[0], {
+                'question_id': response.context['question'].id,
+                'answer': answer,
+            })
+        self.assertRedirects(response, reverse('results'), fetch_redirect_response=False)
+        return await self.async_client.get(reverse('results'))
+
+    async def test_full_bank_attempt(self):
+        response = await self.play(reverse('quiz'), ['True', 'False', 'True'])
+        self.assertEqual((response.context['score'], response.context['total']), (2, 3))
+        attempt = await QuizAttempt.objects.aget(pk=response.context['attempt_id'])
+        self.assertEqual((attempt.quiz_key, attempt.score), (BANK_QUIZ, 2))
+
+    async def test_sampled_attempt(self):
+        response = await self.play(reverse('quiz') + '?sample=2', ['True', 'True'])
+        self.assertEqual((response.context['score'], response.context['total']), (2, 2))
+        attempt = await QuizAttempt.objects.aget(pk=response.context['attempt_id'])
+        self.assertEqual(attempt.quiz_key, SAMPLE_QUIZ)
+
+    async def test_question_set_attempt(self):
+        quiz_set = await QuizSet.objects.acreate(name='مجموعة', slug='set')
+        await sync_to_async(quiz_set.questions.add)(self.questions[0], self.questions[2])
+        response = await self.play(reverse('quiz_set', args=['set']), ['False', 'True'])
+        self.assertEqual((response.context['score'], response.context['total']), (1, 2))
+
+        response = await self.async_client.get(reverse('quiz_set', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_incomplete_attempt_not_stored(self):
+        response = await self.async_client.get(reverse('quiz'))
+        await self.async_client.post(reverse('quiz'), {
+            'question_id': response.context['question'].id,
+            'answer': 'True',
+        })
+        response = await self.async_client.get(reverse('results'))
+        self.assertEqual((response.context['score'], response.context['total']), (1, 3))
+        self.assertIsNone(response.context['attempt_id'])
+        self.assertFalse(await QuizAttempt.objects.aexists())
+
+    async def test_home_page_cache_and_validators(self):
+        with mock.patch.object(async_views, 'render', wraps=async_views.render) as render:
+            first = await self.async_client.get(reverse('home'))
+            second = await self.async_client.get(reverse('home'))
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(second.content, first.content)
+        self.assertIn('max-age', first['Cache-Control'])
+
+        response = await self.async_client.get(reverse('home'), headers={'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.post(reverse('home'))
+        self.assertEqual(response.status_code, 405)
@@ -1,11 +1,32 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
-urlpatterns = [
-    path('', views.home, name='home'),
-    path('quiz/', views.quiz, name='quiz'),
-    path('results/', views.results, name='results'),
+
+def flow_urlpatterns(flow):
+    """
+    URL patterns of the quiz flow (home, quiz and results).
+
+    Args:
+        flow (module): ``views``, or ``async_views`` under ASGI
+    """
+    return [
+        path('', flow.home, name='home'),
+        path('quiz/', flow.quiz, name='quiz'),
+        path('quiz/<str:set_slug>/', flow.quiz, name='quiz_set'),
+        path('results/', flow.results, name='results'),
+    ]
+
+
+# Views of the quiz flow: async under ASGI (see async_views.py)
+flow = async_views if getattr(settings, 'QUIZ_ASYNC_VIEWS', False) else views
+
+urlpatterns = flow_urlpatterns(flow) + [
+    path('api/quiz/start/', api.api_start, name='api_start'),
+    path('api/quiz/submit/', api.api_submit, name='api_submit'),
     path('manager/login/', views.manager_login, name='manager_login'),
     path('manager/', views.manager, name='manager'),
+    path('manager/export/', views.manager_export, name='manager_export'),
+    path('manager/metrics/', views.manager_metrics, name='manager_metrics'),
     path('manager/logout/', views.manager_logout, name='manager_logout'),
 ]
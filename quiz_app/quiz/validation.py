@@ -0,0 +1,71 @@
+"""
+Question Validation
+===================
+Validation rules shared by the manager page and the bulk importer.
+
+- Multiple Choice (MCQ): four non-empty options, answer A, B, C or D
+- True/False (TF): answer True or False, options left empty
+"""
+
+from django.core.exceptions import ValidationError
+
+# Valid correct answers per question type
+VALID_ANSWERS = {
+    'MCQ': ('A', 'B', 'C', 'D'),
+    'TF': ('True', 'False'),
+}
+
+# Answer used when none is given
+DEFAULT_ANSWERS = {
+    'MCQ': 'A',
+    'TF': 'True',
+}
+
+OPTION_FIELDS = ('option_a', 'option_b', 'option_c', 'option_d')
+
+
+def clean_question_data(data):
+    """
+    Validate raw question data and normalize it to model field values.
+    
+    Args:
+        data (Mapping): Raw values keyed by Question field name
+            (``text``, ``question_type``, ``option_a``..``option_d``,
+            ``correct_answer``)
+        
+    Returns:
+        dict: Keyword arguments for ``Question(...)``
+        
+    Raises:
+        ValidationError: If the data breaks the MCQ/TF rules
+    """
+    text = str(data.get('text') or '').strip()
+    if not text:
+        raise ValidationError("Question text is required.")
+
+    question_type = str(data.get('question_type') or 'MCQ').strip().upper()
+    if question_type not in VALID_ANSWERS:
+        raise ValidationError(f"Unknown question type: {question_type!r}.")
+
+    correct_answer = str(data.get('correct_answer') or DEFAULT_ANSWERS[question_type]).strip()
+    if question_type == 'TF':
+        # Accept any capitalization of True/False
+        correct_answer = correct_answer.capitalize()
+    else:
+        correct_answer = correct_answer.upper()
+    if correct_answer not in VALID_ANSWERS[question_type]:
+        raise ValidationError(f"Invalid correct answer {correct_answer!r} for {question_type}.")
+
+    cleaned = {
+        'text': text,
+        'question_type': question_type,
+        'correct_answer': correct_answer,
+    }
+
+    if question_type == 'MCQ':
+        options = {field: str(data.get(field) or '').strip() for field in OPTION_FIELDS}
+        if not all(options.values()):
+            raise ValidationError("Multiple choice questions need all four options.")
+        cleaned.update(options)
+
+    return cleaned
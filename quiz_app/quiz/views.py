@@ -8,18 +8,47 @@ This module implements a step-by-step quiz interface where users
 answer one question at a time and receive a romantic result message.
 """
 
+import secrets
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.decorators.http import require_http_methods
-from django.http import JsonResponse
-from django.db import models
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.conf import settings
+from django.views.decorators.cache import cache_control, cache_page
+from django.views.decorators.http import condition, require_http_methods
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse, HttpResponseBadRequest
 from django.contrib.sessions.models import Session
+from django.core.exceptions import ValidationError
+from django.utils.crypto import constant_time_compare
 from .models import Question
+from .bank import fetch_question_window, get_bank_version, get_question_count, get_questions
+from .attempt import AttemptState
+from .api import supports_client_driver
+from .sampling import fetch_sampled_window, sample_question_ids
+from .quizsets import get_set_manifest
+from .leaderboard import get_leaderboard, get_percentile, get_quiz_key
+from .validation import VALID_ANSWERS, clean_question_data
+from .search import filter_questions
+from .pagination import DEFAULT_PAGE_SIZE, get_keyset_page, parse_cursor
+from .conditional import bank_etag, bank_last_modified, manager_etag, manager_last_modified
+from .routers import read_from_primary
+from . import exporters, metrics
 
 # Password for manager page
 MANAGER_PASSWORD = "habiba123"
 
+# Columns shown in the manager question list
+MANAGER_LIST_FIELDS = (
+    'id', 'order', 'text', 'question_type',
+    'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer',
+    'stats__answered_count', 'stats__correct_count',
+    'stats__timed_count', 'stats__total_time_ms',
+)
+
 
 @require_http_methods(["GET"])
+@condition(etag_func=bank_etag, last_modified_func=bank_last_modified)
+@cache_page(getattr(settings, 'QUIZ_PAGE_CACHE_TIMEOUT', 60 * 15))
 def home(request):
     """
     Home Page View
@@ -31,20 +60,33 @@ def home(request):
     - Quiz introduction
     - Link to begin the quiz
     
+    The page is identical for every visitor: it is served from the page
+    cache, and repeat visitors get a 304 from the bank-state validators.
+    
     Args:
         request (HttpRequest): The HTTP request object
         
     Returns:
         HttpResponse: Rendered home.html template
     """
-    context = {
+    return render(request, 'home.html', get_home_context())
+
+
+def get_home_context():
+    """
+    Build the context of the home page.
+    
+    Returns:
+        dict: Context with the greeting name and the random quiz length
+    """
+    return {
         'name': 'حبيبتي',  # "My Love" in Arabic - Customize this name as needed
+        'sample_size': getattr(settings, 'QUIZ_SAMPLE_SIZE', 10),  # Random quiz length
     }
-    return render(request, 'home.html', context)
 
 
 @require_http_methods(["GET", "POST"])
-def quiz(request):
+def quiz(request, set_slug=None):
     """
     Quiz View
     =========
@@ -57,72 +99,180 @@ def quiz(request):
     - Track score and progress
     - Redirect to results when quiz is complete
     
+    Each request only loads the current and the next question, walking
+    the bank with an ``(order, id)`` keyset cursor. Progress is kept in
+    the compact attempt state from ``attempt.py``. At ``/quiz/<slug>/``
+    the walk is restricted to a question set, using its cached manifest.
+    
+    Query Parameters (GET):
+    - sample: Draw a random quiz of this many questions instead of
+      walking the whole bank (see ``sampling.py``)
+    - stratify: '1' to keep the bank's share of each question type
+    
     Session Keys:
-    - quiz_started (bool): Indicates quiz is in progress
-    - current_question (int): Index of current question
-    - answers (dict): User's answers by question ID
-    - score (int): Current score
+    - quiz_attempt (list): Attempt header with the bank version stamp
+    - quiz_progress (list): Score, keyset cursor and encoded answers
     
     Args:
         request (HttpRequest): The HTTP request object
+        set_slug (str): Slug of the question set to play, if any
         
     Returns:
         HttpResponse: Rendered quiz.html template or redirect to results
     """
-    # Get all questions from database
-    questions = list(Question.objects.all())
-    
-    # Redirect to home if no questions exist
-    if not questions:
-        return redirect('home')
-    
     if request.method == 'GET':
+        # Redirect to home if no questions exist (count cached per bank version)
+        if not get_question_count():
+            return redirect('home')
+        
         # Initialize session for new quiz attempt
-        request.session['quiz_started'] = True
-        request.session['current_question'] = 0
-        request.session['answers'] = {}
-        request.session['score'] = 0
+        bank_version = get_bank_version()
+        if set_slug is not None:
+            manifest = get_set_manifest(set_slug)
+            if manifest is None:
+                raise Http404("Question set not found")
+            state = AttemptState.start(request.session, bank_version, quiz_set=manifest.slug)
+        else:
+            sample_size = parse_sample_size(request.GET.get('sample'))
+            if sample_size:
+                seed = secrets.randbits(32)
+                sample = sample_question_ids(sample_size, seed, stratify=request.GET.get('stratify') == '1')
+                state = AttemptState.start(request.session, bank_version, sample=sample, seed=seed)
+            else:
+                state = AttemptState.start(request.session, bank_version)
         
-        return render(request, 'quiz.html', get_quiz_context(request, questions))
+        # Redirect to home if the question set is empty
+        question, _ = get_attempt_window(state)
+        if question is None:
+            return redirect('home')
+        
+        # Fresh full-bank attempts may be played through the JSON API
+        client_driver = supports_client_driver(state, get_question_count())
+        return render(request, 'quiz.html',
+                      get_quiz_context(question, 0, get_attempt_total(state), bank_version,
+                                       client_driver=client_driver))
     
     elif request.method == 'POST':
+        state = AttemptState.load(request.session)
+        if state is None:
+            # No attempt in progress - start one
+            return redirect(request.path)
+        
         # Process submitted answer
         answer = request.POST.get('answer')
         question_id = int(request.POST.get('question_id'))
-        current_index = request.session.get('current_question', 0)
         
-        # Store the answer
-        if answer:
-            request.session['answers'][str(question_id)] = answer
-            question = questions[current_index]
-            
-            # Check if answer is correct and update score
-            if answer == question.correct_answer:
-                request.session['score'] = request.session.get('score', 0) + 1
+        # Fetch only the question being answered and the one after it
+        question, next_question = get_attempt_window(state)
+        if question is None:
+            state.save(request.session)
+            return redirect('results')
+        
+        # Cached bank count, set size or sample size
+        total = get_attempt_total(state)
         
-        # Move to next question
-        current_index += 1
-        request.session['current_question'] = current_index
-        request.session.modified = True
+        # Stale or repeated submission - show the current question again
+        if question.id != question_id:
+            return render(request, 'quiz.html',
+                          get_quiz_context(question, state.position, total, get_bank_version()))
+        
+        # Store the answer, update the score and move to the next question
+        state.record(question, answer)
+        if next_question is None and state.sample is not None:
+            # The next sampled question may have been deleted - skip ahead
+            next_question, _ = get_attempt_window(state)
+        state.save(request.session)
         
         # Check if quiz is completed
-        if current_index >= len(questions):
+        if next_question is None:
             return redirect('results')
         
         # Display next question
-        return render(request, 'quiz.html', get_quiz_context(request, questions))
+        return render(request, 'quiz.html',
+                      get_quiz_context(next_question, state.position, total, get_bank_version()))
 
 
-def get_quiz_context(request, questions):
+def parse_sample_size(value):
+    """
+    Parse the requested size of a random quiz.
+    
+    Args:
+        value (str): The ``sample`` query parameter (may be None)
+        
+    Returns:
+        int: Number of questions to draw, or None for the full quiz
+    """
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return None
+    return size if size > 0 else None
+
+
+def get_attempt_total(state):
+    """
+    Get the number of questions of an attempt.
+    
+    Args:
+        state (AttemptState): The attempt in progress
+        
+    Returns:
+        int: Sample size, question set size or bank size (all cached)
+    """
+    if state.sample is not None:
+        return len(state.sample)
+    if state.quiz_set is not None:
+        manifest = get_set_manifest(state.quiz_set)
+        return manifest.count if manifest is not None else 0
+    return get_question_count()
+
+
+def get_attempt_window(state):
+    """
+    Get the current and next question of an attempt.
+    
+    Sampled questions deleted since the sample was drawn are recorded as
+    skipped, so the attempt keeps its length.
+    
+    Args:
+        state (AttemptState): The attempt in progress
+        
+    Returns:
+        tuple: ``(current, next)`` questions; current is None once the
+        attempt is complete
+    """
+    if state.quiz_set is not None:
+        manifest = get_set_manifest(state.quiz_set)
+        ids = list(manifest.window(state.cursor)) if manifest is not None else []
+        window = get_questions(ids) + [None, None]
+        return window[0], window[1]
+    
+    if state.sample is None:
+        return fetch_question_window(state.cursor)
+    
+    current, upcoming = fetch_sampled_window(state.sample, state.position)
+    while current is None and state.position < len(state.sample):
+        state.skip(state.sample[state.position])
+        current, upcoming = fetch_sampled_window(state.sample, state.position)
+    return current, upcoming
+
+
+def get_quiz_context(question, index, total, bank_version, client_driver=False):
     """
     Helper function to build context dictionary for quiz template.
     
-    This function calculates the current question, progress percentage,
-    and prepares all necessary data for the quiz template rendering.
+    This function calculates the progress percentage and prepares all
+    necessary data for the quiz template rendering. The question card is
+    a cached fragment keyed by question ID and bank version, so the
+    options are only formatted when the fragment is (re)rendered.
     
     Args:
-        request (HttpRequest): The HTTP request object (for session access)
-        questions (list): List of all Question objects
+        question (Question): The question to display
+        index (int): 0-based position of the question in the quiz
+        total (int): Total number of questions
+        bank_version (int): Question bank version the question was read from
+        client_driver (bool): Let the page play the attempt through the
+            JSON API (``api.py``) - fresh full-bank attempts only
         
     Returns:
         dict: Context dictionary containing:
@@ -130,25 +280,22 @@ def get_quiz_context(request, questions):
             - question_number: 1-based question index
             - total_questions: Total number of questions
             - progress: Percentage of quiz completion (0-100)
-            - options: Formatted answer options for current question
+            - bank_version: Cache key part of the question card fragment
+            - client_driver: Whether the page links the JSON API
     """
-    current_index = request.session.get('current_question', 0)
-    
-    # Safeguard against invalid indices
-    if current_index >= len(questions):
-        return redirect('results')
-    
-    current_question = questions[current_index]
+    # Guard against the bank shrinking mid-attempt
+    total = max(total, index + 1)
     
     # Calculate progress as percentage (0-100)
-    progress = ((current_index + 1) / len(questions)) * 100
+    progress = ((index + 1) / total) * 100
     
     return {
-        'question': current_question,
-        'question_number': current_index + 1,
-        'total_questions': len(questions),
+        'question': question,
+        'question_number': index + 1,
+        'total_questions': total,
         'progress': progress,
-        'options': current_question.get_options(),
+        'bank_version': bank_version,
+        'client_driver': client_driver,
     }
 
 
@@ -163,8 +310,11 @@ def results(request):
     Features:
     - Display final score and percentage
     - Show romantic congratulations message (in Arabic and English)
+    - Show the player's percentile and the top-N leaderboard
     - Provide detailed feedback based on performance
     - Offer options to retake quiz or return home
+    - Persist the completed attempt and its answers (an incomplete
+      attempt is shown but neither stored nor ranked)
     - Clear session data for security
     
     Score-based Messages:
@@ -179,34 +329,39 @@ def results(request):
     Returns:
         HttpResponse: Rendered results.html template
     """
-    # Retrieve score and total questions from session
-    score = request.session.get('score', 0)
-    total = Question.objects.count()
+    # Retrieve the attempt state and the quiz length (cached bank count,
+    # question set size or the sample size of a random quiz)
+    state = AttemptState.load(request.session)
+    total = get_attempt_total(state) if state is not None else get_question_count()
+    manifest = get_set_manifest(state.quiz_set) if state is not None and state.quiz_set else None
     
     # Redirect home if no questions or session data
     if total == 0:
         return redirect('home')
     
+    score = state.score if state is not None else 0
+    attempt = None
+    # Only completed attempts are stored and ranked: results opened in the
+    # middle of an attempt (abandoned or peeked) show the score so far
+    if state is not None and state.answers and get_attempt_window(state)[0] is None:
+        # Persist the attempt and its buffered answers in one transaction
+        # (a question set brings its cached answer key - no grading query)
+        attempt = state.persist(
+            total,
+            key=manifest.key if manifest is not None else None,
+            quiz_set_id=manifest.set_id if manifest is not None else None,
+        )
+        score = attempt.score
+    
+    # Attempts are only ranked against attempts of the same quiz
+    quiz_key = get_quiz_key(manifest.set_id if manifest is not None else None,
+                            sampled=state is not None and state.sample is not None)
+    
     # Calculate percentage
     percentage = (score / total) * 100 if total > 0 else 0
     
     # Select romantic message based on performance
-    if percentage == 100:
-        # Perfect score - highest praise
-        message = "مثالي! أنتِ رائعة! ♥️ أنا أحبك كثيراً!"
-        message_en = "Perfect! You're amazing! ♥️ I love you so much!"
-    elif percentage >= 80:
-        # Excellent performance
-        message = "ممتاز! أنتِ ذكية جداً! ♥️ أحبك!"
-        message_en = "Excellent! You're so smart! ♥️ I love you!"
-    elif percentage >= 60:
-        # Very good performance
-        message = "جيد جداً! أنتِ رائعة! ♥️"
-        message_en = "Very Good! You're wonderful! ♥️"
-    else:
-        # Encouraging message
-        message = "محاولة جيدة يا عزيزتي! ♥️ نحن معاً أقوى!"
-        message_en = "Good try, my dear! ♥️ We're stronger together!"
+    message, message_en = get_result_message(percentage)
     
     # Prepare context data
     context = {
@@ -215,6 +370,10 @@ def results(request):
         'percentage': percentage,
         'message': message,
         'message_en': message_en,
+        # Ranking from the precomputed score histogram and leaderboard index
+        'percentile': get_percentile(quiz_key, score, total) if attempt else None,
+        'leaderboard': get_leaderboard(quiz_key, total),
+        'attempt_id': attempt.id if attempt else None,
     }
     
     # Clear session data for security (remove after rendering)
@@ -223,6 +382,33 @@ def results(request):
     return render(request, 'results.html', context)
 
 
+def get_result_message(percentage):
+    """
+    Select the results message for a score.
+    
+    Args:
+        percentage (float): Score as a percentage of the total (0-100)
+        
+    Returns:
+        tuple: ``(message, message_en)`` in Arabic and English
+    """
+    if percentage == 100:
+        # Perfect score - highest praise
+        return ("مثالي! أنتِ رائعة! ♥️ أنا أحبك كثيراً!",
+                "Perfect! You're amazing! ♥️ I love you so much!")
+    if percentage >= 80:
+        # Excellent performance
+        return ("ممتاز! أنتِ ذكية جداً! ♥️ أحبك!",
+                "Excellent! You're so smart! ♥️ I love you!")
+    if percentage >= 60:
+        # Very good performance
+        return ("جيد جداً! أنتِ رائعة! ♥️",
+                "Very Good! You're wonderful! ♥️")
+    # Encouraging message
+    return ("محاولة جيدة يا عزيزتي! ♥️ نحن معاً أقوى!",
+            "Good try, my dear! ♥️ We're stronger together!")
+
+
 @require_http_methods(["GET", "POST"])
 def manager_login(request):
     """
@@ -248,15 +434,43 @@ def manager_login(request):
     return render(request, 'manager_login.html')
 
 
+def get_manager_questions(search=''):
+    """
+    Questions listed on the manager page, loading only the listed columns.
+    
+    Args:
+        search (str): Only list questions matching this full-text search
+        
+    Returns:
+        QuerySet: Questions with their precomputed statistics
+    """
+    questions = Question.objects.select_related('stats').only(*MANAGER_LIST_FIELDS)
+    if search:
+        questions = filter_questions(questions, search)
+    return questions
+
+
+@read_from_primary
 @require_http_methods(["GET", "POST"])
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=manager_etag, last_modified_func=manager_last_modified)
 def manager(request):
     """
     Manager Page - Add/Delete Questions
     ====================================
     Simple admin interface to add and delete questions.
     
-    GET: Display all questions and form to add new ones
+    GET: Display one page of questions and the form to add new ones
     POST: Add new question or delete existing one
+    
+    Query Parameters:
+    - q: Only list questions matching this full-text search
+    - after / before: ``(order, id)`` keyset cursor of the neighbouring page
+    
+    Browsers revalidate the list on every visit; while no question was
+    edited and no attempt stored it is answered with a 304, skipping the
+    list query and the render. Reads use the primary database, so the
+    manager always sees its own edits (see ``routers.py``).
     """
     # Check if user is authenticated
     if not request.session.get('manager_access'):
@@ -267,41 +481,34 @@ def manager(request):
         
         if action == 'add':
             # Add new question
-            question_text = request.POST.get('question_text', '').strip()
             question_type = request.POST.get('question_type', 'MCQ')
             
-            if question_text:
-                # Get the next order number
-                max_order = Question.objects.aggregate(models.Max('order'))['order__max'] or 0
-                
-                if question_type == 'MCQ':
-                    option_a = request.POST.get('option_a', '').strip()
-                    option_b = request.POST.get('option_b', '').strip()
-                    option_c = request.POST.get('option_c', '').strip()
-                    option_d = request.POST.get('option_d', '').strip()
-                    correct_answer = request.POST.get('correct_answer', 'A')
-                    
-                    if all([option_a, option_b, option_c, option_d]):
-                        Question.objects.create(
-                            text=question_text,
-                            question_type='MCQ',
-                            option_a=option_a,
-                            option_b=option_b,
-                            option_c=option_c,
-                            option_d=option_d,
-                            correct_answer=correct_answer,
-                            order=max_order + 1
-                        )
-                else:  # True/False
-                    correct_answer = request.POST.get('correct_answer', 'True')
-                    Question.objects.create(
-                        text=question_text,
-                        question_type='TF',
-                        correct_answer=correct_answer,
-                        order=max_order + 1
-                    )
-                
-                return redirect('manager')
+            # The form has one correct-answer select per question type and
+            # both are posted - keep the one that belongs to the chosen type
+            correct_answer = next(
+                (answer for answer in request.POST.getlist('correct_answer')
+                 if answer in VALID_ANSWERS.get(question_type, ())),
+                None,
+            )
+            
+            try:
+                fields = clean_question_data({
+                    'text': request.POST.get('question_text', ''),
+                    'question_type': question_type,
+                    'option_a': request.POST.get('option_a', ''),
+                    'option_b': request.POST.get('option_b', ''),
+                    'option_c': request.POST.get('option_c', ''),
+                    'option_d': request.POST.get('option_d', ''),
+                    'correct_answer': correct_answer,
+                })
+            except ValidationError:
+                fields = None
+            
+            if fields:
+                # Append after the last question (order allocated atomically)
+                Question.objects.create_at_end(**fields)
+            
+            return redirect('manager')
         
         elif action == 'delete':
             # Delete question
@@ -310,19 +517,90 @@ def manager(request):
                 Question.objects.get(id=question_id).delete()
             except Question.DoesNotExist:
                 pass
-            return redirect('manager')
+            
+            # Stay on the same list page, unless the deleted question was the
+            # last one on it - then go back to the first page of the list
+            search = request.GET.get('q', '').strip()
+            after = parse_cursor(request.GET.get('after'))
+            before = parse_cursor(request.GET.get('before'))
+            if (after or before) and not get_keyset_page(
+                    get_manager_questions(search), after=after, before=before, size=1):
+                return redirect(reverse('manager') + (f'?{urlencode({"q": search})}' if search else ''))
+            return redirect(request.get_full_path())
     
-    # Get all questions
-    questions = Question.objects.all().order_by('order')
+    # One keyset page of questions with their precomputed statistics
+    search = request.GET.get('q', '').strip()
+    page = get_keyset_page(
+        get_manager_questions(search),
+        after=parse_cursor(request.GET.get('after')),
+        before=parse_cursor(request.GET.get('before')),
+        size=DEFAULT_PAGE_SIZE,
+    )
     
     context = {
-        'questions': questions,
-        'total_questions': questions.count(),
+        'questions': page,
+        'search': search,
+        # Cached per bank version - no COUNT query per page
+        'total_questions': get_question_count(),
     }
     
     return render(request, 'manager.html', context)
 
 
+@require_http_methods(["GET"])
+def manager_export(request):
+    """
+    Manager Export - Streaming Download
+    ===================================
+    Stream the question bank or the attempt history as CSV or JSON Lines.
+    
+    Query Parameters:
+    - dataset: 'questions' (default) or 'attempts'
+    - format: 'csv' (default) or 'jsonl'
+    
+    Rows are streamed in chunks, so large exports never sit in memory.
+    """
+    if not request.session.get('manager_access'):
+        return redirect('manager_login')
+    
+    dataset = request.GET.get('dataset', 'questions')
+    file_format = request.GET.get('format', 'csv')
+    if dataset not in exporters.DATASETS or file_format not in exporters.SUPPORTED_FORMATS:
+        return HttpResponseBadRequest("Unknown dataset or format")
+    
+    response = StreamingHttpResponse(
+        exporters.iter_export(dataset, file_format),
+        content_type=exporters.CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+    return response
+
+
+@require_http_methods(["GET"])
+def manager_metrics(request):
+    """
+    Manager Metrics - Prometheus Endpoint
+    =====================================
+    Expose the request metrics of this process in the Prometheus text
+    format (see ``metrics.py``).
+    
+    Access requires a manager session, or an
+    ``Authorization: Bearer <QUIZ_METRICS_TOKEN>`` header for scrapers.
+    Returns 404 while instrumentation is disabled.
+    """
+    if not getattr(settings, 'QUIZ_METRICS_ENABLED', False):
+        raise Http404("Metrics are disabled")
+    
+    token = getattr(settings, 'QUIZ_METRICS_TOKEN', '')
+    authorized = request.session.get('manager_access') or (
+        token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    )
+    if not authorized:
+        return redirect('manager_login')
+    
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @require_http_methods(["GET"])
 def manager_logout(request):
     """
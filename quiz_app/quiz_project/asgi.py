@@ -0,0 +1,18 @@
+"""
+ASGI config for quiz_project project.
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Serve it with an ASGI server, e.g.:
+    uvicorn quiz_project.asgi:application --workers 2
+
+The quiz flow (home, quiz, results) is served by the async views of
+``quiz/async_views.py`` unless ``QUIZ_ASYNC_VIEWS=False`` is set.
+"""
+
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quiz_project.settings')
+os.environ.setdefault('QUIZ_ASYNC_VIEWS', 'True')
+
+application = get_asgi_application()
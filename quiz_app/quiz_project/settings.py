@@ -4,6 +4,7 @@ Django settings for quiz_project project.
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -28,6 +29,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include every other middleware (no-op unless
+    # QUIZ_METRICS_ENABLED)
+    'quiz.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,32 +43,106 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'quiz_project.urls'
 
+# Templates
+# Production template mode (on unless DEBUG): compiled templates are kept
+# in memory by the cached loader and rendered fragments (navigation,
+# question cards) are cached for QUIZ_FRAGMENT_CACHE_TIMEOUT seconds.
+QUIZ_TEMPLATE_CACHE = os.environ.get('QUIZ_TEMPLATE_CACHE', str(not DEBUG)) == 'True'
+QUIZ_FRAGMENT_CACHE_TIMEOUT = 60 * 60 if QUIZ_TEMPLATE_CACHE else 0
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if QUIZ_TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'quiz' / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'quiz.context_processors.fragment_cache',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
 
 WSGI_APPLICATION = 'quiz_project.wsgi.application'
+ASGI_APPLICATION = 'quiz_project.asgi.application'
 
 # Database
+# SQLite production profile (opt-in, QUIZ_SQLITE_TUNING=True): WAL journal,
+# relaxed fsync, memory-mapped reads and a busy timeout on every connection
+# (see quiz/database.py), and connections reused across requests
+QUIZ_SQLITE_TUNING = os.environ.get('QUIZ_SQLITE_TUNING', 'False') == 'True'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Seconds a connection is kept open for reuse (0: one per request)
+        'CONN_MAX_AGE': int(os.environ.get('QUIZ_DB_CONN_MAX_AGE', '600')) if QUIZ_SQLITE_TUNING else 0,
+        'CONN_HEALTH_CHECKS': QUIZ_SQLITE_TUNING,
     }
 }
 
+# Read-only connection to the same file for question reads (quiz.routers),
+# so player reads never wait on session/attempt write locks. Needs the
+# WAL journal of the production profile; on by default with it.
+QUIZ_READ_REPLICA = os.environ.get('QUIZ_READ_REPLICA', str(QUIZ_SQLITE_TUNING)) == 'True'
+
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': f"file:{DATABASES['default']['NAME']}?mode=ro",
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['quiz.routers.ReadReplicaRouter']
+
+# Caches
+# The 'sessions' and 'versions' aliases are file-based so every worker
+# process on the host (and management commands) share in-progress quiz
+# state and the bank/sets version numbers without an external cache service
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Version numbers of the in-process snapshots (bank.py, quizsets.py)
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'QUIZ_VERSION_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'quiz_app_versions'),
+        ),
+        'TIMEOUT': None,
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'QUIZ_SESSION_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'quiz_app_sessions'),
+        ),
+        'TIMEOUT': 60 * 60 * 24 * 14,
+    },
+    # Used by the {% cache %} template tag
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template_fragments',
+    },
+}
+
+# Sessions
+# Cache + database hybrid: attempt progress is written to the cache only,
+# the database is written at attempt start and completion
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'quiz.sessions')
+SESSION_CACHE_ALIAS = 'sessions'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -97,6 +175,33 @@ STATICFILES_DIRS = [
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Quiz question bank: banks up to this size are served from an in-process
+# snapshot; larger banks are walked with (order, id) keyset queries
+QUIZ_BANK_SNAPSHOT_MAX = int(os.environ.get('QUIZ_BANK_SNAPSHOT_MAX', '1000'))
+
+# Number of questions in a random quiz (/quiz/?sample=N)
+QUIZ_SAMPLE_SIZE = int(os.environ.get('QUIZ_SAMPLE_SIZE', '10'))
+
+# Page cache lifetime of pages that are the same for every visitor (home)
+QUIZ_PAGE_CACHE_TIMEOUT = int(os.environ.get('QUIZ_PAGE_CACHE_TIMEOUT', str(60 * 15)))
+
+# Re-score stored attempts on a background thread pool when a question's
+# correct answer changes (set QUIZ_RESCORE_ASYNC=False to run inline)
+QUIZ_RESCORE_ASYNC = os.environ.get('QUIZ_RESCORE_ASYNC', 'True') == 'True'
+QUIZ_RESCORE_WORKERS = int(os.environ.get('QUIZ_RESCORE_WORKERS', '2'))
+
+# Request instrumentation (quiz.middleware) and the Prometheus endpoint
+# at /manager/metrics/; scrapers authenticate with the bearer token
+QUIZ_METRICS_ENABLED = os.environ.get('QUIZ_METRICS_ENABLED', 'False') == 'True'
+QUIZ_METRICS_TOKEN = os.environ.get('QUIZ_METRICS_TOKEN', '')
+# Also report each request's measurements in a Server-Timing header
+QUIZ_METRICS_SERVER_TIMING = os.environ.get('QUIZ_METRICS_SERVER_TIMING', 'False') == 'True'
+
+# Serve home, quiz and results with the async views (quiz.async_views);
+# on by default under ASGI (asgi.py). The metrics middleware is sync-only:
+# with QUIZ_METRICS_ENABLED, Django runs the async views through a thread.
+QUIZ_ASYNC_VIEWS = os.environ.get('QUIZ_ASYNC_VIEWS', 'False') == 'True'
+
 # RTL Support
 USE_I18N = True
 LANGUAGE_CODE = 'ar'
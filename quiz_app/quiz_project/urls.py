@@ -1,8 +1,10 @@
 """
 URL configuration for quiz_project.
 """
+from django.contrib import admin
 from django.urls import path, include
 
 urlpatterns = [
+    path('admin/', admin.site.urls),
     path('', include('quiz.urls')),
 ]